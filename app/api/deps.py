@@ -0,0 +1,18 @@
+from fastapi import Depends, HTTPException, Request
+
+from app.models.user import User, UserRole
+
+
+def get_current_user(request: Request) -> User:
+    """Dependency to get the current user from request.state."""
+    user = request.state.user
+    if not user:
+        raise HTTPException(status_code=401, detail="Authentication required")
+    return user
+
+
+def get_admin_user(current_user: User = Depends(get_current_user)) -> User:
+    """Dependency to ensure the user is an admin."""
+    if current_user.role != UserRole.ADMIN:  # type: ignore[comparison-overlap]
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return current_user
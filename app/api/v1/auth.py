@@ -1,8 +1,13 @@
-from fastapi import APIRouter, BackgroundTasks, Depends
+from typing import Optional
+
+from fastapi import APIRouter, BackgroundTasks, Depends, Request
 from fastapi.security import OAuth2PasswordRequestForm
+from fastapi.security.utils import get_authorization_scheme_param
 from sqlalchemy.orm import Session
 
+from app import settings
 from app.core.db.connect import get_db
+from app.core.ratelimit import rate_limit_by_ip, rate_limit_by_username
 from app.schemas.auth import (
     ConfirmPasswordRequest,
     RefreshTokenRequest,
@@ -12,14 +17,32 @@ from app.schemas.auth import (
 from app.schemas.base import Successfully
 from app.services.auth import AuthService
 
-router = APIRouter(prefix="/auth", tags=["Auth"])
+# ตรวจ rate limit ก่อนถึง handler เพื่อไม่ให้เสีย CPU กับ bcrypt
+router = APIRouter(
+    prefix="/auth",
+    tags=["Auth"],
+    dependencies=[
+        Depends(
+            rate_limit_by_ip(
+                "auth-ip",
+                settings.AUTH_RATE_LIMIT_IP_CAPACITY,
+                settings.AUTH_RATE_LIMIT_IP_REFILL,
+            )
+        )
+    ],
+)
+login_rate_limit = rate_limit_by_username(
+    "auth-login-username",
+    settings.AUTH_RATE_LIMIT_USERNAME_CAPACITY,
+    settings.AUTH_RATE_LIMIT_USERNAME_REFILL,
+)
 
 
 def get_auth_service(db: Session = Depends(get_db)) -> AuthService:
     return AuthService(db)
 
 
-@router.post("/login")
+@router.post("/login", dependencies=[Depends(login_rate_limit)])
 def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
     auth_service: AuthService = Depends(get_auth_service),
@@ -31,7 +54,7 @@ def login(
 
 
 @router.post("/register")
-async def register(
+def register(
     user: UserCreate,
     background_tasks: BackgroundTasks,
     auth_service: AuthService = Depends(get_auth_service),
@@ -51,6 +74,22 @@ def refresh_token(
     )
 
 
+@router.post("/logout")
+def logout(
+    request: Request,
+    refresh_token_request: Optional[RefreshTokenRequest] = None,
+    auth_service: AuthService = Depends(get_auth_service),
+):
+    scheme, access_token = get_authorization_scheme_param(
+        request.headers.get("Authorization")
+    )
+    auth_service.logout(
+        access_token if scheme.lower() == "bearer" else None,
+        refresh_token_request.refresh_token if refresh_token_request else None,
+    )
+    return Successfully(code=200, msg="Logged out successfully", status="success")
+
+
 @router.post("/reset-password-request")
 def reset_password_request(
     email: str,
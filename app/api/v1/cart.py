@@ -1,12 +1,24 @@
-from typing import List
+from typing import Any, List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, Body, Depends
 from sqlalchemy.orm import Session
 
+from app.api.deps import get_admin_user
 from app.core.db.connect import get_db
+from app.core.projection import sparse_fields
 from app.models.cart import Cart, CartLine
-from app.models.user import User, UserRole
-from app.schemas.base import Failed, Successfully
+from app.models.user import User
+from app.schemas.base import (
+    BatchDelete,
+    BatchResult,
+    Failed,
+    Successfully,
+    batch_not_found_errors,
+    validate_batch,
+)
+from app.schemas.cart import Cart as CartSchema
+from app.schemas.cart import CartLine as CartLineSchema
+from app.schemas.cart import CartLineOperation, RepriceRequest, RepriceResult
 from app.services.cart import (
     CartCreate,
     CartLineCreate,
@@ -15,39 +27,52 @@ from app.services.cart import (
     CartService,
     CartUpdate,
 )
+from app.services.cart_store import (
+    CartStore,
+    cart_snapshot,
+    cart_store_flusher,
+    get_cart_store,
+    line_snapshot,
+    line_tax,
+)
+from app.services.pricing import PricingService
+from app.settings import base as settings
 
 router = APIRouter(prefix="/carts", tags=["Cart"])
 
 
-def get_current_user(request: Request) -> User:
-    """Dependency to get the current user from request.state."""
-    user = request.state.user
-    if not user:
-        raise HTTPException(status_code=401, detail="Authentication required")
-    return user
-
-
-def get_admin_user(current_user: User = Depends(get_current_user)) -> User:
-    """Dependency to ensure the user is an admin."""
-    if current_user.role != UserRole.ADMIN:  # type: ignore[comparison-overlap]
-        raise HTTPException(status_code=403, detail="Admin access required")
-    return current_user
+def cart_store(db: Session = Depends(get_db)) -> CartStore:
+    """Dependency returning the cart store selected by CART_STORE_BACKEND."""
+    return get_cart_store(db)
 
 
 @router.get("/carts/{cart_id}", response_model=Successfully[Cart])
-def get_cart(cart_id: int, db: Session = Depends(get_db)):
-    service = CartService(db)
-    cart = service.get(cart_id)
+def get_cart(cart_id: int, store: CartStore = Depends(cart_store)):
+    cart = store.get_cart(cart_id)
     if not cart:
         return Failed(msg="Cart not found", code=404)
     return Successfully(data=cart, msg="Cart retrieved successfully", code=200)
 
 
 @router.get("/carts/", response_model=Successfully[List[Cart]])
-def get_carts(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def get_carts(
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    fields: Optional[List[str]] = Depends(sparse_fields(CartSchema, Cart)),
+    db: Session = Depends(get_db),
+):
+    # อ่านจาก DB ตรงๆ: flush ของที่ค้างใน write-behind store ก่อน ไม่งั้นได้ยอดเก่า
+    # ส่งกลับรูปเดียวกับ snapshot ของ GET /carts/{cart_id}
+    cart_store_flusher.flush()
     service = CartService(db)
-    list_cart = service.get_multi(skip, limit)
-    return Successfully(data=list_cart, msg="Carts retrieved successfully", code=200)
+    list_cart, next_cursor = service.paginate(limit, cursor, skip, fields)
+    return Successfully(
+        data=list_cart if fields else [cart_snapshot(cart) for cart in list_cart],
+        next_cursor=next_cursor,
+        msg="Carts retrieved successfully",
+        code=200,
+    )
 
 
 @router.post("/carts/", response_model=Successfully[Cart])
@@ -58,82 +83,176 @@ def create_cart(cart: CartCreate, db: Session = Depends(get_db)):
 
 
 @router.put("/carts/{cart_id}", response_model=Successfully[Cart])
-def update_cart(cart_id: int, cart: CartUpdate, db: Session = Depends(get_db)):
-    service = CartService(db)
-    db_cart = service.get(cart_id)
-    if not db_cart:
+def update_cart(
+    cart_id: int, cart: CartUpdate, store: CartStore = Depends(cart_store)
+):
+    obj = store.update_cart(cart_id, cart)
+    if not obj:
         return Failed(msg="Cart not found", code=404)
-    obj = service.update(db_cart, cart)
     return Successfully(data=obj, msg="Cart updated successfully", code=200)
 
 
 @router.delete("/carts/{cart_id}", response_model=Successfully[Cart])
-def delete_cart(cart_id: int, db: Session = Depends(get_db)):
-    service = CartService(db)
-    cart = service.remove(cart_id)
+def delete_cart(cart_id: int, store: CartStore = Depends(cart_store)):
+    cart = store.remove_cart(cart_id)
     if not cart:
         return Failed(msg="Cart not found", code=404)
     return Successfully(data=cart, msg="Cart deleted successfully", code=200)
 
 
+@router.patch("/carts/{cart_id}/lines", response_model=Successfully[Cart])
+def apply_cart_line_ops(
+    cart_id: int,
+    ops: List[CartLineOperation] = Body(..., max_length=settings.BATCH_MAX_ITEMS),
+    store: CartStore = Depends(cart_store),
+):
+    """Apply add/set_quantity/remove/discount ops atomically; returns the final cart."""
+    cart = store.apply_line_ops(cart_id, ops)
+    if not cart:
+        return Failed(msg="Cart not found", code=404)
+    return Successfully(data=cart, msg="Cart lines updated successfully", code=200)
+
+
 @router.get("/carts/{cart_id}/total/")
-def get_cart_total(cart_id: int, tax_rate: float = 0.07, db: Session = Depends(get_db)):
-    service = CartService(db)
-    total = service.calculate_total(cart_id, tax_rate)
-    json = {"cart_id": cart_id, "total_amount": total}
+def get_cart_total(
+    cart_id: int,
+    tax_rate: Optional[float] = None,
+    store: CartStore = Depends(cart_store),
+):
+    """Maintained totals of the cart; ``tax_rate`` re-taxes them at another rate."""
+    totals = store.get_totals(cart_id)
+    if not totals:
+        return Failed(msg="Cart not found", code=404)
+    if tax_rate is not None:
+        totals.update(
+            Cart.total_values(
+                totals["subtotal_amount"], totals["discount_amount"], tax_rate
+            ),
+            tax_rate=tax_rate,
+        )
+    json = {"cart_id": cart_id, **totals}
     return Successfully(data=json, msg="Cart total retrieved successfully", code=200)
 
 
 @router.post("/carts/{cart_id}/apply-discount/")
 def apply_cart_discount(
-    cart_id: int, discount_rate: float, db: Session = Depends(get_db)
+    cart_id: int, discount_rate: float, store: CartStore = Depends(cart_store)
 ):
-    service = CartService(db)
-    total_discount = service.apply_discount(cart_id, discount_rate)
+    total_discount = store.apply_discount(cart_id, discount_rate)
     json = {"cart_id": cart_id, "total_discount": total_discount}
     return Successfully(data=json, msg="Cart discount applied successfully", code=200)
 
 
+@router.post("/carts/reprice/", response_model=Successfully[RepriceResult])
+def reprice_carts(
+    payload: RepriceRequest,
+    db: Session = Depends(get_db),
+    admin_user: User = Depends(get_admin_user),
+):
+    """Move open cart lines to the current catalogue prices in one batch."""
+    counts = PricingService(db).reprice(
+        payload.product_ids, payload.discount_percentage
+    )
+    return Successfully(
+        data=RepriceResult(**counts), msg="Carts repriced successfully", code=200
+    )
+
+
 # 4. CartLine Endpoints
+@router.post(
+    "/cart-lines/batch/", response_model=Successfully[BatchResult[CartLineSchema]]
+)
+def create_cart_lines_batch(
+    items: List[Any] = Body(..., max_length=settings.BATCH_MAX_ITEMS),
+    store: CartStore = Depends(cart_store),
+):
+    valid, errors = validate_batch(CartLineCreate, items)
+    created = store.add_lines([item.data for item in valid])
+    result = BatchResult[CartLineSchema](succeeded=created, errors=errors)
+    return Successfully(data=result, msg="CartLine batch created", code=201)
+
+
+@router.put(
+    "/cart-lines/batch/", response_model=Successfully[BatchResult[CartLineSchema]]
+)
+def update_cart_lines_batch(
+    items: List[Any] = Body(..., max_length=settings.BATCH_MAX_ITEMS),
+    store: CartStore = Depends(cart_store),
+):
+    valid, errors = validate_batch(CartLineUpdate, items, with_id=True)
+    updated = store.update_lines([(item.id, item.data) for item in valid])
+    errors += batch_not_found_errors(
+        [(item.index, item.id) for item in valid], updated, "CartLine not found"
+    )
+    errors.sort(key=lambda error: error.index)
+    result = BatchResult[CartLineSchema](succeeded=updated, errors=errors)
+    return Successfully(data=result, msg="CartLine batch updated", code=200)
+
+
+@router.delete(
+    "/cart-lines/batch/", response_model=Successfully[BatchResult[CartLineSchema]]
+)
+def delete_cart_lines_batch(
+    payload: BatchDelete, store: CartStore = Depends(cart_store)
+):
+    removed = store.remove_lines(payload.ids)
+    errors = batch_not_found_errors(
+        list(enumerate(payload.ids)), removed, "CartLine not found"
+    )
+    result = BatchResult[CartLineSchema](succeeded=removed, errors=errors)
+    return Successfully(data=result, msg="CartLine batch deleted", code=200)
+
+
 @router.get("/cart-lines/{cart_line_id}", response_model=Successfully[CartLine])
-def get_cart_line(cart_line_id: int, db: Session = Depends(get_db)):
-    service = CartLineService(db)
-    cart_line = service.get(cart_line_id)
+def get_cart_line(cart_line_id: int, store: CartStore = Depends(cart_store)):
+    cart_line = store.get_line(cart_line_id)
     if not cart_line:
         return Failed(msg="CartLine not found", code=404)
     return Successfully(data=cart_line, msg="CartLine retrieved successfully", code=200)
 
 
 @router.get("/cart-lines/", response_model=Successfully[List[CartLine]])
-def get_cart_lines(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def get_cart_lines(
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    fields: Optional[List[str]] = Depends(sparse_fields(CartLineSchema, CartLine)),
+    db: Session = Depends(get_db),
+):
+    cart_store_flusher.flush()
     service = CartLineService(db)
-    obj = service.get_multi(skip, limit)
-    return Successfully(data=obj, msg="CartLines retrieved successfully", code=200)
+    obj, next_cursor = service.paginate(limit, cursor, skip, fields)
+    return Successfully(
+        data=obj if fields else [line_snapshot(line) for line in obj],
+        next_cursor=next_cursor,
+        msg="CartLines retrieved successfully",
+        code=200,
+    )
 
 
 @router.post("/cart-lines/", response_model=Successfully[CartLine])
-def create_cart_line(cart_line: CartLineCreate, db: Session = Depends(get_db)):
-    service = CartLineService(db)
-    obj = service.create(cart_line)
+def create_cart_line(
+    cart_line: CartLineCreate, store: CartStore = Depends(cart_store)
+):
+    obj = store.add_line(cart_line)
     return Successfully(data=obj, msg="CartLine created successfully", code=201)
 
 
 @router.put("/cart-lines/{cart_line_id}", response_model=Successfully[CartLine])
 def update_cart_line(
-    cart_line_id: int, cart_line: CartLineUpdate, db: Session = Depends(get_db)
+    cart_line_id: int,
+    cart_line: CartLineUpdate,
+    store: CartStore = Depends(cart_store),
 ):
-    service = CartLineService(db)
-    db_cart_line = service.get(cart_line_id)
-    if not db_cart_line:
+    obj = store.update_line(cart_line_id, cart_line)
+    if not obj:
         return Failed(msg="CartLine not found", code=404)
-    obj = service.update(db_cart_line, cart_line)
     return Successfully(data=obj, msg="CartLine updated successfully", code=200)
 
 
 @router.delete("/cart-lines/{cart_line_id}", response_model=Successfully[CartLine])
-def delete_cart_line(cart_line_id: int, db: Session = Depends(get_db)):
-    service = CartLineService(db)
-    cart_line = service.remove(cart_line_id)
+def delete_cart_line(cart_line_id: int, store: CartStore = Depends(cart_store)):
+    cart_line = store.remove_line(cart_line_id)
     if not cart_line:
         return Failed(msg="CartLine not found", code=404)
     return Successfully(data=cart_line, msg="CartLine deleted successfully", code=200)
@@ -141,10 +260,9 @@ def delete_cart_line(cart_line_id: int, db: Session = Depends(get_db)):
 
 @router.post("/cart-lines/{cart_line_id}/apply-discount/")
 def apply_cart_line_discount(
-    cart_line_id: int, discount_rate: float, db: Session = Depends(get_db)
+    cart_line_id: int, discount_rate: float, store: CartStore = Depends(cart_store)
 ):
-    service = CartLineService(db)
-    discount = service.apply_discount(cart_line_id, discount_rate)
+    discount = store.apply_line_discount(cart_line_id, discount_rate)
     json = {"cart_line_id": cart_line_id, "discount": discount}
     return Successfully(
         data=json, msg="CartLine discount applied successfully", code=200
@@ -153,9 +271,11 @@ def apply_cart_line_discount(
 
 @router.get("/cart-lines/{cart_line_id}/tax/")
 def get_cart_line_tax(
-    cart_line_id: int, tax_rate: float = 0.07, db: Session = Depends(get_db)
+    cart_line_id: int, tax_rate: float = 0.07, store: CartStore = Depends(cart_store)
 ):
-    service = CartLineService(db)
-    tax = service.calculate_tax(cart_line_id, tax_rate)
+    cart_line = store.get_line(cart_line_id)
+    if not cart_line:
+        return Failed(msg="CartLine not found", code=404)
+    tax = line_tax(cart_line, tax_rate)
     json = {"cart_line_id": cart_line_id, "tax": tax}
     return Successfully(data=json, msg="CartLine tax calculated successfully", code=200)
@@ -1,21 +1,126 @@
-from typing import List
+import io
+from typing import Any, List, Literal, Optional
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Body, Depends, File, UploadFile
 from sqlalchemy.orm import Session
 
+from app.api.deps import get_admin_user
+from app.core.bulk_import import detect_format
 from app.core.db.connect import get_db
+from app.core.projection import sparse_fields
 from app.models.catalogue import Catalogue
-from app.schemas.base import Failed, Successfully
-from app.schemas.catalogue import CatalogueCreate, CatalogueUpdate
+from app.models.user import User
+from app.schemas.base import (
+    BatchDelete,
+    BatchResult,
+    Failed,
+    Successfully,
+    batch_not_found_errors,
+    validate_batch,
+)
+from app.schemas.catalogue import Catalogue as CatalogueSchema
+from app.schemas.catalogue import (
+    CatalogueCreate,
+    CatalogueImportResult,
+    CatalogueSyncResult,
+    CatalogueUpdate,
+    CatalogueUpsert,
+)
 from app.services.catalogue import CatalogueService
+from app.settings import base as settings
 
 router = APIRouter(prefix="/catalogues", tags=["Catalogue"])
 
 
+@router.post(
+    "/catalogues/batch/", response_model=Successfully[BatchResult[CatalogueSchema]]
+)
+def create_catalogues_batch(
+    items: List[Any] = Body(..., max_length=settings.BATCH_MAX_ITEMS),
+    db: Session = Depends(get_db),
+    admin_user: User = Depends(get_admin_user),
+):
+    valid, errors = validate_batch(CatalogueCreate, items)
+    service = CatalogueService(db)
+    created = service.create_many([item.data for item in valid])
+    result = BatchResult[CatalogueSchema](succeeded=created, errors=errors)
+    return Successfully(data=result, msg="Catalogue batch created", code=201)
+
+
+@router.put(
+    "/catalogues/batch/", response_model=Successfully[BatchResult[CatalogueSchema]]
+)
+def update_catalogues_batch(
+    items: List[Any] = Body(..., max_length=settings.BATCH_MAX_ITEMS),
+    db: Session = Depends(get_db),
+    admin_user: User = Depends(get_admin_user),
+):
+    valid, errors = validate_batch(CatalogueUpdate, items, with_id=True)
+    service = CatalogueService(db)
+    updated = service.update_many([(item.id, item.data) for item in valid])
+    errors += batch_not_found_errors(
+        [(item.index, item.id) for item in valid], updated, "Catalogue not found"
+    )
+    errors.sort(key=lambda error: error.index)
+    result = BatchResult[CatalogueSchema](succeeded=updated, errors=errors)
+    return Successfully(data=result, msg="Catalogue batch updated", code=200)
+
+
+@router.delete(
+    "/catalogues/batch/", response_model=Successfully[BatchResult[CatalogueSchema]]
+)
+def delete_catalogues_batch(
+    payload: BatchDelete,
+    db: Session = Depends(get_db),
+    admin_user: User = Depends(get_admin_user),
+):
+    service = CatalogueService(db)
+    removed = service.remove_many(payload.ids)
+    errors = batch_not_found_errors(
+        list(enumerate(payload.ids)), removed, "Catalogue not found"
+    )
+    result = BatchResult[CatalogueSchema](succeeded=removed, errors=errors)
+    return Successfully(data=result, msg="Catalogue batch deleted", code=200)
+
+
+@router.post("/catalogues/sync/", response_model=Successfully[CatalogueSyncResult])
+def sync_catalogues(
+    items: List[Any] = Body(..., max_length=settings.BATCH_MAX_ITEMS),
+    db: Session = Depends(get_db),
+    admin_user: User = Depends(get_admin_user),
+):
+    """Upsert a product feed by SKU; only items whose content changed are written."""
+    valid, errors = validate_batch(CatalogueUpsert, items)
+    service = CatalogueService(db)
+    counts = service.upsert_many([item.data for item in valid])
+    result = CatalogueSyncResult(**counts, errors=errors)
+    return Successfully(data=result, msg="Catalogue synced successfully", code=200)
+
+
+@router.post(
+    "/catalogues/import/", response_model=Successfully[CatalogueImportResult]
+)
+def import_catalogues(
+    file: UploadFile = File(...),
+    format: Optional[Literal["csv", "ndjson"]] = None,
+    db: Session = Depends(get_db),
+    admin_user: User = Depends(get_admin_user),
+):
+    """Stream a CSV/NDJSON upload into the catalogue; existing SKUs are skipped."""
+    format = format or detect_format(file.filename or "")
+    # sync def: FastAPI รันใน threadpool จึงอ่าน file.file แบบ blocking ได้
+    stream = io.TextIOWrapper(file.file, encoding="utf-8", newline="")
+    try:
+        result = CatalogueService(db).import_stream(stream, format)
+    finally:
+        stream.detach()
+    return Successfully(data=result, msg="Catalogue imported successfully", code=200)
+
+
 @router.get("/catalogues/{catalogue_id}", response_model=Successfully[Catalogue])
 def get_catalogue(catalogue_id: int, db: Session = Depends(get_db)):
     service = CatalogueService(db)
-    catalogue = service.get(catalogue_id)
+    catalogue = service.get(catalogue_id, read_only=True)
     if not catalogue:
         return Failed(code=404, msg="Catalogue not found")
     return Successfully(
@@ -24,10 +129,21 @@ def get_catalogue(catalogue_id: int, db: Session = Depends(get_db)):
 
 
 @router.get("/catalogues/", response_model=Successfully[List[Catalogue]])
-def get_catalogues(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def get_catalogues(
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    fields: Optional[List[str]] = Depends(sparse_fields(CatalogueSchema, Catalogue)),
+    db: Session = Depends(get_db),
+):
     service = CatalogueService(db)
-    obj = service.get_multi(skip, limit)
-    return Successfully(data=obj, msg="Catalogues retrieved successfully", code=200)
+    obj, next_cursor = service.paginate(limit, cursor, skip, fields)
+    return Successfully(
+        data=obj,
+        next_cursor=next_cursor,
+        msg="Catalogues retrieved successfully",
+        code=200,
+    )
 
 
 @router.post("/catalogues/", response_model=Successfully[Catalogue])
@@ -1,21 +1,92 @@
-from typing import List
+from typing import Any, List, Optional
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Body, Depends
 from sqlalchemy.orm import Session
 
 from app.core.db.connect import get_db
+from app.core.projection import sparse_fields
 from app.models.checkout import Checkout
+from app.schemas.checkout import Checkout as CheckoutSchema
 from app.schemas.checkout import CheckoutCreate, CheckoutUpdate
-from app.services.checkout import CheckoutService
-from app.schemas.base import Failed, Successfully
+from app.schemas.inventory import ReservationCreate
+from app.schemas.inventory import StockReservation as StockReservationSchema
+from app.services.checkout import SETTLEMENT_STATUSES, CheckoutService
+from app.services.inventory import InventoryService
+from app.schemas.base import (
+    BatchDelete,
+    BatchError,
+    BatchResult,
+    Failed,
+    Successfully,
+    batch_not_found_errors,
+    validate_batch,
+)
+from app.settings import base as settings
 
 router = APIRouter(prefix="/checkouts", tags=["Checkout"])
 
 
+@router.post(
+    "/checkouts/batch/", response_model=Successfully[BatchResult[CheckoutSchema]]
+)
+def create_checkouts_batch(
+    items: List[Any] = Body(..., max_length=settings.BATCH_MAX_ITEMS),
+    db: Session = Depends(get_db),
+):
+    valid, errors = validate_batch(CheckoutCreate, items)
+    service = CheckoutService(db)
+    created = service.create_many([item.data for item in valid])
+    result = BatchResult[CheckoutSchema](succeeded=created, errors=errors)
+    return Successfully(data=result, msg="Checkout batch created", code=201)
+
+
+@router.put(
+    "/checkouts/batch/", response_model=Successfully[BatchResult[CheckoutSchema]]
+)
+def update_checkouts_batch(
+    items: List[Any] = Body(..., max_length=settings.BATCH_MAX_ITEMS),
+    db: Session = Depends(get_db),
+):
+    valid, errors = validate_batch(CheckoutUpdate, items, with_id=True)
+    # update_many ไม่ settle stock: status ที่ต้อง settle ต้องใช้ PUT ทีละรายการ
+    allowed = []
+    for item in valid:
+        if (
+            "status" in item.data.model_fields_set
+            and item.data.status in SETTLEMENT_STATUSES
+        ):
+            msg = f"Status '{item.data.status}' must be set with PUT /checkouts/{{id}}"
+            errors.append(BatchError(index=item.index, msg=msg))
+        else:
+            allowed.append(item)
+    valid = allowed
+    service = CheckoutService(db)
+    updated = service.update_many([(item.id, item.data) for item in valid])
+    errors += batch_not_found_errors(
+        [(item.index, item.id) for item in valid], updated, "Checkout not found"
+    )
+    errors.sort(key=lambda error: error.index)
+    result = BatchResult[CheckoutSchema](succeeded=updated, errors=errors)
+    return Successfully(data=result, msg="Checkout batch updated", code=200)
+
+
+@router.delete(
+    "/checkouts/batch/", response_model=Successfully[BatchResult[CheckoutSchema]]
+)
+def delete_checkouts_batch(payload: BatchDelete, db: Session = Depends(get_db)):
+    service = CheckoutService(db)
+    removed = service.remove_many(payload.ids)
+    errors = batch_not_found_errors(
+        list(enumerate(payload.ids)), removed, "Checkout not found"
+    )
+    result = BatchResult[CheckoutSchema](succeeded=removed, errors=errors)
+    return Successfully(data=result, msg="Checkout batch deleted", code=200)
+
+
 @router.get("/checkouts/{checkout_id}", response_model=Successfully[Checkout])
 def get_checkout(checkout_id: int, db: Session = Depends(get_db)):
     service = CheckoutService(db)
-    checkout = service.get(checkout_id)
+    checkout = service.get(checkout_id, read_only=True)
     if not checkout:
         return Failed(code=404, msg="Checkout not found")
     return Successfully(
@@ -24,10 +95,21 @@ def get_checkout(checkout_id: int, db: Session = Depends(get_db)):
 
 
 @router.get("/checkouts/", response_model=Successfully[List[Checkout]])
-def get_checkouts(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def get_checkouts(
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    fields: Optional[List[str]] = Depends(sparse_fields(CheckoutSchema, Checkout)),
+    db: Session = Depends(get_db),
+):
     service = CheckoutService(db)
-    obj = service.get_multi(skip, limit)
-    return Successfully(data=obj, msg="Checkouts retrieved successfully", code=200)
+    obj, next_cursor = service.paginate(limit, cursor, skip, fields)
+    return Successfully(
+        data=obj,
+        next_cursor=next_cursor,
+        msg="Checkouts retrieved successfully",
+        code=200,
+    )
 
 
 @router.post("/checkouts/", response_model=Successfully[Checkout])
@@ -56,3 +138,30 @@ def delete_checkout(checkout_id: int, db: Session = Depends(get_db)):
     if not checkout:
         return Failed(code=404, msg="Checkout not found")
     return Successfully(data=checkout, msg="Checkout deleted successfully", code=200)
+
+
+@router.post(
+    "/checkouts/{checkout_id}/reservations/",
+    response_model=Successfully[List[StockReservationSchema]],
+)
+def reserve_checkout_stock(
+    checkout_id: int, reservation: ReservationCreate, db: Session = Depends(get_db)
+):
+    if not CheckoutService(db).get(checkout_id):
+        return Failed(code=404, msg="Checkout not found")
+    service = InventoryService(db)
+    reservations = service.reserve(
+        reservation.items, checkout_id=checkout_id, ttl_seconds=reservation.ttl_seconds
+    )
+    data = [StockReservationSchema.model_validate(row) for row in reservations]
+    return Successfully(data=data, msg="Stock reserved successfully", code=201)
+
+
+@router.delete("/checkouts/{checkout_id}/reservations/")
+def release_checkout_stock(checkout_id: int, db: Session = Depends(get_db)):
+    if not CheckoutService(db).get(checkout_id):
+        return Failed(code=404, msg="Checkout not found")
+    service = InventoryService(db)
+    released = service.release(checkout_id)
+    json = {"checkout_id": checkout_id, "released": released}
+    return Successfully(data=json, msg="Stock released successfully", code=200)
@@ -0,0 +1,68 @@
+from typing import List, Literal, Optional
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+from app.api.deps import get_admin_user
+from app.core.db.connect import get_db
+from app.core.export import EXPORT_MEDIA_TYPES, iter_export
+from app.core.projection import selectable_fields, sparse_fields
+from app.models.catalogue import Catalogue
+from app.models.order import Order
+from app.models.user import User
+from app.schemas.catalogue import Catalogue as CatalogueSchema
+from app.schemas.order import Order as OrderSchema
+from app.schemas.user import UserResponse
+from app.services.base import BaseService
+from app.services.catalogue import CatalogueService
+from app.services.order import OrderService
+from app.services.user import UserService
+
+router = APIRouter(prefix="/exports", tags=["Export"])
+
+ExportFormat = Literal["ndjson", "csv"]
+
+
+def _export_response(
+    service: BaseService, fields: List[str], format: str, name: str
+) -> StreamingResponse:
+    """Stream the whole table through one server-side cursor."""
+    return StreamingResponse(
+        iter_export(service.stream(fields), fields, format),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{format}"'},
+    )
+
+
+@router.get("/catalogues")
+def export_catalogues(
+    format: ExportFormat = "ndjson",
+    fields: Optional[List[str]] = Depends(sparse_fields(CatalogueSchema, Catalogue)),
+    db: Session = Depends(get_db),
+    admin_user: User = Depends(get_admin_user),
+):
+    fields = fields or selectable_fields(CatalogueSchema, Catalogue)
+    return _export_response(CatalogueService(db), fields, format, "catalogues")
+
+
+@router.get("/orders")
+def export_orders(
+    format: ExportFormat = "ndjson",
+    fields: Optional[List[str]] = Depends(sparse_fields(OrderSchema, Order)),
+    db: Session = Depends(get_db),
+    admin_user: User = Depends(get_admin_user),
+):
+    fields = fields or selectable_fields(OrderSchema, Order)
+    return _export_response(OrderService(db), fields, format, "orders")
+
+
+@router.get("/users")
+def export_users(
+    format: ExportFormat = "ndjson",
+    fields: Optional[List[str]] = Depends(sparse_fields(UserResponse, User)),
+    db: Session = Depends(get_db),
+    admin_user: User = Depends(get_admin_user),
+):
+    fields = fields or selectable_fields(UserResponse, User)
+    return _export_response(UserService(db), fields, format, "users")
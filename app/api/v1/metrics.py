@@ -0,0 +1,44 @@
+from fastapi import APIRouter, Depends
+
+from app.api.deps import get_admin_user
+from app.core.auth_handler import get_jwt_cache_stats
+from app.core.db.connect import (
+    get_async_engine,
+    get_async_replica_engines,
+    get_engine,
+    get_replica_engines,
+)
+from app.core.db.pool import get_pool_metrics
+from app.core.security import password_hasher
+from app.models.user import User
+from app.schemas.base import Successfully
+
+router = APIRouter(prefix="/metrics", tags=["Metrics"])
+
+
+@router.get("/db-pool", response_model=Successfully[dict])
+def get_db_pool_metrics(admin_user: User = Depends(get_admin_user)):
+    """Checked-out, overflow and checkout wait counters for the connection pools."""
+    data = {
+        "sync": get_pool_metrics(get_engine()),
+        "async": get_pool_metrics(get_async_engine()),
+        "replicas": [get_pool_metrics(engine) for engine in get_replica_engines()],
+        "async_replicas": [
+            get_pool_metrics(engine) for engine in get_async_replica_engines()
+        ],
+    }
+    return Successfully(data=data, msg="Database pool metrics", code=200)
+
+
+@router.get("/password-hasher", response_model=Successfully[dict])
+def get_password_hasher_metrics(admin_user: User = Depends(get_admin_user)):
+    """Worker, in-flight and queue-depth counters for the bcrypt pool."""
+    return Successfully(
+        data=password_hasher.metrics(), msg="Password hasher metrics", code=200
+    )
+
+
+@router.get("/jwt-cache", response_model=Successfully[dict])
+def get_jwt_cache_metrics(admin_user: User = Depends(get_admin_user)):
+    """Size and hit-ratio counters for the verified-JWT cache."""
+    return Successfully(data=get_jwt_cache_stats(), msg="JWT cache metrics", code=200)
@@ -1,8 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, Request
-from sqlalchemy.orm import Session
+from typing import List, Optional
 
-from app.core.db.connect import get_db
-from app.models.user import User, UserRole
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.deps import get_admin_user, get_current_user
+from app.core.db.connect import get_async_db
+from app.core.projection import sparse_fields
+from app.models.user import User
 from app.schemas.base import Failed, Successfully
 from app.schemas.user import UserResponse, UserUpdate
 from app.services.user import UserService
@@ -10,48 +14,29 @@ from app.services.user import UserService
 router = APIRouter(prefix="/users", tags=["Users"])
 
 
-def get_current_user(request: Request) -> User:
-    """Dependency to get the current user from request.state."""
-    user = request.state.user
-    if not user:
-        raise HTTPException(status_code=401, detail="Authentication required")
-    return user
-
-
-def get_admin_user(current_user: User = Depends(get_current_user)) -> User:
-    """Dependency to ensure the user is an admin."""
-    if bool(current_user.role) != UserRole.ADMIN:
-        raise HTTPException(status_code=403, detail="Admin access required")
-    return current_user
-
-
 @router.get("/me", response_model=Successfully[UserResponse])
 async def get_current_user_profile(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
 ):
     """Get the profile of the currently authenticated user."""
-    user_service = UserService(db)
-    user = user_service.get(int(current_user.id))
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
+    # JWTMiddleware โหลด user มาแล้วใน session ของ request ไม่ต้อง query ซ้ำ
     return Successfully(
         status="success",
         code=200,
         msg="User profile retrieved successfully",
-        data=UserResponse.from_orm(user),
+        data=UserResponse.from_orm(current_user),
     )
 
 
 @router.get("/{user_id}", response_model=Successfully[UserResponse])
 async def get_user_by_id(
     user_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     admin_user: User = Depends(get_admin_user),
 ):
     """Get a user's profile by ID (admin only)."""
     user_service = UserService(db)
-    user = user_service.get(user_id)
+    user = await user_service.async_get(user_id, read_only=True)
     if not user:
         return Failed(status="fail", code=404, msg="User not found")
     return Successfully(
@@ -66,17 +51,25 @@ async def get_user_by_id(
 async def get_all_users(
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = None,
+    fields: Optional[List[str]] = Depends(sparse_fields(UserResponse, User)),
+    db: AsyncSession = Depends(get_async_db),
     admin_user: User = Depends(get_admin_user),
 ):
-    """Get all users with pagination (admin only)."""
+    """Get all users with keyset pagination (admin only).
+
+    ``fields`` limits each item to the listed columns.
+    """
     user_service = UserService(db)
-    users = user_service.get_multi(skip=skip, limit=limit)
+    users, next_cursor = await user_service.async_paginate(
+        limit=limit, cursor=cursor, skip=skip, fields=fields
+    )
     return Successfully(
         status="success",
         code=200,
         msg="Users retrieved successfully",
-        data=[UserResponse.from_orm(user) for user in users],
+        data=users if fields else [UserResponse.from_orm(user) for user in users],
+        next_cursor=next_cursor,
     )
 
 
@@ -84,11 +77,15 @@ async def get_all_users(
 async def update_current_user(
     user_update: UserUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Update the profile of the currently authenticated user."""
     user_service = UserService(db)
-    updated_user = user_service.update(current_user, user_update)
+    # current_user อยู่ใน sync session ของ middleware โหลดใหม่ใน async session ก่อนแก้
+    user = await user_service.async_get(current_user.id)
+    if not user:
+        return Failed(status="fail", code=404, msg="User not found")
+    updated_user = await user_service.async_update(user, user_update)
     return Successfully(
         status="success",
         code=200,
@@ -101,15 +98,15 @@ async def update_current_user(
 async def update_user_by_id(
     user_id: int,
     user_update: UserUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     admin_user: User = Depends(get_admin_user),
 ):
     """Update a user by ID (admin only)."""
     user_service = UserService(db)
-    user = user_service.get(user_id)
+    user = await user_service.async_get(user_id)
     if not user:
         return Failed(status="fail", code=404, msg="User not found")
-    updated_user = user_service.update(user, user_update)
+    updated_user = await user_service.async_update(user, user_update)
     return Successfully(
         status="success",
         code=200,
@@ -121,11 +118,11 @@ async def update_user_by_id(
 @router.delete("/me", response_model=Successfully[None])
 async def delete_current_user(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Delete the currently authenticated user."""
     user_service = UserService(db)
-    user_service.remove(current_user.id)
+    await user_service.async_remove(current_user.id)
     return Successfully(
         status="success",
         code=200,
@@ -137,12 +134,12 @@ async def delete_current_user(
 @router.delete("/{user_id}", response_model=Successfully[None])
 async def delete_user_by_id(
     user_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     admin_user: User = Depends(get_admin_user),
 ):
     """Delete a user by ID (admin only)."""
     user_service = UserService(db)
-    user = user_service.remove(user_id)
+    user = await user_service.async_remove(user_id)
     if not user:
         return Failed(status="fail", code=404, msg="User not found")
     return Successfully(
@@ -156,16 +153,16 @@ async def delete_user_by_id(
 @router.post("/{user_id}/verify", response_model=Successfully[UserResponse])
 async def verify_user(
     user_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     admin_user: User = Depends(get_admin_user),
 ):
     """Mark a user as verified (admin only)."""
     user_service = UserService(db)
-    user = user_service.get(user_id)
+    user = await user_service.async_get(user_id)
     if not user:
         return Failed(status="fail", code=404, msg="User not found")
     user_update = UserUpdate(is_verified=True)
-    updated_user = user_service.update(user, user_update)
+    updated_user = await user_service.async_update(user, user_update)
     return Successfully(
         status="success",
         code=200,
@@ -0,0 +1,109 @@
+import argparse
+import sys
+
+from app.core.db.connect import Base, SessionLocal, get_engine
+from app.core.db.schema import apply_schema, is_schema_current, schema_fingerprint
+from app.core.bulk_import import IMPORT_FORMATS, detect_format
+from app.services.cart import CartService
+from app.services.catalogue import CatalogueService
+from app.services.inventory import InventoryService
+from app.services.pricing import PricingService
+
+import app.models  # noqa: F401  ลงทะเบียนทุก model กับ Base.metadata
+
+
+def schema_command(args) -> int:
+    engine = get_engine()
+    if args.action == "check":
+        if is_schema_current(engine, Base.metadata):
+            print(f"Schema is up to date ({schema_fingerprint(Base.metadata)})")
+            return 0
+        print("Schema is out of date, run: python -m app.cli schema apply")
+        return 1
+    if apply_schema(engine, Base.metadata):
+        print(f"Schema applied ({schema_fingerprint(Base.metadata)})")
+    else:
+        print("Schema already up to date")
+    return 0
+
+
+def inventory_command(args) -> int:
+    with SessionLocal() as db:
+        released = InventoryService(db).release_expired()
+    print(f"Released {released} expired reservations")
+    return 0
+
+
+def catalogue_command(args) -> int:
+    format = args.format or detect_format(args.path)
+    with open(args.path, encoding="utf-8", newline="") as stream, SessionLocal() as db:
+        result = CatalogueService(db).import_stream(stream, format)
+    print(
+        f"Processed {result.processed}: {result.inserted} inserted, "
+        f"{result.skipped} skipped, {result.invalid} invalid"
+    )
+    for error in result.errors:
+        print(f"  line {error.line}: {error.msg}", file=sys.stderr)
+    return 1 if result.invalid else 0
+
+
+def carts_command(args) -> int:
+    if args.action == "reprice":
+        with SessionLocal() as db:
+            counts = PricingService(db).reprice(args.product, args.discount)
+        print(f"Repriced {counts['lines']} lines in {counts['carts']} carts")
+        return 0
+    with SessionLocal() as db:
+        service = CartService(db)
+        if args.action == "check":
+            drifted = service.find_drift()
+        else:
+            drifted = service.repair_drift()
+    for row in drifted:
+        print(
+            f"cart {row['cart_id']}: stored {row['total_amount']:.2f}, "
+            f"expected {row['expected_total_amount']:.2f}"
+        )
+    if args.action == "check":
+        print(f"{len(drifted)} carts with drifted totals")
+        return 1 if drifted else 0
+    print(f"Repaired {len(drifted)} carts")
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    schema = commands.add_parser("schema", help="Check or apply the database schema")
+    schema.add_argument("action", choices=["check", "apply"])
+    schema.set_defaults(func=schema_command)
+
+    inventory = commands.add_parser("inventory", help="Maintain stock reservations")
+    inventory.add_argument("action", choices=["release-expired"])
+    inventory.set_defaults(func=inventory_command)
+
+    catalogue = commands.add_parser("catalogue", help="Bulk catalogue operations")
+    catalogue.add_argument("action", choices=["import"])
+    catalogue.add_argument("path", help="CSV or NDJSON file")
+    catalogue.add_argument(
+        "--format", choices=IMPORT_FORMATS, help="Default: from the file extension"
+    )
+    catalogue.set_defaults(func=catalogue_command)
+
+    carts = commands.add_parser("carts", help="Check, repair or reprice cart totals")
+    carts.add_argument("action", choices=["check", "repair", "reprice"])
+    carts.add_argument(
+        "--product", type=int, action="append", help="Reprice only this product id"
+    )
+    carts.add_argument(
+        "--discount", type=float, help="Reprice with this discount percentage"
+    )
+    carts.set_defaults(func=carts_command)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,19 +4,39 @@ import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine, text
 from sqlalchemy.exc import ProgrammingError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import Session, session, sessionmaker
+from sqlalchemy.pool import NullPool
 
-from app.core.db.connect import Base, get_database_url, get_db
+from app import settings
+from app.core.db.connect import Base, get_async_db, get_database_url, get_db
+from app.core.db.instrumentation import instrument_engine
 from app.factory.address import AddressFactory
 from app.factory.user import UserFactory
 from app.main import app
 
+# request ไหนยิง query เกินนี้ถือว่าเป็น N+1 และ test จะ fail
+TEST_QUERY_BUDGET = 25
+
 TEST_SQLALCHEMY_DATABASE_URL = get_database_url(True)
 admin_engine = create_engine(get_database_url(True), isolation_level="AUTOCOMMIT")
 
 # Create an engine and sessionmaker bound to the test database
 engine = create_engine(TEST_SQLALCHEMY_DATABASE_URL)
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+TestingSessionLocal = sessionmaker(
+    autocommit=False, autoflush=False, expire_on_commit=False, bind=engine
+)
+
+# NullPool: TestClient อาจสร้าง event loop ใหม่ ห้ามใช้ connection ข้าม loop
+async_engine = create_async_engine(
+    get_database_url(True, is_async=True), poolclass=NullPool
+)
+TestingAsyncSessionLocal = async_sessionmaker(
+    autoflush=False, expire_on_commit=False, bind=async_engine
+)
+# นับ query ของ engine ที่ test ใช้ด้วย ไม่อย่างนั้น TEST_QUERY_BUDGET ไม่มีผล
+instrument_engine(engine)
+instrument_engine(async_engine)
 
 
 def create_test_database():
@@ -68,12 +88,25 @@ def client(db: session) -> Generator[TestClient, None, None]:
     def override_get_db():
         yield db
 
+    async def override_get_async_db():
+        async with TestingAsyncSessionLocal() as async_db:
+            yield async_db
+
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
     with TestClient(app) as c:
         yield c
     app.dependency_overrides.clear()
 
 
+@pytest.fixture(autouse=True)
+def query_budget_guard(monkeypatch):
+    """Fail any request that issues more than TEST_QUERY_BUDGET queries."""
+    monkeypatch.setattr(
+        settings, "QUERY_BUDGET", settings.QUERY_BUDGET or TEST_QUERY_BUDGET
+    )
+
+
 @pytest.fixture(autouse=True)
 def set_session_for_factories(db: Session):
     UserFactory._meta.sqlalchemy_session = db
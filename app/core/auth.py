@@ -1,43 +1,72 @@
 from fastapi import Request
 from fastapi.security.utils import get_authorization_scheme_param
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.types import ASGIApp, Receive, Scope, Send
 
 from app.core.auth_handler import decode_jwt
-from app.core.db.connect import SessionLocal
+from app.core.db.connect import close_request_db, get_request_db
 from app.core.exceptions import AuthenticationError
+from app.core.handlers import authentication_error_handler
+from app.core.revocation import revocation_list
+from app.core.user_cache import user_cache
 from app.models.user import User
 
 
-class JWTMiddleware(BaseHTTPMiddleware):
-    """Middleware to authenticate requests using JWT and attach user to request state."""
+class JWTMiddleware:
+    """ASGI middleware to authenticate requests using JWT and attach user to request state."""
 
-    async def dispatch(self, request: Request, call_next):
-        """Process the request and attach authenticated user to request.state."""
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request = Request(scope)
         request.state.user = None  # Default to no user
+        try:
+            try:
+                self.authenticate(request)
+            except AuthenticationError as e:
+                response = await authentication_error_handler(request, e)
+                await response(scope, receive, send)
+                return
+            await self.app(scope, receive, send)
+        finally:
+            close_request_db(request)
 
+    def authenticate(self, request: Request) -> None:
+        """Attach the bearer token's user to request.state."""
         auth_header = request.headers.get("Authorization")
-        if auth_header:
-            scheme, token = get_authorization_scheme_param(auth_header)
-            if scheme.lower() == "bearer":
-                with SessionLocal() as db:
-                    try:
-                        payload = decode_jwt(token)
-                        if not payload:
-                            raise AuthenticationError("Invalid token", status_code=401)
-
-                        username = payload.get("sub")
-                        if not username:
-                            raise AuthenticationError(
-                                "Invalid token payload", status_code=401
-                            )
-
-                        user = db.query(User).filter(User.username == username).first()
-                        if not user:
-                            raise AuthenticationError("User not found", status_code=403)
-
-                        request.state.user = user
-                    except AuthenticationError as e:
-                        raise e
-
-        response = await call_next(request)
-        return response
+        if not auth_header:
+            return
+        scheme, token = get_authorization_scheme_param(auth_header)
+        if scheme.lower() != "bearer":
+            return
+
+        payload = decode_jwt(token)
+        if not payload:
+            raise AuthenticationError("Invalid token", status_code=401)
+
+        user_id = payload.get("id")
+        if not user_id:
+            raise AuthenticationError("Invalid token payload", status_code=401)
+
+        # ใช้ session เดียวกับ get_db ของ handler
+        db = get_request_db(request)
+        if revocation_list.is_revoked(payload.get("jti"), db):
+            raise AuthenticationError("Token has been revoked", status_code=401)
+
+        user = user_cache.get(user_id)
+        if user is not None:
+            # instance จาก cache เป็น detached: merge โดยไม่ SELECT ซ้ำ
+            user = db.merge(user, load=False)
+        else:
+            user = db.query(User).filter(User.id == int(user_id)).first()
+            if not user:
+                raise AuthenticationError("User not found", status_code=403)
+            user_cache.set(user_id, user)
+        if revocation_list.is_revoked_for_user(payload, user):
+            raise AuthenticationError("Token has been revoked", status_code=401)
+
+        request.state.user = user
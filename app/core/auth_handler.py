@@ -1,35 +1,71 @@
 from datetime import datetime, timedelta
+import hashlib
 import time
+import uuid
 
 import jwt
 
+from app.core.cache import TTLCache
 from app.settings.base import (
     JWT_ALGORITHM,
+    JWT_CACHE_MAXSIZE,
+    JWT_CACHE_TTL,
     JWT_SECRET,
     ACCESS_TOKEN_EXPIRE_MINUTES,
     REFRESH_TOKEN_EXPIRE_DAYS,
 )
 
+# token digest -> claims ที่ verify แล้ว (TTL ไม่เกิน exp ของ token)
+_verified_tokens = TTLCache(maxsize=JWT_CACHE_MAXSIZE, ttl=JWT_CACHE_TTL)
+
 
 def sign_jwt(user_id: str, exp: timedelta = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)) -> str:
+    now = datetime.utcnow()
     payload = {
         "id": user_id,
-        "exp": datetime.utcnow() + exp,
+        # iat แบบมีเศษวินาที เทียบกับ tokens_valid_after ได้แม้อยู่ในวินาทีเดียวกัน
+        "iat": time.time(),
+        "exp": now + exp,
+        "jti": uuid.uuid4().hex,
     }
     token = jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
     return token
 
 
 def sign_refresh_token(user_id: str) -> str:
-    expire = datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
-    payload = {"id": user_id, "exp": expire}
+    now = datetime.utcnow()
+    expire = now + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+    payload = {
+        "id": user_id,
+        "iat": time.time(),
+        "exp": expire,
+        "jti": uuid.uuid4().hex,
+    }
     refresh_token = jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
     return refresh_token
 
 
 def decode_jwt(token: str) -> dict:
+    """Verify a token and return its claims, or {} when invalid or expired.
+
+    Verified claims are cached by token digest until the token's ``exp``, so
+    a token presented again skips signature verification and JSON decoding.
+    """
+    key = hashlib.sha256(token.encode()).digest()
+    cached = _verified_tokens.get(key)
+    if cached is not None:
+        return dict(cached)
     try:
         decoded_token = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-        return decoded_token if decoded_token["expires"] >= time.time() else {}
     except Exception:
         return {}
+    ttl = JWT_CACHE_TTL
+    if "exp" in decoded_token:
+        ttl = min(ttl, decoded_token["exp"] - time.time())
+    if ttl > 0:
+        _verified_tokens.set(key, decoded_token, ttl=ttl)
+    return dict(decoded_token)
+
+
+def get_jwt_cache_stats() -> dict:
+    return _verified_tokens.stats()
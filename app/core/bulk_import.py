@@ -0,0 +1,58 @@
+import csv
+import json
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, TextIO
+
+IMPORT_FORMATS = ("csv", "ndjson")
+
+
+class ImportRecord(NamedTuple):
+    line: int
+    data: Optional[Dict[str, Any]]
+    error: Optional[str] = None
+
+
+def detect_format(filename: str, default: str = "csv") -> str:
+    """Pick the import format from a file extension."""
+    name = filename.lower()
+    if name.endswith((".ndjson", ".jsonl", ".json")):
+        return "ndjson"
+    if name.endswith(".csv"):
+        return "csv"
+    return default
+
+
+def _iter_csv(stream: TextIO) -> Iterator[ImportRecord]:
+    reader = csv.DictReader(stream)
+    for row in reader:
+        # ช่องว่างใน CSV หมายถึงไม่มีค่า ไม่ใช่ string ว่าง
+        data = {key: (value if value != "" else None) for key, value in row.items()}
+        yield ImportRecord(reader.line_num, data)
+
+
+def _iter_ndjson(stream: TextIO) -> Iterator[ImportRecord]:
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError as e:
+            yield ImportRecord(line_number, None, f"Invalid JSON: {e}")
+            continue
+        if not isinstance(data, dict):
+            yield ImportRecord(line_number, None, "Line must be a JSON object")
+            continue
+        yield ImportRecord(line_number, data)
+
+
+def iter_records(stream: TextIO, format: str) -> Iterator[ImportRecord]:
+    """Read records one at a time; the file is never held in memory."""
+    if format == "ndjson":
+        return _iter_ndjson(stream)
+    return _iter_csv(stream)
+
+
+def iter_chunks(records: Iterable[ImportRecord], size: int) -> Iterator[List[ImportRecord]]:
+    iterator = iter(records)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
@@ -10,7 +10,7 @@ from app.core.handlers import (
     http_exception_handler,
     validation_exception_handler,
 )
-from app.core.middleware import log_request_middleware
+from app.core.middleware import RequestLogMiddleware
 from .exceptions import AuthenticationError, DatabaseError
 
 
@@ -29,7 +29,7 @@ def configure_middleware(app: FastAPI) -> None:
         allow_headers=["*"],
     )
     app.add_middleware(JWTMiddleware)
-    app.middleware("http")(log_request_middleware)
+    app.add_middleware(RequestLogMiddleware)
 
 
 def configure_exception_handlers(app: FastAPI) -> None:
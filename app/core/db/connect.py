@@ -1,36 +1,103 @@
-from typing import Generator
+from typing import AsyncGenerator, Generator, List
 
+from fastapi import Request
 from sqlalchemy import Column, DateTime, Engine, create_engine
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 from sqlalchemy.sql import func
 
+from app.core.db.instrumentation import instrument_engine
+from app.core.db.pool import get_pool_options
+from app.core.db.routing import ReplicaSet, RoutingSession
 from app.settings.db import DATABASES
 
+# Driver ที่ใช้กับ engine แบบ sync และ async ของแต่ละฐานข้อมูล
+SYNC_DRIVERS = {
+    "mysql": "mysql+pymysql",
+    "postgresql": "postgresql",
+    "sqlite": "sqlite",
+}
+ASYNC_DRIVERS = {
+    "mysql": "mysql+aiomysql",
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
 
-def get_database_url(is_test=False):
-    db_config = DATABASES["default"]
+
+def build_database_url(db_config: dict, is_test=False, is_async=False) -> str:
     engine = db_config["ENGINE"].lower()
-    name = db_config["NAME"] if not is_test else "test_db"
+    name = db_config["NAME"] if not is_test else db_config.get("TEST_NAME", "test_db")
     user = db_config.get("USER")
     password = db_config.get("PASSWORD")
     host = db_config.get("HOST", "localhost")
     port = db_config.get("PORT")
 
-    if engine == "mysql":
-        return f"mysql+pymysql://{user}:{password}@{host}:{port}/{name}"
-    elif engine == "postgresql":
-        return f"postgresql://{user}:{password}@{host}:{port}/{name}"
-    elif engine == "sqlite":
-        return f"sqlite:///{name}.db"
-    else:
+    drivers = ASYNC_DRIVERS if is_async else SYNC_DRIVERS
+    if engine not in drivers:
         raise ValueError(f"Unsupported ENGINE: {engine}")
+    driver = drivers[engine]
+
+    if engine == "sqlite":
+        return f"{driver}:///{name}.db"
+    return f"{driver}://{user}:{password}@{host}:{port}/{name}"
+
+
+def get_database_url(is_test=False, is_async=False):
+    return build_database_url(DATABASES["default"], is_test, is_async)
+
+
+def get_replica_configs(alias: str = "default") -> List[dict]:
+    """Merge each REPLICAS entry over its primary config."""
+    primary = DATABASES[alias]
+    return [{**primary, **replica} for replica in primary.get("REPLICAS", [])]
 
 
 # สร้างการเชื่อมต่อ
 DATABASE_URL = get_database_url()
-_engine = create_engine(DATABASE_URL, echo=True)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=_engine)
+ASYNC_DATABASE_URL = get_database_url(is_async=True)
+_engine = create_engine(
+    DATABASE_URL,
+    echo=DATABASES["default"].get("ECHO", False),
+    **get_pool_options(DATABASES["default"]),
+)
+_async_engine = create_async_engine(
+    ASYNC_DATABASE_URL, **get_pool_options(DATABASES["default"], is_async=True)
+)
+_replica_engines = [
+    create_engine(build_database_url(config), **get_pool_options(config))
+    for config in get_replica_configs()
+]
+_async_replica_engines = [
+    create_async_engine(
+        build_database_url(config, is_async=True),
+        **get_pool_options(config, is_async=True),
+    )
+    for config in get_replica_configs()
+]
+for _instrumented in [_engine, _async_engine, *_replica_engines, *_async_replica_engines]:
+    instrument_engine(_instrumented)
+
+SessionLocal = sessionmaker(
+    class_=RoutingSession,
+    autocommit=False,
+    autoflush=False,
+    expire_on_commit=False,
+    bind=_engine,
+    replicas=ReplicaSet(_replica_engines),
+)
+AsyncSessionLocal = async_sessionmaker(
+    sync_session_class=RoutingSession,
+    autoflush=False,
+    expire_on_commit=False,
+    bind=_async_engine,
+    replicas=ReplicaSet([engine.sync_engine for engine in _async_replica_engines]),
+)
 Base = declarative_base()
 
 
@@ -38,16 +105,55 @@ def get_engine() -> Engine:
     return _engine
 
 
+def get_async_engine() -> AsyncEngine:
+    return _async_engine
+
+
+def get_replica_engines() -> List[Engine]:
+    return _replica_engines
+
+
+def get_async_replica_engines() -> List[AsyncEngine]:
+    return _async_replica_engines
+
+
+def get_request_db(request: Request) -> Session:
+    """Return the session of this request, opening it on first use.
+
+    JWTMiddleware and get_db share it, so a request checks out at most one
+    connection. The middleware closes it once the response is sent.
+    """
+    db = getattr(request.state, "db", None)
+    if db is None:
+        db = SessionLocal()
+        request.state.db = db
+    return db
+
+
+def close_request_db(request: Request) -> None:
+    db = getattr(request.state, "db", None)
+    if db is not None:
+        db.close()
+        request.state.db = None
+
+
 # Dependency สำหรับ FastAPI
-def get_db() -> Generator:
-    db = SessionLocal()
-    try:
+def get_db(request: Request) -> Generator:
+    yield get_request_db(request)
+
+
+# Dependency สำหรับ handler แบบ async ที่ไม่ต้องการบล็อก event loop
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 
 class BaseModel(Base):
     __abstract__ = True
+    # ดึง server default (id, created_at, updated_at) กลับมาด้วย RETURNING ตอน flush
+    __mapper_args__ = {"eager_defaults": True}
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # server_default ทำให้ INSERT ได้ค่ากลับมาใน RETURNING แทนการ SELECT ตามหลัง
+    updated_at = Column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
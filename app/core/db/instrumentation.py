@@ -0,0 +1,129 @@
+import logging
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from dataclasses import dataclass, field
+from typing import Any, Iterator, Optional
+
+from sqlalchemy import Engine, event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app import settings
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised when a request issues more queries than QUERY_BUDGET allows."""
+
+
+@dataclass
+class QueryStats:
+    """SQL statistics collected for a single request.
+
+    With a ``budget`` every statement is also counted, so an exceeded budget
+    can name the statement that was repeated (usually an N+1 lazy load).
+    """
+
+    count: int = 0
+    total_time: float = 0.0
+    slowest_time: float = 0.0
+    slowest_statement: Optional[str] = None
+    budget: Optional[int] = None
+    statements: Counter = field(default_factory=Counter)
+
+    def record(self, statement: str, duration: float) -> None:
+        self.count += 1
+        self.total_time += duration
+        if duration > self.slowest_time:
+            self.slowest_time = duration
+            self.slowest_statement = statement
+        if self.budget is not None:
+            self.statements[statement] += 1
+
+    def check_budget(self) -> None:
+        if self.budget is None or self.count <= self.budget:
+            return
+        statement, repeated = self.statements.most_common(1)[0]
+        raise QueryBudgetExceeded(
+            f"{self.count} queries issued, budget is {self.budget}; "
+            f"most repeated ({repeated}x): {statement}"
+        )
+
+    def as_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "total_time": self.total_time,
+            "slowest_time": self.slowest_time,
+            "slowest_statement": self.slowest_statement,
+        }
+
+
+_query_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def start_query_stats(budget: Optional[int] = None) -> Token:
+    """Begin collecting SQL statistics for the current request context."""
+    return _query_stats.set(QueryStats(budget=budget))
+
+
+def get_query_stats() -> Optional[QueryStats]:
+    return _query_stats.get()
+
+
+def reset_query_stats(token: Token) -> None:
+    _query_stats.reset(token)
+
+
+@contextmanager
+def query_budget(budget: int) -> Iterator[QueryStats]:
+    """Fail with QueryBudgetExceeded if the block issues more than ``budget`` queries."""
+    token = start_query_stats(budget)
+    try:
+        stats = get_query_stats()
+        yield stats
+        stats.check_budget()
+    finally:
+        reset_query_stats(token)
+
+
+def redact_parameters(parameters: Any) -> Any:
+    """Keep the shape of bound parameters but drop their values."""
+    if isinstance(parameters, dict):
+        return {key: "?" for key in parameters}
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (dict, list, tuple)):
+            # executemany: รายงานแค่จำนวนแถวและรูปแบบของแถวแรก
+            return {"rows": len(parameters), "first": redact_parameters(parameters[0])}
+        return ["?"] * len(parameters)
+    return "?"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - conn.info["query_start_time"].pop()
+    stats = _query_stats.get()
+    if stats is not None:
+        stats.record(statement, duration)
+    if duration * 1000 >= settings.SLOW_QUERY_THRESHOLD_MS:
+        logger.warning(
+            {
+                "event": "slow_query",
+                "duration": duration,
+                "statement": statement,
+                "parameters": redact_parameters(parameters),
+                "executemany": executemany,
+            }
+        )
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Attach query timing hooks to a sync engine or an async engine's sync core."""
+    if isinstance(engine, AsyncEngine):
+        engine = engine.sync_engine
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
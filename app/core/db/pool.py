@@ -0,0 +1,123 @@
+import logging
+import threading
+import time
+
+from sqlalchemy import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+
+logger = logging.getLogger(__name__)
+
+
+class PoolMetrics:
+    """Counters for time spent waiting on a connection pool checkout."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+
+    def record_wait(self, seconds: float, timed_out: bool = False) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_time_total += seconds
+            self.wait_time_max = max(self.wait_time_max, seconds)
+
+    def snapshot(self, pool: Pool) -> dict:
+        """Return the live pool state together with the wait counters."""
+        with self._lock:
+            attempts = self.checkouts + self.timeouts
+            return {
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": pool.overflow(),
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_time_total": self.wait_time_total,
+                "wait_time_avg": self.wait_time_total / attempts if attempts else 0.0,
+                "wait_time_max": self.wait_time_max,
+            }
+
+
+class _InstrumentedPoolMixin:
+    """Measure how long each checkout waits for a free connection."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except PoolTimeoutError:
+            self.metrics.record_wait(time.perf_counter() - start, timed_out=True)
+            raise
+        self.metrics.record_wait(time.perf_counter() - start)
+        return conn
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def get_pool_options(db_config: dict, is_async: bool = False) -> dict:
+    """Build create_engine pool arguments from a DATABASES entry."""
+    return {
+        "poolclass": InstrumentedAsyncQueuePool if is_async else InstrumentedQueuePool,
+        "pool_size": db_config.get("POOL_SIZE", 5),
+        "max_overflow": db_config.get("MAX_OVERFLOW", 10),
+        "pool_timeout": db_config.get("POOL_TIMEOUT", 30),
+        "pool_recycle": db_config.get("POOL_RECYCLE", -1),
+        "pool_pre_ping": db_config.get("POOL_PRE_PING", False),
+    }
+
+
+def get_pool_metrics(engine: Engine) -> dict:
+    """Return pool counters for a sync engine, or an async engine's sync core."""
+    if isinstance(engine, AsyncEngine):
+        engine = engine.sync_engine
+    pool = engine.pool
+    metrics = getattr(pool, "metrics", None)
+    if metrics is None:
+        return {"status": pool.status()}
+    return metrics.snapshot(pool)
+
+
+def prewarm_pool(engine: Engine, size: int) -> None:
+    """Open `size` connections up front so the first requests skip connection setup."""
+    if size <= 0:
+        return
+    connections = []
+    try:
+        for _ in range(size):
+            connections.append(engine.connect())
+    finally:
+        for connection in connections:
+            connection.close()
+    logger.info(f"Pre-warmed {len(connections)} database connections")
+
+
+async def prewarm_async_pool(engine: AsyncEngine, size: int) -> None:
+    """Async counterpart of prewarm_pool."""
+    if size <= 0:
+        return
+    connections = []
+    try:
+        for _ in range(size):
+            connections.append(await engine.connect())
+    finally:
+        for connection in connections:
+            await connection.close()
+    logger.info(f"Pre-warmed {len(connections)} async database connections")
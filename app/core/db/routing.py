@@ -0,0 +1,60 @@
+import itertools
+import threading
+from typing import List, Optional, Sequence
+
+from sqlalchemy import Engine, Select
+from sqlalchemy.orm import Session
+
+# session.info key ที่บอกว่า session นี้เขียนข้อมูลไปแล้ว (อ่านจาก primary ต่อจากนี้)
+PRIMARY_PINNED = "primary_pinned"
+
+
+class ReplicaSet:
+    """Round-robin selector over the read replica engines."""
+
+    def __init__(self, engines: Sequence[Engine]):
+        self.engines: List[Engine] = list(engines)
+        self._cycle = itertools.cycle(self.engines)
+        self._lock = threading.Lock()
+
+    def __bool__(self) -> bool:
+        return bool(self.engines)
+
+    def choose(self) -> Engine:
+        with self._lock:
+            return next(self._cycle)
+
+
+class RoutingSession(Session):
+    """Session that sends replica-eligible reads to a read replica.
+
+    A SELECT is sent to a replica only when it carries the ``use_replica``
+    execution option. Flushes, DML and every statement issued after the
+    session has written go to the primary, so a request always reads its own
+    writes.
+    """
+
+    def __init__(self, *args, replicas: Optional[ReplicaSet] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.replicas = replicas
+        self._replica: Optional[Engine] = None
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self._flushing or (clause is not None and clause.is_dml):
+            self.info[PRIMARY_PINNED] = True
+        elif (
+            self.replicas
+            and not self.info.get(PRIMARY_PINNED)
+            and isinstance(clause, Select)
+            and clause.get_execution_options().get("use_replica")
+        ):
+            # ใช้ replica ตัวเดียวตลอดอายุ session เพื่อไม่ให้เปิด connection หลายที่
+            if self._replica is None:
+                self._replica = self.replicas.choose()
+            return self._replica
+        return super().get_bind(mapper=mapper, clause=clause, **kwargs)
+
+
+def pin_to_primary(session: Session) -> None:
+    """Send every following read of this session to the primary."""
+    session.info[PRIMARY_PINNED] = True
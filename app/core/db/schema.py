@@ -0,0 +1,145 @@
+import hashlib
+import logging
+from typing import Dict, List, Optional
+
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Engine,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    delete,
+    insert,
+    inspect,
+    select,
+    text,
+)
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from sqlalchemy.schema import CreateColumn
+from sqlalchemy.sql import func
+
+logger = logging.getLogger(__name__)
+
+# เก็บแยกจาก Base.metadata เพื่อไม่ให้ตัวเองไปอยู่ใน fingerprint
+version_metadata = MetaData()
+schema_version = Table(
+    "schema_version",
+    version_metadata,
+    Column("id", Integer, primary_key=True),
+    Column("fingerprint", String(64), nullable=False),
+    Column("applied_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+# key ของ pg_advisory_xact_lock กัน pod หลายตัว apply schema พร้อมกัน
+SCHEMA_LOCK_KEY = 7_341_205
+
+
+def schema_fingerprint(metadata: MetaData) -> str:
+    """Hash the tables, columns, keys and indexes declared in `metadata`."""
+    digest = hashlib.sha256()
+    for table in sorted(metadata.tables.values(), key=lambda t: t.name):
+        digest.update(f"table:{table.name}\n".encode())
+        for column in table.columns:
+            default = column.server_default.arg if column.server_default else None
+            digest.update(
+                f"column:{column.name}:{column.type!r}:{column.nullable}:"
+                f"{column.primary_key}:{column.unique}:{default}\n".encode()
+            )
+        for fk in sorted(table.foreign_keys, key=lambda fk: fk.target_fullname):
+            digest.update(f"fk:{fk.parent.name}->{fk.target_fullname}\n".encode())
+        for index in sorted(table.indexes, key=lambda i: i.name or ""):
+            columns = ",".join(c.name for c in index.columns)
+            digest.update(f"index:{index.name}:{columns}:{index.unique}\n".encode())
+    return digest.hexdigest()
+
+
+def get_applied_fingerprint(engine: Engine) -> Optional[str]:
+    """Return the fingerprint recorded by the last apply, or None if never applied."""
+    try:
+        with engine.connect() as connection:
+            return connection.execute(
+                select(schema_version.c.fingerprint).where(schema_version.c.id == 1)
+            ).scalar()
+    except (OperationalError, ProgrammingError):
+        return None
+
+
+def is_schema_current(engine: Engine, metadata: MetaData) -> bool:
+    """One round-trip check that the database matches the declared models."""
+    return get_applied_fingerprint(engine) == schema_fingerprint(metadata)
+
+
+def add_missing_columns(
+    connection: Connection, metadata: MetaData
+) -> Dict[str, List[str]]:
+    """Add columns and indexes declared on tables that already exist.
+
+    Additive only: nothing is dropped or altered, so new columns must be
+    nullable or carry a server default. Returns the added column names
+    per table.
+    """
+    added: Dict[str, List[str]] = {}
+    inspector = inspect(connection)
+    existing_tables = set(inspector.get_table_names())
+    preparer = connection.dialect.identifier_preparer
+    for table in metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing_columns = {c["name"] for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing_columns:
+                continue
+            table_name = preparer.format_table(table)
+            column_ddl = CreateColumn(column).compile(dialect=connection.dialect)
+            connection.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {column_ddl}"))
+            logger.info(f"Added column {table.name}.{column.name}")
+            added.setdefault(table.name, []).append(column.name)
+        existing_indexes = {i["name"] for i in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing_indexes:
+                index.create(connection)
+    return added
+
+
+def backfill_columns(
+    connection: Connection, metadata: MetaData, added: Dict[str, List[str]]
+) -> None:
+    """Let tables fill the columns just added to their existing rows.
+
+    A table opts in with ``info={"backfill": fn}``; ``fn(connection, columns)``
+    runs inside the apply transaction, after every ALTER TABLE.
+    """
+    for table_name, columns in added.items():
+        backfill = metadata.tables[table_name].info.get("backfill")
+        if backfill:
+            backfill(connection, columns)
+            logger.info(f"Backfilled {table_name}: {', '.join(columns)}")
+
+
+def apply_schema(engine: Engine, metadata: MetaData) -> bool:
+    """Create missing tables and columns and record the new fingerprint.
+
+    Returns False when another process already applied the same schema.
+    """
+    fingerprint = schema_fingerprint(metadata)
+    with engine.begin() as connection:
+        if connection.dialect.name == "postgresql":
+            connection.execute(
+                text("SELECT pg_advisory_xact_lock(:key)"), {"key": SCHEMA_LOCK_KEY}
+            )
+        version_metadata.create_all(connection)
+        applied = connection.execute(
+            select(schema_version.c.fingerprint).where(schema_version.c.id == 1)
+        ).scalar()
+        if applied == fingerprint:
+            return False
+        metadata.create_all(connection)
+        added = add_missing_columns(connection, metadata)
+        backfill_columns(connection, metadata, added)
+        connection.execute(delete(schema_version))
+        connection.execute(insert(schema_version).values(id=1, fingerprint=fingerprint))
+    logger.info(f"Applied database schema {fingerprint}")
+    return True
@@ -17,3 +17,19 @@ class AuthenticationError(Exception):
         self.message = message
         self.status_code = status_code
         super().__init__(self.message)
+
+
+class InsufficientStockError(DatabaseError):
+    def __init__(self, product_id: int, quantity: int):
+        self.product_id = product_id
+        self.quantity = quantity
+        super().__init__(
+            f"Insufficient stock for product {product_id} (requested {quantity})",
+            status_code=409,
+        )
+
+
+class CartOperationError(DatabaseError):
+    def __init__(self, index: int, message: str):
+        self.index = index
+        super().__init__(f"Operation {index}: {message}", status_code=422)
@@ -0,0 +1,59 @@
+import csv
+import io
+import json
+from datetime import date, datetime
+from enum import Enum
+from typing import Any, Dict, Iterable, Iterator, Sequence
+
+# จำนวนแถวที่รวมเป็น chunk เดียวก่อนส่งออกไป ลดจำนวน write ต่อ response
+ROWS_PER_CHUNK = 500
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def _plain(value: Any) -> Any:
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def iter_ndjson(rows: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    """Encode rows as newline-delimited JSON, a chunk of lines at a time."""
+    lines = []
+    for row in rows:
+        lines.append(json.dumps({key: _plain(value) for key, value in row.items()}))
+        if len(lines) >= ROWS_PER_CHUNK:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+def iter_csv(rows: Iterable[Dict[str, Any]], fields: Sequence[str]) -> Iterator[str]:
+    """Encode rows as CSV with a header line, a chunk of lines at a time."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    count = 0
+    for row in rows:
+        writer.writerow([_plain(row[field]) for field in fields])
+        count += 1
+        if count >= ROWS_PER_CHUNK:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            count = 0
+    yield buffer.getvalue()
+
+
+def iter_export(
+    rows: Iterable[Dict[str, Any]], fields: Sequence[str], format: str
+) -> Iterator[str]:
+    if format == "csv":
+        return iter_csv(rows, fields)
+    return iter_ndjson(rows)
@@ -19,7 +19,11 @@ async def validation_exception_handler(_, exc: RequestValidationError):
 async def http_exception_handler(_, exc: HTTPException):
     logger.error(f"HTTP error: {exc.detail}")
     failed = Failed(status="fail", code=exc.status_code, msg=str(exc.detail))
-    return JSONResponse(status_code=exc.status_code, content=failed.model_dump())
+    return JSONResponse(
+        status_code=exc.status_code,
+        content=failed.model_dump(),
+        headers=getattr(exc, "headers", None),
+    )
 
 
 async def authentication_error_handler(_, exc: AuthenticationError):
@@ -1,17 +1,51 @@
 import logging as log
 import time
 
-from fastapi import Request
-
-
-async def log_request_middleware(request: Request, call_next):
-    request_start_time = time.monotonic()
-    response = await call_next(request)
-    request_duration = time.monotonic() - request_start_time
-    log_data = {
-        "method": request.method,
-        "path": request.url.path,
-        "duration": request_duration,
-    }
-    log.info(log_data)
-    return response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app import settings
+from app.core.db.instrumentation import (
+    get_query_stats,
+    reset_query_stats,
+    start_query_stats,
+)
+
+
+class RequestLogMiddleware:
+    """ASGI middleware that logs method, path, status, duration and SQL stats per request."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_start_time = time.monotonic()
+        stats_token = start_query_stats(budget=settings.QUERY_BUDGET or None)
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                # ตรวจก่อนส่ง status ออกไป request ที่เกิน budget จึงได้ 500 จริง
+                get_query_stats().check_budget()
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+            # query ที่เกิดระหว่าง stream body หลังส่ง status ไปแล้ว
+            get_query_stats().check_budget()
+        finally:
+            request_duration = time.monotonic() - request_start_time
+            log_data = {
+                "method": scope["method"],
+                "path": scope["path"],
+                "status": status_code,
+                "duration": request_duration,
+                "db": get_query_stats().as_dict(),
+            }
+            log.info(log_data)
+            reset_query_stats(stats_token)
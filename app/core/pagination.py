@@ -0,0 +1,70 @@
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Callable, Dict
+from uuid import UUID
+
+from fastapi import HTTPException
+
+
+def _decode_int(value: Any) -> int:
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise ValueError(f"expected an integer, got {value!r}")
+    return value
+
+
+def _decode_str(value: Any) -> str:
+    if not isinstance(value, str):
+        raise ValueError(f"expected a string, got {value!r}")
+    return value
+
+
+def _from_str(parse: Callable[[str], Any]) -> Callable[[Any], Any]:
+    return lambda value: parse(_decode_str(value))
+
+
+# python_type ของคอลัมน์ที่ใช้เป็น cursor ได้ -> ตัวแปลงค่าจาก JSON กลับเป็น type เดิม
+# ค่าที่ JSON ไม่มี type ตรงๆ (วันเวลา, Decimal, UUID) ถูกเก็บเป็น string
+CURSOR_DECODERS: Dict[type, Callable[[Any], Any]] = {
+    int: _decode_int,
+    str: _decode_str,
+    datetime: _from_str(datetime.fromisoformat),
+    date: _from_str(date.fromisoformat),
+    Decimal: _from_str(Decimal),
+    UUID: _from_str(UUID),
+}
+
+
+def _encode_value(value: Any) -> str:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (Decimal, UUID)):
+        return str(value)
+    raise TypeError(f"{type(value).__name__} cannot be used in a cursor")
+
+
+def encode_cursor(values: Dict[str, Any]) -> str:
+    """Encode the sort key of the last row of a page into an opaque cursor."""
+    raw = json.dumps(values, separators=(",", ":"), default=_encode_value).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, types: Dict[str, type]) -> Dict[str, Any]:
+    """Decode a cursor produced by encode_cursor back into typed values.
+
+    ``types`` maps every cursor field to the python type of its column; a
+    cursor with other fields or with values of the wrong type is a 400.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, dict) or set(values) != set(types):
+            raise ValueError("cursor fields do not match")
+        return {
+            field: CURSOR_DECODERS[types[field]](value)
+            for field, value in values.items()
+        }
+    except (binascii.Error, ValueError, ArithmeticError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
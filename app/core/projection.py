@@ -0,0 +1,43 @@
+from typing import Callable, List, Optional, Type
+
+from fastapi import HTTPException, Query
+from pydantic import BaseModel
+from sqlalchemy import inspect
+
+
+def selectable_fields(schema: Type[BaseModel], model: type) -> List[str]:
+    """Fields a client may ask for: exposed by the schema and backed by a column."""
+    columns = inspect(model).column_attrs.keys()
+    return [field for field in schema.model_fields if field in columns]
+
+
+def sparse_fields(
+    schema: Type[BaseModel], model: type
+) -> Callable[[Optional[str]], Optional[List[str]]]:
+    """Build a dependency that parses ``?fields=a,b`` for a list endpoint.
+
+    Returns None when the parameter is absent, so the endpoint keeps
+    returning full objects.
+    """
+    allowed = selectable_fields(schema, model)
+
+    def dependency(
+        fields: Optional[str] = Query(
+            None, description=f"Comma separated subset of: {', '.join(allowed)}"
+        ),
+    ) -> Optional[List[str]]:
+        if fields is None:
+            return None
+        requested = list(
+            dict.fromkeys(field.strip() for field in fields.split(",") if field.strip())
+        )
+        if not requested:
+            raise HTTPException(status_code=400, detail="fields must not be empty")
+        unknown = [field for field in requested if field not in allowed]
+        if unknown:
+            raise HTTPException(
+                status_code=400, detail=f"Unknown fields: {', '.join(unknown)}"
+            )
+        return requested
+
+    return dependency
@@ -0,0 +1,132 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Tuple
+
+from fastapi import Depends, HTTPException, Request
+from fastapi.security import OAuth2PasswordRequestForm
+
+from app import settings
+from app.core.redis import get_redis
+
+# KEYS[1]=bucket, ARGV: capacity, refill_rate (tokens/s), cost
+_TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return {allowed, tostring(tokens)}
+"""
+
+
+class InMemoryBucketBackend:
+    """Token buckets held in this process (one set of limits per pod)."""
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(
+        self, key: str, capacity: int, refill_rate: float, cost: int = 1
+    ) -> Tuple[bool, float]:
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated_at) * refill_rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, tokens
+
+
+class RedisBucketBackend:
+    """Token buckets in Redis, shared by every pod."""
+
+    def __init__(self, redis):
+        self._script = redis.register_script(_TOKEN_BUCKET_SCRIPT)
+
+    def consume(
+        self, key: str, capacity: int, refill_rate: float, cost: int = 1
+    ) -> Tuple[bool, float]:
+        allowed, tokens = self._script(
+            keys=[f"rate-limit:{key}"], args=[capacity, refill_rate, cost]
+        )
+        return bool(allowed), float(tokens)
+
+
+_backend = None
+
+
+def get_rate_limit_backend():
+    global _backend
+    if _backend is None:
+        redis = get_redis() if settings.RATE_LIMIT_BACKEND == "redis" else None
+        _backend = RedisBucketBackend(redis) if redis else InMemoryBucketBackend()
+    return _backend
+
+
+class RateLimiter:
+    """Token bucket of `capacity` requests refilled at `refill_rate` per second."""
+
+    def __init__(self, scope: str, capacity: int, refill_rate: float):
+        self.scope = scope
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+
+    def hit(self, key: str) -> None:
+        allowed, tokens = get_rate_limit_backend().consume(
+            f"{self.scope}:{key}", self.capacity, self.refill_rate
+        )
+        if not allowed:
+            retry_after = math.ceil((1 - tokens) / self.refill_rate)
+            raise HTTPException(
+                status_code=429,
+                detail="Too many requests, try again later",
+                headers={"Retry-After": str(retry_after)},
+            )
+
+
+def get_client_ip(request: Request) -> str:
+    if settings.RATE_LIMIT_TRUST_FORWARDED_FOR:
+        forwarded_for = request.headers.get("X-Forwarded-For")
+        if forwarded_for:
+            return forwarded_for.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+def rate_limit_by_ip(scope: str, capacity: int, refill_rate: float) -> Callable:
+    """Dependency limiting requests per client IP."""
+    limiter = RateLimiter(scope, capacity, refill_rate)
+
+    def dependency(request: Request) -> None:
+        limiter.hit(get_client_ip(request))
+
+    return dependency
+
+
+def rate_limit_by_username(scope: str, capacity: int, refill_rate: float) -> Callable:
+    """Dependency limiting login attempts per submitted username."""
+    limiter = RateLimiter(scope, capacity, refill_rate)
+
+    def dependency(form_data: OAuth2PasswordRequestForm = Depends()) -> None:
+        limiter.hit(form_data.username.lower())
+
+    return dependency
@@ -0,0 +1,15 @@
+from app import settings
+
+_client = None
+
+
+def get_redis():
+    """Return the shared Redis client, or None when REDIS_URL is not configured."""
+    global _client
+    if not settings.REDIS_URL:
+        return None
+    if _client is None:
+        import redis
+
+        _client = redis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+    return _client
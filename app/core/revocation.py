@@ -0,0 +1,119 @@
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from app import settings
+from app.core.bloom import BloomFilter
+from app.core.db.connect import SessionLocal
+from app.models.token import RevokedToken
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+
+class RevocationList:
+    """Revoked token ids backed by the revoked_token table.
+
+    A Bloom filter rebuilt from the table every ``sync_interval`` seconds sits
+    in front of it: a token whose jti is not in the filter is cleared without
+    I/O, and only filter hits are confirmed with a query. Revocations made on
+    this pod take effect immediately; other pods see them after their next
+    sync.
+
+    ``revoke_user`` revokes every token of one user at once (password
+    change, compromised account) by moving ``User.tokens_valid_after``;
+    ``is_revoked_for_user`` compares a token's ``iat`` with it, so the check
+    needs no I/O beyond loading the user.
+    """
+
+    def __init__(self, capacity: int, error_rate: float, sync_interval: float):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.sync_interval = sync_interval
+        self._filter = BloomFilter(capacity, error_rate)
+        self._lock = threading.Lock()
+        self._sync_thread: Optional[threading.Thread] = None
+        self.last_sync: Optional[float] = None
+
+    def sync(self) -> None:
+        """Drop expired rows and rebuild the filter from the table."""
+        now = datetime.now(timezone.utc)
+        with SessionLocal() as db:
+            db.execute(delete(RevokedToken).where(RevokedToken.expires_at < now))
+            db.commit()
+            jtis = db.execute(select(RevokedToken.jti)).scalars().all()
+        bloom = BloomFilter(max(self.capacity, len(jtis) * 2), self.error_rate)
+        for jti in jtis:
+            bloom.add(jti)
+        with self._lock:
+            self._filter = bloom
+            self.last_sync = time.monotonic()
+
+    def start_sync(self) -> None:
+        """Sync once now, then keep syncing in a background thread."""
+        try:
+            self.sync()
+        except Exception as e:
+            logger.error(f"Token revocation sync failed: {str(e)}")
+        if self._sync_thread is not None:
+            return
+
+        def run():
+            while True:
+                time.sleep(self.sync_interval)
+                try:
+                    self.sync()
+                except Exception as e:
+                    logger.error(f"Token revocation sync failed: {str(e)}")
+
+        self._sync_thread = threading.Thread(
+            target=run, name="token-revocation-sync", daemon=True
+        )
+        self._sync_thread.start()
+
+    def is_revoked(self, jti: Optional[str], db: Session) -> bool:
+        if not jti or jti not in self._filter:
+            return False
+        return (
+            db.execute(select(RevokedToken.id).where(RevokedToken.jti == jti)).first()
+            is not None
+        )
+
+    @staticmethod
+    def revoke_user(user: User) -> None:
+        """Revoke every token issued to ``user`` so far; the caller commits."""
+        user.tokens_valid_after = datetime.now(timezone.utc)
+
+    @staticmethod
+    def is_revoked_for_user(payload: dict, user: User) -> bool:
+        """True for a token issued before the user's ``tokens_valid_after``."""
+        cutoff = user.tokens_valid_after
+        if cutoff is None:
+            return False
+        if cutoff.tzinfo is None:
+            cutoff = cutoff.replace(tzinfo=timezone.utc)
+        issued_at = payload.get("iat")
+        # token ที่ออกก่อนมี claim iat ถือว่าออกก่อน cutoff
+        return issued_at is None or issued_at < cutoff.timestamp()
+
+    def revoke(self, db: Session, jti: Optional[str], exp: Optional[float]) -> None:
+        """Record a token id as revoked until its expiry."""
+        if not jti or self.is_revoked(jti, db):
+            return
+        expires_at = datetime.fromtimestamp(exp or time.time(), tz=timezone.utc)
+        db.add(RevokedToken(jti=jti, expires_at=expires_at))
+        db.commit()
+        with self._lock:
+            self._filter.add(jti)
+
+
+revocation_list = RevocationList(
+    capacity=settings.REVOCATION_BLOOM_CAPACITY,
+    error_rate=settings.REVOCATION_BLOOM_ERROR_RATE,
+    sync_interval=settings.REVOCATION_SYNC_INTERVAL,
+)
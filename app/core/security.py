@@ -1,8 +1,125 @@
+import asyncio
+import threading
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional
+
 from passlib.context import CryptContext
 
+from app import settings
+from app.core.exceptions import AuthenticationError
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
-def get_password_hash(password: str) -> str:
+def _hash(password: str) -> str:
     return pwd_context.hash(password)
+
+
+def _verify(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+class PasswordHasher:
+    """Run bcrypt on a bounded worker pool.
+
+    At most ``max_workers`` hashes run at once and at most ``max_queue``
+    wait behind them; anything beyond that is rejected with a 503 so a login
+    storm saturates a known number of cores instead of the whole process.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int, use_processes: bool = False):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.use_processes = use_processes
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.use_processes:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="password-hasher"
+                )
+        return self._executor
+
+    def _done(self, _: Future) -> None:
+        with self._lock:
+            self._pending -= 1
+            self.completed += 1
+
+    def _submit(self, fn, *args) -> Future:
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                raise AuthenticationError(
+                    "Too many authentication requests, try again later",
+                    status_code=503,
+                )
+            self._pending += 1
+            executor = self._get_executor()
+        try:
+            future = executor.submit(fn, *args)
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+            raise
+        future.add_done_callback(self._done)
+        return future
+
+    def hash(self, password: str) -> str:
+        return self._submit(_hash, password).result()
+
+    def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return self._submit(_verify, plain_password, hashed_password).result()
+
+    async def async_hash(self, password: str) -> str:
+        return await asyncio.wrap_future(self._submit(_hash, password))
+
+    async def async_verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await asyncio.wrap_future(
+            self._submit(_verify, plain_password, hashed_password)
+        )
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "in_flight": min(self._pending, self.max_workers),
+                "queue_depth": max(self._pending - self.max_workers, 0),
+                "max_queue": self.max_queue,
+                "completed": self.completed,
+                "rejected": self.rejected,
+            }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    max_queue=settings.PASSWORD_HASH_MAX_QUEUE,
+    use_processes=settings.PASSWORD_HASH_EXECUTOR == "process",
+)
+
+
+def get_password_hash(password: str) -> str:
+    return password_hasher.hash(password)
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return password_hasher.verify(plain_password, hashed_password)
+
+
+async def async_get_password_hash(password: str) -> str:
+    return await password_hasher.async_hash(password)
+
+
+async def async_verify_password(plain_password: str, hashed_password: str) -> bool:
+    return await password_hasher.async_verify(plain_password, hashed_password)
@@ -0,0 +1,136 @@
+import enum
+import json
+import logging
+import threading
+from datetime import datetime
+from typing import Iterable, Optional
+
+from sqlalchemy import inspect
+from sqlalchemy.orm import Mapper, make_transient_to_detached
+
+from app import settings
+from app.core.cache import TTLCache
+from app.core.redis import get_redis
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+# ไม่เก็บ hash ของรหัสผ่านไว้ใน process หรือ Redis
+EXCLUDED_FIELDS = ("hashed_password",)
+
+
+class UserCache:
+    """Cache of authenticated users keyed by token subject (the user id claim).
+
+    Rows are kept as column snapshots without the password hash; every
+    hit builds a fresh detached instance of the row's mapped class (picked
+    by the ``type`` discriminator) so requests never share ORM instances.
+    The hash is loaded from the database when first read. When Redis is
+    configured it acts as a second tier shared by all pods, and
+    invalidations are published so every pod drops its local copy.
+    """
+
+    KEY_PREFIX = "user-cache:"
+    CHANNEL = "user-cache:invalidate"
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.ttl = ttl
+        self.local = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._listener: Optional[threading.Thread] = None
+
+    @staticmethod
+    def _mapper(snapshot: dict) -> Mapper:
+        mappers = User.__mapper__.polymorphic_map
+        return mappers.get(snapshot.get("type"), User.__mapper__)
+
+    @staticmethod
+    def _snapshot(user: User) -> dict:
+        return {
+            attr.key: getattr(user, attr.key)
+            for attr in inspect(user).mapper.column_attrs
+            if attr.key not in EXCLUDED_FIELDS
+        }
+
+    @classmethod
+    def _build(cls, snapshot: dict) -> User:
+        user = cls._mapper(snapshot).class_(**snapshot)
+        make_transient_to_detached(user)
+        return user
+
+    @staticmethod
+    def _dumps(snapshot: dict) -> str:
+        def encode(value):
+            if isinstance(value, datetime):
+                return value.isoformat()
+            if isinstance(value, enum.Enum):
+                return value.value
+            return value
+
+        return json.dumps({key: encode(value) for key, value in snapshot.items()})
+
+    @classmethod
+    def _loads(cls, raw: str) -> dict:
+        snapshot = json.loads(raw)
+        for field in EXCLUDED_FIELDS:
+            snapshot.pop(field, None)
+        for attr in cls._mapper(snapshot).column_attrs:
+            value = snapshot.get(attr.key)
+            if value is None:
+                continue
+            python_type = attr.columns[0].type.python_type
+            if python_type is datetime:
+                snapshot[attr.key] = datetime.fromisoformat(value)
+            elif issubclass(python_type, enum.Enum):
+                snapshot[attr.key] = python_type(value)
+        return snapshot
+
+    def get(self, subject: str) -> Optional[User]:
+        snapshot = self.local.get(subject)
+        if snapshot is None:
+            redis = get_redis()
+            raw = redis.get(self.KEY_PREFIX + subject) if redis else None
+            if raw is None:
+                return None
+            snapshot = self._loads(raw)
+            self.local.set(subject, snapshot)
+        return self._build(snapshot)
+
+    def set(self, subject: str, user: User) -> None:
+        snapshot = self._snapshot(user)
+        self.local.set(subject, snapshot)
+        redis = get_redis()
+        if redis:
+            redis.setex(self.KEY_PREFIX + subject, int(self.ttl), self._dumps(snapshot))
+
+    def invalidate(self, subjects: Iterable[Optional[str]]) -> None:
+        subjects = [subject for subject in subjects if subject]
+        for subject in subjects:
+            self.local.delete(subject)
+        redis = get_redis()
+        if redis and subjects:
+            redis.delete(*[self.KEY_PREFIX + subject for subject in subjects])
+            for subject in subjects:
+                redis.publish(self.CHANNEL, subject)
+
+    def start_invalidation_listener(self) -> None:
+        """Evict local entries when another pod invalidates a user."""
+        redis = get_redis()
+        if redis is None or self._listener is not None:
+            return
+
+        def listen():
+            pubsub = redis.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(self.CHANNEL)
+            for message in pubsub.listen():
+                self.local.delete(message["data"])
+
+        self._listener = threading.Thread(
+            target=listen, name="user-cache-invalidation", daemon=True
+        )
+        self._listener.start()
+        logger.info("User cache invalidation listener started")
+
+
+user_cache = UserCache(
+    maxsize=settings.USER_CACHE_MAXSIZE, ttl=settings.USER_CACHE_TTL
+)
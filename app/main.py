@@ -8,12 +8,23 @@ from app.api.v1.cart import router as cart_router
 from app.api.v1.users import router as users_router
 from app.api.v1.catalogue import router as catalogue_router
 from app.api.v1.checkout import router as checkout_router
+from app.api.v1.export import router as export_router
 from app.core.config import (
     configure_app,
     configure_exception_handlers,
     configure_middleware,
 )
-from app.core.db.connect import Base, get_engine
+from app.api.v1.metrics import router as metrics_router
+from app import settings
+from app.core.db.connect import Base, get_async_engine, get_engine
+from app.core.db.pool import prewarm_async_pool, prewarm_pool
+from app.core.db.schema import apply_schema, is_schema_current
+from app.core.revocation import revocation_list
+from app.core.security import password_hasher
+from app.core.user_cache import user_cache
+from app.services.cart_store import cart_store_flusher
+from app.services.inventory import reservation_sweeper
+from app.settings.db import DATABASES
 
 logger = logging.getLogger(__name__)
 oauth2_scheme = OAuth2AuthorizationCodeBearer(
@@ -33,11 +44,27 @@ def create_app(db_engine=None) -> FastAPI:
 
     @app.on_event("startup")
     async def startup_event():
-        Base.metadata.create_all(bind=engine)
+        if is_schema_current(engine, Base.metadata):
+            logger.info("Database schema is up to date")
+        elif settings.SCHEMA_AUTO_APPLY:
+            apply_schema(engine, Base.metadata)
+        else:
+            logger.error(
+                "Database schema is out of date, run: python -m app.cli schema apply"
+            )
+        prewarm_size = DATABASES["default"].get("POOL_PREWARM", 0)
+        prewarm_pool(engine, prewarm_size)
+        await prewarm_async_pool(get_async_engine(), prewarm_size)
+        user_cache.start_invalidation_listener()
+        revocation_list.start_sync()
+        reservation_sweeper.start()
+        cart_store_flusher.start()
         logger.info("Application started and database initialized")
 
     @app.on_event("shutdown")
     async def shutdown_event():
+        password_hasher.shutdown()
+        cart_store_flusher.flush()
         logger.info("Application shutting down")
 
     configure_app(app)
@@ -49,6 +76,8 @@ def create_app(db_engine=None) -> FastAPI:
     app.include_router(cart_router, prefix="/v1")
     app.include_router(catalogue_router, prefix="/v1")
     app.include_router(checkout_router, prefix="/v1")
+    app.include_router(metrics_router, prefix="/v1")
+    app.include_router(export_router, prefix="/v1")
 
     @app.get("/")
     def read_root():
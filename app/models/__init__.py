@@ -4,7 +4,11 @@ from .customer import *  # noqa
 from .order import *  # noqa
 from .shipping import *  # noqa
 from .catalogue import *  # noqa
+from .checkout import *  # noqa
 from .wishlist import *  # noqa
 from .user import *  # noqa
 from .offer import *  # noqa
 from .payment import *  # noqa
+from .token import *  # noqa
+from .inventory import *  # noqa
+from .id_block import *  # noqa
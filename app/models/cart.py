@@ -1,12 +1,49 @@
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, Float
+from typing import Iterable
+
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, Float, select, update
+from sqlalchemy.engine import Connection
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
 from app.core.db.connect import BaseModel
 
 
+# คอลัมน์ยอดรวมที่เพิ่มภายหลัง แถวเดิมได้ค่า 0 จาก server_default ต้องคำนวณจาก line
+COMPONENT_TOTAL_COLUMNS = ("subtotal_amount", "discount_amount", "tax_amount")
+
+
+def line_totals():
+    """Correlated subqueries that re-aggregate a cart's lines."""
+    subtotal = (
+        select(func.coalesce(func.sum(CartLine.price * CartLine.quantity), 0.0))
+        .where(CartLine.cart_id == Cart.id)
+        .scalar_subquery()
+    )
+    discount = (
+        select(func.coalesce(func.sum(CartLine.discount_amount), 0.0))
+        .where(CartLine.cart_id == Cart.id)
+        .scalar_subquery()
+    )
+    return subtotal, discount
+
+
+def backfill_totals(connection: Connection, columns: Iterable[str]) -> None:
+    """Fill newly added total columns of existing carts from their lines.
+
+    Runs from apply_schema in the same transaction as the ALTER TABLE, so
+    no request ever reads the zero defaults.
+    """
+    if not set(columns) & set(COMPONENT_TOTAL_COLUMNS):
+        return
+    subtotal, discount = line_totals()
+    connection.execute(
+        update(Cart).values(Cart.total_values(subtotal, discount, Cart.tax_rate))
+    )
+
+
 class Cart(BaseModel):
     __tablename__ = "cart"  # เปลี่ยนจาก "basket" เป็น "cart"
+    __table_args__ = {"info": {"backfill": backfill_totals}}
     id = Column(Integer, primary_key=True, index=True)
     customer_id = Column(Integer, ForeignKey("customer.id"), nullable=False)
     customer = relationship(
@@ -15,31 +52,41 @@ class Cart(BaseModel):
     product_id = Column(Integer, ForeignKey("catalogue.id"), nullable=False)
     quantity = Column(Integer, nullable=False, default=1)
     added_at = Column(DateTime(timezone=True), server_default=func.now())
+    # ยอดรวมถูกปรับด้วย delta ทุกครั้งที่ cart_line เปลี่ยน อ่านได้โดยไม่ต้องวนทุก line
+    subtotal_amount = Column(Float, nullable=False, default=0.0, server_default="0")
+    discount_amount = Column(Float, nullable=False, default=0.0, server_default="0")
+    tax_rate = Column(Float, nullable=False, default=0.0, server_default="0")
+    tax_amount = Column(Float, nullable=False, default=0.0, server_default="0")
     total_amount = Column(Float, nullable=False, default=0.0)
+    # version ล่าสุดจาก cart store ที่ flush ลง DB แล้ว (durability checkpoint)
+    store_version = Column(Integer, nullable=False, default=0, server_default="0")
+    # เวลาที่ checkout ของ cart นี้สำเร็จ; NULL = cart ยังเปิดอยู่ (reprice ได้)
+    checked_out_at = Column(DateTime(timezone=True), nullable=True, index=True)
     cart_lines = relationship("CartLine", back_populates="cart", cascade="all, delete-orphan")
 
-class CartLine(BaseModel):
-    __tablename__ = "cart_line"
-    id = Column(Integer, primary_key=True, index=True)
-    cart_id = Column(Integer, ForeignKey("cart.id"), nullable=False)
-    product_id = Column(Integer, ForeignKey("catalogue.id"), nullable=False)
-    quantity = Column(Integer, nullable=False, default=1)
-    price = Column(Float, nullable=False)  
-    added_at = Column(DateTime(timezone=True), server_default=func.now())
-
-    cart = relationship("Cart", back_populates="cart_lines")
-    product = relationship("Catalogue")
-
+    @staticmethod
+    def total_values(subtotal, discount, tax_rate) -> dict:
+        """
+        คำนวณ subtotal/discount/tax/total จากสามค่าตั้งต้น
+        ใช้ได้ทั้งกับตัวเลขและ SQL expression (เช่น Cart.subtotal_amount + delta)
+        """
+        net = subtotal - discount
+        return {
+            "subtotal_amount": subtotal,
+            "discount_amount": discount,
+            "tax_amount": net * tax_rate,
+            "total_amount": net * (1 + tax_rate),
+        }
 
     def calculate_cart_total(self, tax_rate: float) -> float:
         """
         คำนวณยอดรวมทั้งตะกร้าโดยรวมภาษีและส่วนลดจากทุก CartLine
         """
-        total = 0.0
-        for cart_line in self.cart_lines:
-            total += cart_line.calculate_total(tax_rate)
-        self.total_amount = total
-        return total
+        subtotal = sum(cart_line.calculate_subtotal() for cart_line in self.cart_lines)
+        discount = sum(cart_line.discount_amount for cart_line in self.cart_lines)
+        for field, value in self.total_values(subtotal, discount, tax_rate).items():
+            setattr(self, field, value)
+        return self.total_amount
 
     # เมธอดสำหรับใช้ส่วนลดทั้งตะกร้า
     def apply_cart_discount(self, discount_rate: float) -> float:
@@ -49,15 +96,36 @@ class CartLine(BaseModel):
         total_discount = 0.0
         for cart_line in self.cart_lines:
             total_discount += cart_line.apply_discount(discount_rate)
-        self.calculate_cart_total(tax_rate=0.0)  # อัปเดต total_amount หลังหักส่วนลด
+        self.calculate_cart_total(tax_rate=self.tax_rate)
         return total_discount
 
-    # เมธอดสำหรับคำนวณน้ำหนักรวมของตะกร้า
-    def calculate_cart_weight(self) -> float:
+
+class CartLine(BaseModel):
+    __tablename__ = "cart_line"
+    id = Column(Integer, primary_key=True, index=True)
+    cart_id = Column(Integer, ForeignKey("cart.id"), nullable=False, index=True)
+    product_id = Column(Integer, ForeignKey("catalogue.id"), nullable=False)
+    quantity = Column(Integer, nullable=False, default=1)
+    price = Column(Float, nullable=False)
+    discount_amount = Column(Float, nullable=False, default=0.0, server_default="0")
+    added_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    cart = relationship("Cart", back_populates="cart_lines")
+    product = relationship("Catalogue")
+
+    def calculate_subtotal(self) -> float:
+        return self.price * self.quantity
+
+    def calculate_tax(self, tax_rate: float) -> float:
+        return (self.calculate_subtotal() - self.discount_amount) * tax_rate
+
+    def calculate_total(self, tax_rate: float) -> float:
+        subtotal_after_discount = self.calculate_subtotal() - self.discount_amount
+        return subtotal_after_discount + self.calculate_tax(tax_rate)
+
+    def apply_discount(self, discount_rate: float) -> float:
         """
-        คำนวณน้ำหนักรวมของสินค้าทั้งหมดในตะกร้า
+        ตั้งส่วนลดของ line เป็นสัดส่วนของ subtotal และคืนค่าส่วนลด
         """
-        total_weight = 0.0
-        for cart_line in self.cart_lines:
-            total_weight += cart_line.calculate_weight()
-        return total_weight
+        self.discount_amount = self.calculate_subtotal() * discount_rate
+        return self.discount_amount
@@ -11,3 +11,7 @@ class Catalogue(BaseModel):
     price = Column(Float, nullable=False)
     stock = Column(Integer, nullable=False, default=0)
     category = Column(String, nullable=True)
+    # natural key ของ product feed ใช้เป็น conflict target ตอน upsert
+    sku = Column(String, unique=True, index=True, nullable=True)
+    # sha256 ของเนื้อหาที่ sync มาล่าสุด แถวที่ hash ไม่เปลี่ยนจะไม่ถูก UPDATE
+    content_hash = Column(String(64), nullable=True)
@@ -14,5 +14,6 @@ class Checkout(BaseModel):
     __tablename__ = "checkout"
     id = Column(Integer, primary_key=True, index=True)
     order_id = Column(Integer, ForeignKey("order.id"), nullable=False)
+    cart_id = Column(Integer, ForeignKey("cart.id"), nullable=True, index=True)
     status = Column(String, nullable=False, default="in_progress")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -10,7 +10,10 @@ from .user import User
 
 class Customer(User):  # สืบทอดจาก User
     __tablename__ = "customer"  # ใช้ตารางแยกสำหรับ Customer
-    __mapper_args__ = {"polymorphic_identity": "customer"}  # ระบุว่าเป็น subtype
+    __mapper_args__ = {
+        "polymorphic_identity": "customer",  # ระบุว่าเป็น subtype
+        "eager_defaults": True,
+    }
 
     id = Column(Integer, ForeignKey("users.id"), primary_key=True)  # ใช้ id จาก User
     addresses = relationship("Address", back_populates="customer")
@@ -0,0 +1,11 @@
+from sqlalchemy import BigInteger, Column, String
+
+from app.core.db.connect import BaseModel
+
+
+class IdBlock(BaseModel):
+    """High-water mark of ids handed out in blocks (hi/lo) for one table."""
+
+    __tablename__ = "id_block"
+    name = Column(String, primary_key=True)
+    next_id = Column(BigInteger, nullable=False)
@@ -0,0 +1,26 @@
+from enum import Enum as PythonEnum
+
+from sqlalchemy import Column, DateTime, Enum, ForeignKey, Integer
+
+from app.core.db.connect import BaseModel
+
+
+class ReservationStatusEnum(str, PythonEnum):
+    RESERVED = "reserved"  # หัก stock แล้ว รอ checkout จบ
+    COMMITTED = "committed"  # checkout สำเร็จ stock ถูกขายไปแล้ว
+    RELEASED = "released"  # คืน stock แล้ว (ยกเลิกหรือหมดเวลา)
+
+
+class StockReservation(BaseModel):
+    __tablename__ = "stock_reservation"
+    id = Column(Integer, primary_key=True, index=True)
+    product_id = Column(Integer, ForeignKey("catalogue.id"), nullable=False, index=True)
+    checkout_id = Column(Integer, ForeignKey("checkout.id"), nullable=True, index=True)
+    quantity = Column(Integer, nullable=False)
+    status = Column(
+        Enum(ReservationStatusEnum),
+        nullable=False,
+        default=ReservationStatusEnum.RESERVED,
+        index=True,
+    )
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
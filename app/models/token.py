@@ -0,0 +1,10 @@
+from sqlalchemy import Column, DateTime, Integer, String
+
+from app.core.db.connect import BaseModel
+
+
+class RevokedToken(BaseModel):
+    __tablename__ = "revoked_token"
+    id = Column(Integer, primary_key=True, index=True)
+    jti = Column(String, unique=True, index=True, nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
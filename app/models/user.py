@@ -1,13 +1,11 @@
 import enum
 
-from passlib.context import CryptContext
 from sqlalchemy import Boolean, Column, DateTime, Enum, Integer, String
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
 from app.core.db.connect import BaseModel
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from app.core.security import verify_password
 
 
 class UserRole(str, enum.Enum):
@@ -30,6 +28,17 @@ class User(BaseModel):
     is_verified = Column(Boolean, default=False)  # อีเมลยืนยันแล้วหรือไม่
 
     last_login = Column(DateTime(timezone=True), nullable=True)
+    # token ที่ออก (iat) ก่อนเวลานี้ใช้ไม่ได้ทั้งหมด ตั้งเมื่อเปลี่ยนรหัสผ่าน
+    tokens_valid_after = Column(DateTime(timezone=True), nullable=True)
+
+    # ชนิดของแถว (polymorphic discriminator) เช่น "user" หรือ "customer"
+    type = Column(String(50), nullable=False, default="user", server_default="user")
+
+    __mapper_args__ = {
+        "polymorphic_on": type,
+        "polymorphic_identity": "user",
+        "eager_defaults": True,
+    }
 
 
     # # ความสัมพันธ์กับตารางอื่น
@@ -40,7 +49,8 @@ class User(BaseModel):
         return f"<User(id={self.id}, username={self.username}, email={self.email})>"
 
     def verify_password(self, plain_password: str) -> bool:
-        return pwd_context.verify(plain_password, str(self.hashed_password))
+        # user จาก user cache ไม่มี hashed_password: โหลดจาก DB ตอนอ่านครั้งแรก
+        return verify_password(plain_password, str(self.hashed_password))
 
     # Method สำหรับอัปเดต last_login
     def update_last_login(self):
@@ -1,6 +1,16 @@
-from typing import Any, Generic, TypeVar
+from typing import (
+    Any,
+    Dict,
+    Generic,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Type,
+    TypeVar,
+)
 
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationError
 
 T = TypeVar("T")
 
@@ -14,7 +24,79 @@ class BaseResponse(BaseModel):
 class Successfully(BaseResponse, Generic[T]):
     status: str = "success"
     data: Any = None
+    next_cursor: Optional[str] = None
 
 
 class Failed(BaseResponse):
     status: str = "fail"
+
+
+class BatchError(BaseModel):
+    index: int
+    msg: str
+
+
+class BatchResult(BaseModel, Generic[T]):
+    succeeded: List[T] = []
+    errors: List[BatchError] = []
+
+
+class BatchDelete(BaseModel):
+    ids: List[int]
+
+
+class BatchItem(NamedTuple):
+    index: int
+    id: Optional[int]
+    data: Any
+
+
+def format_validation_error(error: ValidationError) -> str:
+    """Flatten a pydantic ValidationError into 'field: message; ...'."""
+    return "; ".join(
+        f"{'.'.join(str(loc) for loc in err['loc'])}: {err['msg']}"
+        for err in error.errors()
+    )
+
+
+def validate_batch(
+    schema: Type[BaseModel], items: List[Any], with_id: bool = False
+) -> Tuple[List[BatchItem], List[BatchError]]:
+    """Validate each item of a batch payload on its own.
+
+    Invalid items are reported by their position in the payload instead of
+    failing the whole request. With ``with_id`` every item must also carry
+    an integer ``id`` (used by batch updates).
+    """
+    valid: List[BatchItem] = []
+    errors: List[BatchError] = []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            errors.append(BatchError(index=index, msg="Item must be an object"))
+            continue
+        id = None
+        if with_id:
+            id = item.get("id")
+            if not isinstance(id, int) or isinstance(id, bool):
+                errors.append(
+                    BatchError(index=index, msg="Item requires an integer id")
+                )
+                continue
+            item = {key: value for key, value in item.items() if key != "id"}
+        try:
+            valid.append(BatchItem(index, id, schema.model_validate(item)))
+        except ValidationError as e:
+            errors.append(BatchError(index=index, msg=format_validation_error(e)))
+    return valid, errors
+
+
+def batch_not_found_errors(
+    requested: List[Tuple[int, int]], rows: List[Dict[str, Any]], msg: str
+) -> List[BatchError]:
+    """Report the (index, id) pairs whose id is missing from the returned rows."""
+    found = {row["id"] for row in rows}
+    return [
+        BatchError(index=index, msg=msg)
+        for index, id in requested
+        if id not in found
+    ]
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import List
+from pydantic import BaseModel, Field
+from typing import Annotated, List, Literal, Optional, Union
 from datetime import datetime
 
 
@@ -11,7 +11,7 @@ class CartLineBase(BaseModel):
 
 
 class CartLineCreate(CartLineBase):
-    pass
+    cart_id: int
 
 
 class CartLineUpdate(CartLineBase):
@@ -41,6 +41,7 @@ class CartLine(CartLineBase):
 
 class CartBase(BaseModel):
     customer_id: int
+    tax_rate: float = 0.0
 
 
 class CartCreate(CartBase):
@@ -53,6 +54,9 @@ class CartUpdate(CartBase):
 
 class Cart(CartBase):
     id: int
+    subtotal_amount: float = 0.0
+    discount_amount: float = 0.0
+    tax_amount: float = 0.0
     total_amount: float
     last_updated: datetime
     cart_lines: List[CartLine] = []
@@ -66,3 +70,49 @@ class Cart(CartBase):
             total += cart_line.calculate_total(tax_rate)
         self.total_amount = total
         return total
+
+
+class RepriceRequest(BaseModel):
+    product_ids: Optional[List[int]] = None
+    discount_percentage: Optional[float] = Field(None, ge=0, le=100)
+
+
+class RepriceResult(BaseModel):
+    lines: int
+    carts: int
+
+
+class AddLineOperation(BaseModel):
+    op: Literal["add"]
+    product_id: int
+    quantity: int = Field(..., gt=0)
+    price: float
+    discount_amount: float = 0.0
+
+
+class SetQuantityOperation(BaseModel):
+    op: Literal["set_quantity"]
+    line_id: int
+    quantity: int = Field(..., gt=0)
+
+
+class RemoveLineOperation(BaseModel):
+    op: Literal["remove"]
+    line_id: int
+
+
+class DiscountLineOperation(BaseModel):
+    op: Literal["discount"]
+    line_id: int
+    discount_rate: float = Field(..., ge=0, le=1)
+
+
+CartLineOperation = Annotated[
+    Union[
+        AddLineOperation,
+        SetQuantityOperation,
+        RemoveLineOperation,
+        DiscountLineOperation,
+    ],
+    Field(discriminator="op"),
+]
@@ -1,7 +1,9 @@
-from typing import Optional
+from typing import List, Optional
 
 from pydantic import BaseModel
 
+from app.schemas.base import BatchError
+
 
 class CatalogueBase(BaseModel):
     name: str
@@ -9,16 +11,41 @@ class CatalogueBase(BaseModel):
     price: float
     stock: int
     category: Optional[str] = None
+    sku: Optional[str] = None
 
 
 class CatalogueCreate(CatalogueBase):
     pass
 
 
+class CatalogueUpsert(CatalogueBase):
+    sku: str
+
+
 class CatalogueUpdate(CatalogueBase):
     pass
 
 
+class CatalogueSyncResult(BaseModel):
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    errors: List[BatchError] = []
+
+
+class CatalogueImportError(BaseModel):
+    line: int
+    msg: str
+
+
+class CatalogueImportResult(BaseModel):
+    processed: int = 0
+    inserted: int = 0
+    skipped: int = 0
+    invalid: int = 0
+    errors: List[CatalogueImportError] = []
+
+
 class Catalogue(CatalogueBase):
     id: int
 
@@ -1,10 +1,12 @@
 from datetime import datetime
+from typing import Optional
 
 from pydantic import BaseModel
 
 
 class CheckoutBase(BaseModel):
     order_id: int
+    cart_id: Optional[int] = None
     status: str = "in_progress"
 
 
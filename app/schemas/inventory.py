@@ -0,0 +1,28 @@
+from datetime import datetime
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+from app.models.inventory import ReservationStatusEnum
+
+
+class ReservationItem(BaseModel):
+    product_id: int
+    quantity: int = Field(..., gt=0)
+
+
+class ReservationCreate(BaseModel):
+    items: List[ReservationItem] = Field(..., min_length=1)
+    ttl_seconds: Optional[int] = Field(None, gt=0)
+
+
+class StockReservation(BaseModel):
+    id: int
+    product_id: int
+    checkout_id: Optional[int] = None
+    quantity: int
+    status: ReservationStatusEnum
+    expires_at: datetime
+
+    class Config:
+        from_attributes = True
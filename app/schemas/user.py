@@ -54,4 +54,4 @@ class UserResponse(UserBase):
     is_verified: bool
 
     class Config:
-        orm_mode = True
+        from_attributes = True
@@ -22,7 +22,21 @@ class AddressService(BaseService[Address, AddressCreate, AddressUpdate]):
             db_obj = self.model(**create_data)
             with self._session_scope() as session:
                 session.add(db_obj)
-                session.refresh(db_obj)
+            return db_obj
+        except Exception as e:
+            self.logger.error(f"Address creation failed: {str(e)}")
+            raise DatabaseError(f"Failed to create address: {str(e)}")
+
+    async def async_create(self, obj_in: AddressCreate) -> Address:
+        """Create a new address for a specific user without blocking the event loop."""
+        try:
+            self.logger.info(f"Creating address for user_id: {obj_in.user_id}")
+            create_data = obj_in.model_dump()
+            create_data["user_id"] = obj_in.user_id
+            db_obj = self.model(**create_data)
+            async with self._async_session_scope() as session:
+                session.add(db_obj)
+                await session.flush()
             return db_obj
         except Exception as e:
             self.logger.error(f"Address creation failed: {str(e)}")
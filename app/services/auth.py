@@ -8,7 +8,9 @@ from sqlalchemy.orm import Session
 from app import settings
 from app.core.auth_handler import decode_jwt, sign_jwt, sign_refresh_token
 from app.core.exceptions import AuthenticationError, DatabaseError
+from app.core.revocation import revocation_list
 from app.core.security import get_password_hash
+from app.core.user_cache import user_cache
 from app.models.user import User
 from app.schemas.auth import (
     ConfirmPasswordRequest,
@@ -79,7 +81,6 @@ class AuthService(BaseService[User, UserCreate, UserResponse]):
 
             with self._session_scope() as session:
                 session.add(new_user)
-                session.refresh(new_user)
 
             self.email_service.send_template_email(
                 background_tasks=background_tasks,
@@ -106,6 +107,15 @@ class AuthService(BaseService[User, UserCreate, UserResponse]):
             user_id = payload.get("id")
             if not user_id:
                 raise AuthenticationError("Invalid refresh token", status_code=401)
+            if revocation_list.is_revoked(payload.get("jti"), self.db):
+                raise AuthenticationError(
+                    "Refresh token has been revoked", status_code=401
+                )
+            user = self.db.get(User, int(user_id))
+            if not user or revocation_list.is_revoked_for_user(payload, user):
+                raise AuthenticationError(
+                    "Refresh token has been revoked", status_code=401
+                )
 
             return sign_jwt(user_id)
         except jwt.ExpiredSignatureError:
@@ -113,6 +123,23 @@ class AuthService(BaseService[User, UserCreate, UserResponse]):
         except jwt.PyJWKError:
             raise AuthenticationError("Invalid refresh token", status_code=401)
 
+    def revoke_token(self, token: str) -> None:
+        """Revoke a token before its expiry (logout, compromised account)."""
+        payload = decode_jwt(token)
+        if not payload:
+            raise AuthenticationError("Invalid token", status_code=401)
+        try:
+            revocation_list.revoke(self.db, payload.get("jti"), payload.get("exp"))
+        except SQLAlchemyError as e:
+            self.logger.error(f"Token revocation failed: {str(e)}")
+            raise DatabaseError(f"Failed to revoke token: {str(e)}")
+
+    def logout(self, access_token: Optional[str], refresh_token: Optional[str]) -> None:
+        """Revoke the access token and, if given, the refresh token."""
+        for token in (access_token, refresh_token):
+            if token:
+                self.revoke_token(token)
+
     def reset_password_request(self, email: str) -> str:
         """Request a password reset token."""
         try:
@@ -132,15 +159,28 @@ class AuthService(BaseService[User, UserCreate, UserResponse]):
             user_id = payload.get("id")
             if not user_id:
                 raise AuthenticationError("Invalid token", status_code=401)
+            if revocation_list.is_revoked(payload.get("jti"), self.db):
+                raise AuthenticationError(
+                    "Token has already been used", status_code=401
+                )
 
             user = self.db.query(User).filter(User.id == user_id).first()
             if not user:
                 raise AuthenticationError("User not found", status_code=404)
+            if revocation_list.is_revoked_for_user(payload, user):
+                raise AuthenticationError(
+                    "Token has already been used", status_code=401
+                )
 
             user.hashed_password = get_password_hash(request.new_password)
             user.update_last_login()
+            # token ทุกตัวที่ออกก่อนหน้านี้ (access, refresh, reset) ใช้ไม่ได้อีก
+            revocation_list.revoke_user(user)
             with self._session_scope() as session:
                 session.add(user)
+            user_cache.invalidate([str(user_id)])
+            # reset token ใช้ได้ครั้งเดียว
+            revocation_list.revoke(self.db, payload.get("jti"), payload.get("exp"))
         except jwt.ExpiredSignatureError:
             raise AuthenticationError("Token expired", status_code=401)
         except jwt.PyJWKError:
@@ -158,10 +198,13 @@ class AuthService(BaseService[User, UserCreate, UserResponse]):
                     "Invalid username or password", status_code=400
                 )
 
+            user_id = str(user.id)
             user.hashed_password = get_password_hash(request.new_password)
             user.update_last_login()
+            revocation_list.revoke_user(user)
             with self._session_scope() as session:
                 session.add(user)
+            user_cache.invalidate([user_id])
         except SQLAlchemyError as e:
             self.logger.error(f"Password confirmation failed: {str(e)}")
             raise DatabaseError(f"Failed to update password: {str(e)}")
@@ -1,45 +1,230 @@
 import logging
-from contextlib import contextmanager
-from typing import Generic, List, Optional, TypeVar
+from contextlib import asynccontextmanager, contextmanager
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Generic,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+    Union,
+)
 
 from pydantic import BaseModel as PydanticBaseModel
+from sqlalchemy import (
+    Integer,
+    Table,
+    bindparam,
+    cast,
+    column,
+    delete,
+    func,
+    insert,
+    inspect,
+    select,
+    tuple_,
+    update,
+    values,
+)
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.core.db.connect import BaseModel
 from app.core.exceptions import DatabaseError
+from app.core.pagination import CURSOR_DECODERS, decode_cursor, encode_cursor
+from app.settings import base as settings
 
 ModelType = TypeVar("ModelType", bound=BaseModel)
 CreateSchemaType = TypeVar("CreateSchemaType", bound=PydanticBaseModel)
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=PydanticBaseModel)
 
 
+def update_rows(
+    session: Session,
+    table: Table,
+    rows: List[Dict[str, Any]],
+    types: Dict[str, Any],
+    statement: Callable[[Callable[[str], Any]], Any],
+) -> None:
+    """Run one UPDATE for many parameter rows.
+
+    ``statement(param)`` builds the UPDATE, using ``param(name)`` wherever a
+    per-row value goes; ``types`` gives the SQL type of every name (scalar
+    types only). On PostgreSQL the rows are joined in as
+    ``FROM unnest(:a, :b, ...)`` with one array parameter per name, one
+    statement per BATCH_CHUNK_SIZE rows; elsewhere it is an executemany.
+    """
+    if not rows:
+        return
+    if session.get_bind().dialect.name != "postgresql":
+        session.execute(statement(bindparam), rows)
+        return
+    names = list(types)
+    # array parameter แทน VALUES literal: SQL เหมือนเดิมทุก chunk จึง compile ครั้งเดียว
+    source = (
+        func.unnest(*[bindparam(name, type_=ARRAY(types[name])) for name in names])
+        .table_valued(*[column(name, types[name]) for name in names])
+        .render_derived(name="source")
+    )
+    query = statement(lambda name: source.c[name])
+    size = settings.BATCH_CHUNK_SIZE
+    for start in range(0, len(rows), size):
+        chunk = rows[start : start + size]
+        session.execute(query, {name: [row[name] for row in chunk] for name in names})
+
+
 class BaseService(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
-    """Base service class for common CRUD operations."""
+    """Base service class for common CRUD operations.
+
+    get reads from the primary, since callers often build a write from the
+    row; pure reads pass ``read_only=True`` to use a replica. get_multi and
+    paginate always read from a replica when one is configured. Once the
+    session has written, reads stay on the primary (see RoutingSession).
+
+    create_many/update_many/remove_many are set-based and return plain row
+    dicts instead of ORM instances, so large batches never go through the
+    identity map. Each call runs in a single transaction.
+
+    paginate/async_paginate page with a keyset on ``cursor_fields`` (which
+    must be unique together), so every page costs one index range scan
+    no matter how deep it is. Cursor columns must be integer, string,
+    date/datetime, Decimal or UUID columns.
+
+    ``loader_options`` declares how relationships are loaded per operation
+    ("get" for a single row, "list" for get_multi/paginate), e.g.
+    ``{"list": (selectinload(Cart.cart_lines),)}``, so serializing a page
+    costs a fixed number of queries instead of one per row.
+    """
 
-    def __init__(self, model: type[ModelType], db: Session):
-        """Initialize the service with a model and database session."""
+    cursor_fields: Tuple[str, ...] = ("id",)
+    loader_options: Dict[str, Sequence[Any]] = {}
+
+    def __init__(self, model: type[ModelType], db: Union[Session, AsyncSession]):
+        """Initialize the service with a model and a sync or async database session."""
         self.model = model
         self.db = db
         self.logger = logging.getLogger(__name__)
 
     @contextmanager
     def _session_scope(self):
-        """Provide a transactional scope around a series of operations."""
+        """Provide a transactional scope around a series of operations.
+
+        The session stays open: whoever created it owns it (get_request_db
+        for a request, a ``with SessionLocal()`` block elsewhere).
+        """
         try:
             yield self.db
             self.db.commit()
         except SQLAlchemyError as e:
             self.db.rollback()
             raise DatabaseError(f"Database operation failed: {str(e)}")
-        finally:
-            self.db.close()
 
-    def get(self, id: int) -> Optional[ModelType]:
-        """Retrieve an instance by its ID."""
+    @asynccontextmanager
+    async def _async_session_scope(self):
+        """Provide a transactional scope around a series of async operations."""
+        try:
+            yield self.db
+            await self.db.commit()
+        except SQLAlchemyError as e:
+            await self.db.rollback()
+            raise DatabaseError(f"Database operation failed: {str(e)}")
+
+    def _column_values(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Keep only the keys that map to a column of the model."""
+        columns = inspect(self.model).column_attrs.keys()
+        return {key: value for key, value in data.items() if key in columns}
+
+    @staticmethod
+    def _chunks(items: Sequence[Any]) -> Iterator[Sequence[Any]]:
+        """Split items so that a single statement never exceeds BATCH_CHUNK_SIZE."""
+        size = settings.BATCH_CHUNK_SIZE
+        for start in range(0, len(items), size):
+            yield items[start : start + size]
+
+    def _on_bulk_write(self, session: Session, rows: List[Dict[str, Any]]) -> None:
+        """Hook run inside the bulk transaction with the rows that were written."""
+
+    def _options(self, operation: str) -> Sequence[Any]:
+        """Loader options declared for ``operation`` ("get" or "list")."""
+        return self.loader_options.get(operation, ())
+
+    def _cursor_types(self) -> Dict[str, type]:
+        """Python type of every cursor column, checked against CURSOR_DECODERS."""
+        types = {}
+        for field in self.cursor_fields:
+            python_type = getattr(self.model, field).type.python_type
+            if python_type not in CURSOR_DECODERS:
+                raise TypeError(
+                    f"{self.model.__name__}.{field} ({python_type.__name__}) "
+                    "cannot be a cursor field"
+                )
+            types[field] = python_type
+        return types
+
+    def _paginate_query(
+        self,
+        limit: int,
+        cursor: Optional[str],
+        skip: int,
+        fields: Optional[Sequence[str]] = None,
+    ):
+        """Build the page query; fetches one extra row to detect a next page.
+
+        With ``fields`` only those columns (plus the cursor columns) are
+        selected, so no ORM instances are built.
+        """
+        # ตรวจทุกหน้า ไม่ใช่แค่ตอนมี cursor: type ที่ใช้ไม่ได้ควรพังตั้งแต่หน้าแรก
+        types = self._cursor_types()
+        sort_columns = [getattr(self.model, field) for field in self.cursor_fields]
+        if fields:
+            selected = dict.fromkeys([*fields, *self.cursor_fields])
+            query = select(*[getattr(self.model, field) for field in selected])
+        else:
+            query = select(self.model).options(*self._options("list"))
+        query = query.execution_options(use_replica=True).order_by(*sort_columns)
+        if cursor:
+            values = decode_cursor(cursor, types)
+            after = [values[field] for field in self.cursor_fields]
+            if len(sort_columns) == 1:
+                query = query.where(sort_columns[0] > after[0])
+            else:
+                query = query.where(tuple_(*sort_columns) > tuple_(*after))
+        elif skip:
+            query = query.offset(skip)
+        return query.limit(limit + 1)
+
+    def _page(self, rows: List[Any], limit: int) -> Tuple[List[Any], Optional[str]]:
+        """Trim the extra row and build the cursor pointing after the last one."""
+        if len(rows) <= limit:
+            return rows, None
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(
+            {field: getattr(last, field) for field in self.cursor_fields}
+        )
+        return rows, next_cursor
+
+    def get(self, id: int, read_only: bool = False) -> Optional[ModelType]:
+        """Retrieve an instance by its ID.
+
+        ``read_only`` reads from a replica, which may lag: only for rows that
+        are returned as they are, never for rows a write is based on.
+        """
         try:
             with self._session_scope() as session:
-                return session.query(self.model).filter(self.model.id == id).first()
+                # select() ไม่ใช่ Query: option ต้องอยู่บน statement RoutingSession ถึงเห็น
+                return session.scalars(
+                    select(self.model)
+                    .options(*self._options("get"))
+                    .execution_options(use_replica=read_only)
+                    .filter(self.model.id == id)
+                ).first()
         except Exception as e:
             self.logger.error(
                 f"Failed to get {self.model.__name__} with id {id}: {str(e)}"
@@ -48,7 +233,59 @@ class BaseService(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
 
     def get_multi(self, skip: int = 0, limit: int = 100) -> List[ModelType]:
         """Retrieve multiple objects with pagination."""
-        return self.db.query(self.model).offset(skip).limit(limit).all()
+        return (
+            self.db.query(self.model)
+            .options(*self._options("list"))
+            .execution_options(use_replica=True)
+            .offset(skip)
+            .limit(limit)
+            .all()
+        )
+
+    @staticmethod
+    def _project(rows: List[Any], fields: Sequence[str]) -> List[Dict[str, Any]]:
+        """Turn column rows into dicts holding only the requested fields."""
+        return [{field: getattr(row, field) for field in fields} for row in rows]
+
+    def paginate(
+        self,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        skip: int = 0,
+        fields: Optional[Sequence[str]] = None,
+    ) -> Tuple[List[Any], Optional[str]]:
+        """Return one page and the cursor of the next page (None on the last page).
+
+        ``skip`` is only honoured without a cursor, for clients that still
+        page with offsets. With ``fields`` the page holds dicts of those
+        columns instead of model instances.
+        """
+        query = self._paginate_query(limit, cursor, skip, fields)
+        if not fields:
+            return self._page(list(self.db.scalars(query)), limit)
+        rows, next_cursor = self._page(list(self.db.execute(query)), limit)
+        return self._project(rows, fields), next_cursor
+
+    def stream(
+        self, fields: Sequence[str], batch_size: Optional[int] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """Yield every row as a dict of ``fields`` from a single server-side cursor.
+
+        Rows are fetched ``batch_size`` at a time and never hydrated into
+        ORM instances, so memory stays flat regardless of table size.
+        """
+        columns = [getattr(self.model, field) for field in fields]
+        query = (
+            select(*columns)
+            .order_by(*[getattr(self.model, field) for field in self.cursor_fields])
+            .execution_options(
+                use_replica=True,
+                stream_results=True,
+                yield_per=batch_size or settings.EXPORT_YIELD_PER,
+            )
+        )
+        for row in self.db.execute(query):
+            yield dict(zip(fields, row))
 
     def create(self, obj_in: CreateSchemaType) -> ModelType:
         """Create a new object."""
@@ -57,7 +294,6 @@ class BaseService(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
             db_obj = self.model(**obj_in.model_dump())
             with self._session_scope() as session:
                 session.add(db_obj)
-                session.refresh(db_obj)
             return db_obj
         except SQLAlchemyError as e:
             self.logger.error(f"{self.model.__name__} creation failed: {str(e)}")
@@ -74,7 +310,6 @@ class BaseService(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
                     setattr(db_obj, field, value)
             with self._session_scope() as session:
                 session.add(db_obj)
-                session.refresh(db_obj)
             return db_obj
         except SQLAlchemyError as e:
             self.logger.error(f"{self.model.__name__} update failed: {str(e)}")
@@ -98,3 +333,259 @@ class BaseService(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
             raise DatabaseError(
                 f"Failed to remove {self.model.__name__.lower()}: {str(e)}"
             )
+
+    def create_many(
+        self, objs_in: Sequence[CreateSchemaType]
+    ) -> List[Dict[str, Any]]:
+        """Insert many objects with multi-row INSERT ... RETURNING."""
+        if not objs_in:
+            return []
+        columns = self.model.__table__.columns
+        values = [self._column_values(obj_in.model_dump()) for obj_in in objs_in]
+        created: List[Dict[str, Any]] = []
+        try:
+            self.logger.info(f"Creating {len(values)} {self.model.__name__} rows")
+            with self._session_scope() as session:
+                for chunk in self._chunks(values):
+                    result = session.execute(
+                        insert(self.model).returning(*columns), list(chunk)
+                    )
+                    created.extend(dict(row._mapping) for row in result)
+                self._on_bulk_write(session, created)
+            return created
+        except SQLAlchemyError as e:
+            self.logger.error(f"{self.model.__name__} bulk creation failed: {str(e)}")
+            raise DatabaseError(
+                f"Failed to create {self.model.__name__.lower()} batch: {str(e)}"
+            )
+
+    def _update_returning(
+        self, session: Session, changes: Dict[int, Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """PostgreSQL: UPDATE ... FROM (VALUES ...) RETURNING, one per chunk.
+
+        Rows are grouped by the set of columns they change, since every
+        row of a VALUES list has the same columns.
+        """
+        table = self.model.__table__
+        groups: Dict[Tuple[str, ...], List[int]] = {}
+        for id, fields in changes.items():
+            groups.setdefault(tuple(sorted(fields)), []).append(id)
+        rows: List[Dict[str, Any]] = []
+        for names, ids in groups.items():
+            for chunk in self._chunks(ids):
+                if not names:
+                    query = select(*table.columns).where(table.c.id.in_(chunk))
+                    rows.extend(dict(row._mapping) for row in session.execute(query))
+                    continue
+                source = values(
+                    column("id", Integer),
+                    *[column(name, table.c[name].type) for name in names],
+                    name="source",
+                ).data([(id, *(changes[id][name] for name in names)) for id in chunk])
+                # cast: คอลัมน์ใน VALUES ไม่รู้ type ของตาราง (เช่น enum)
+                statement = (
+                    update(table)
+                    .where(table.c.id == source.c.id)
+                    .values(
+                        {
+                            name: cast(source.c[name], table.c[name].type)
+                            for name in names
+                        }
+                    )
+                    .returning(*table.columns)
+                )
+                rows.extend(dict(row._mapping) for row in session.execute(statement))
+        return rows
+
+    def _update_then_select(
+        self, session: Session, changes: Dict[int, Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """Other dialects: Core executemany UPDATE by primary key, then read back.
+
+        Core rather than ORM bulk UPDATE: the ORM raises StaleDataError when
+        an id matches no row, and missing ids must be skipped. Rows are
+        grouped by the columns they change, as every row of an executemany
+        binds the same parameters.
+        """
+        table = self.model.__table__
+        groups: Dict[Tuple[str, ...], List[int]] = {}
+        for id, fields in changes.items():
+            if fields:
+                groups.setdefault(tuple(sorted(fields)), []).append(id)
+        for names, ids in groups.items():
+            statement = (
+                update(table)
+                .where(table.c.id == bindparam("b_id"))
+                .values({name: bindparam(f"b_{name}") for name in names})
+            )
+            for chunk in self._chunks(ids):
+                session.execute(
+                    statement,
+                    [
+                        {"b_id": id, **{f"b_{name}": changes[id][name] for name in names}}
+                        for id in chunk
+                    ],
+                )
+        rows: List[Dict[str, Any]] = []
+        for chunk in self._chunks(list(changes)):
+            query = select(*table.columns).where(table.c.id.in_(chunk))
+            rows.extend(dict(row._mapping) for row in session.execute(query))
+        return rows
+
+    def update_many(
+        self, objs_in: Sequence[Tuple[int, UpdateSchemaType]]
+    ) -> List[Dict[str, Any]]:
+        """Update many objects by primary key and return the rows that exist.
+
+        Ids that do not exist are skipped; callers compare the returned ids
+        with the requested ones to report them. On PostgreSQL this is one
+        UPDATE ... RETURNING per chunk, with no SELECT before or after.
+        """
+        if not objs_in:
+            return []
+        # id ซ้ำ: ค่าที่มาทีหลังทับค่าก่อนหน้า เหมือน UPDATE ทีละแถวตามลำดับ
+        changes: Dict[int, Dict[str, Any]] = {}
+        for id, obj_in in objs_in:
+            fields = self._column_values(obj_in.model_dump(exclude_unset=True))
+            fields.pop("id", None)
+            changes.setdefault(id, {}).update(fields)
+        try:
+            with self._session_scope() as session:
+                if session.get_bind().dialect.name == "postgresql":
+                    rows = self._update_returning(session, changes)
+                else:
+                    rows = self._update_then_select(session, changes)
+                by_id = {row["id"]: row for row in rows}
+                updated = [by_id[id] for id in changes if id in by_id]
+                self._on_bulk_write(session, updated)
+            return updated
+        except SQLAlchemyError as e:
+            self.logger.error(f"{self.model.__name__} bulk update failed: {str(e)}")
+            raise DatabaseError(
+                f"Failed to update {self.model.__name__.lower()} batch: {str(e)}"
+            )
+
+    def remove_many(self, ids: Sequence[int]) -> List[Dict[str, Any]]:
+        """Delete many objects with DELETE ... WHERE id IN (...) RETURNING."""
+        if not ids:
+            return []
+        columns = self.model.__table__.columns
+        removed: List[Dict[str, Any]] = []
+        try:
+            with self._session_scope() as session:
+                for chunk in self._chunks(list(ids)):
+                    result = session.execute(
+                        delete(self.model)
+                        .where(self.model.id.in_(chunk))
+                        .returning(*columns)
+                        .execution_options(synchronize_session=False)
+                    )
+                    removed.extend(dict(row._mapping) for row in result)
+                self._on_bulk_write(session, removed)
+            self.logger.info(f"{len(removed)} {self.model.__name__} rows deleted")
+            return removed
+        except SQLAlchemyError as e:
+            self.logger.error(f"{self.model.__name__} bulk removal failed: {str(e)}")
+            raise DatabaseError(
+                f"Failed to remove {self.model.__name__.lower()} batch: {str(e)}"
+            )
+
+    async def async_get(
+        self, id: int, read_only: bool = False
+    ) -> Optional[ModelType]:
+        """Retrieve an instance by its ID without blocking the event loop.
+
+        ``read_only`` works as in ``get``.
+        """
+        try:
+            async with self._async_session_scope() as session:
+                result = await session.execute(
+                    select(self.model)
+                    .options(*self._options("get"))
+                    .execution_options(use_replica=read_only)
+                    .filter(self.model.id == id)
+                )
+                return result.scalars().first()
+        except Exception as e:
+            self.logger.error(
+                f"Failed to get {self.model.__name__} with id {id}: {str(e)}"
+            )
+            raise DatabaseError(f"Failed to get {self.model.__name__}: {str(e)}")
+
+    async def async_get_multi(self, skip: int = 0, limit: int = 100) -> List[ModelType]:
+        """Retrieve multiple objects with pagination without blocking the event loop."""
+        result = await self.db.execute(
+            select(self.model)
+            .options(*self._options("list"))
+            .execution_options(use_replica=True)
+            .offset(skip)
+            .limit(limit)
+        )
+        return list(result.scalars().all())
+
+    async def async_paginate(
+        self,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        skip: int = 0,
+        fields: Optional[Sequence[str]] = None,
+    ) -> Tuple[List[Any], Optional[str]]:
+        """Return one page and the next cursor without blocking the event loop."""
+        query = self._paginate_query(limit, cursor, skip, fields)
+        if not fields:
+            return self._page(list(await self.db.scalars(query)), limit)
+        result = await self.db.execute(query)
+        rows, next_cursor = self._page(list(result), limit)
+        return self._project(rows, fields), next_cursor
+
+    async def async_create(self, obj_in: CreateSchemaType) -> ModelType:
+        """Create a new object without blocking the event loop."""
+        try:
+            self.logger.info(f"Creating {self.model.__name__}")
+            db_obj = self.model(**obj_in.model_dump())
+            async with self._async_session_scope() as session:
+                session.add(db_obj)
+                await session.flush()
+            return db_obj
+        except SQLAlchemyError as e:
+            self.logger.error(f"{self.model.__name__} creation failed: {str(e)}")
+            raise DatabaseError(
+                f"Failed to create {self.model.__name__.lower()}: {str(e)}"
+            )
+
+    async def async_update(
+        self, db_obj: ModelType, obj_in: UpdateSchemaType
+    ) -> ModelType:
+        """Update an existing object without blocking the event loop."""
+        try:
+            update_data = obj_in.model_dump(exclude_unset=True)
+            for field, value in update_data.items():
+                if hasattr(db_obj, field):
+                    setattr(db_obj, field, value)
+            async with self._async_session_scope() as session:
+                session.add(db_obj)
+                await session.flush()
+            return db_obj
+        except SQLAlchemyError as e:
+            self.logger.error(f"{self.model.__name__} update failed: {str(e)}")
+            raise DatabaseError(
+                f"Failed to update {self.model.__name__.lower()}: {str(e)}"
+            )
+
+    async def async_remove(self, id: int) -> Optional[ModelType]:
+        """Remove an object by ID without blocking the event loop."""
+        try:
+            obj = await self.db.get(self.model, id)
+            if not obj:
+                self.logger.warning(f"{self.model.__name__} with id {id} not found")
+                return None
+            async with self._async_session_scope() as session:
+                await session.delete(obj)
+            self.logger.info(f"{self.model.__name__} {id} deleted successfully")
+            return obj
+        except SQLAlchemyError as e:
+            self.logger.error(f"{self.model.__name__} removal failed: {str(e)}")
+            raise DatabaseError(
+                f"Failed to remove {self.model.__name__.lower()}: {str(e)}"
+            )
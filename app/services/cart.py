@@ -1,14 +1,128 @@
-from sqlalchemy.orm import Session
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
 
-from app.core.exceptions import DatabaseError
-from app.models.cart import Cart, CartLine
-from app.schemas.cart import CartCreate, CartUpdate, CartLineCreate, CartLineUpdate
-from app.services.base import BaseService
+from sqlalchemy import Float, Integer, func, or_, select, update
+from sqlalchemy.orm import Session, joinedload, selectinload
+
+from app.core.exceptions import CartOperationError, DatabaseError
+from app.models.cart import Cart, CartLine, line_totals
+from app.schemas.cart import (
+    CartCreate,
+    CartLineCreate,
+    CartLineOperation,
+    CartLineUpdate,
+    CartUpdate,
+)
+from app.services.base import BaseService, update_rows
+
+# (cart_id, subtotal, discount) ของ line หนึ่งแถว
+LineAmounts = Tuple[int, float, float]
+
+# ยอมให้ต่างกันได้เท่านี้ก่อนนับว่า total drift (float สะสมจาก delta)
+DRIFT_TOLERANCE = 0.005
+
+# snapshot ห่างจาก DB ได้ไม่เกินจำนวน write ที่ยังไม่ flush ซึ่งไม่มีทางถึงค่านี้
+STORE_VERSION_GAP = 1 << 16
+
+TOTAL_FIELDS = ("subtotal_amount", "discount_amount", "tax_amount", "total_amount")
+
+
+def _line_amounts(cart_line: CartLine) -> LineAmounts:
+    return (
+        cart_line.cart_id,
+        cart_line.price * cart_line.quantity,
+        cart_line.discount_amount or 0.0,
+    )
+
+
+def shift_cart_totals(
+    session: Session,
+    before: Iterable[LineAmounts] = (),
+    after: Iterable[LineAmounts] = (),
+) -> None:
+    """Move cart totals from the ``before`` line amounts to the ``after`` ones.
+
+    One executemany UPDATE per call, in the caller's transaction. Deltas are
+    applied relative to the stored columns, so concurrent writers to the same
+    cart do not overwrite each other's changes.
+    """
+    deltas: Dict[int, List[float]] = defaultdict(lambda: [0.0, 0.0])
+    for cart_id, subtotal, discount in before:
+        deltas[cart_id][0] -= subtotal
+        deltas[cart_id][1] -= discount
+    for cart_id, subtotal, discount in after:
+        deltas[cart_id][0] += subtotal
+        deltas[cart_id][1] += discount
+    apply_cart_deltas(session, deltas)
+
+
+def apply_cart_deltas(
+    session: Session,
+    deltas: Dict[int, Sequence[float]],
+    bump_store_version: bool = False,
+) -> None:
+    """Add ``{cart_id: (subtotal_delta, discount_delta)}`` to the stored cart totals.
+
+    Tax and total are re-derived from the shifted columns in the same
+    UPDATE. Carts are updated in id order so concurrent callers lock rows
+    in the same order.
+
+    Writers that bypass the write-behind store pass ``bump_store_version``:
+    every listed cart then moves STORE_VERSION_GAP past any version a
+    snapshot of it can hold, so stale snapshots fail to flush and are
+    reloaded instead of overwriting this write.
+    """
+    params = [
+        {"b_cart_id": cart_id, "b_subtotal": subtotal, "b_discount": discount}
+        for cart_id, (subtotal, discount) in sorted(deltas.items())
+        if subtotal or discount or bump_store_version
+    ]
+    cart = Cart.__table__
+
+    def values(param) -> dict:
+        result = Cart.total_values(
+            cart.c.subtotal_amount + param("b_subtotal"),
+            cart.c.discount_amount + param("b_discount"),
+            cart.c.tax_rate,
+        )
+        if bump_store_version:
+            result["store_version"] = cart.c.store_version + STORE_VERSION_GAP
+        return result
+
+    update_rows(
+        session,
+        cart,
+        params,
+        {"b_cart_id": Integer, "b_subtotal": Float, "b_discount": Float},
+        lambda param: update(cart)
+        .where(cart.c.id == param("b_cart_id"))
+        .values(values(param)),
+    )
+
+
+def recompute_cart_totals(session: Session, cart_ids: Iterable[int]) -> None:
+    """Rebuild the stored totals of ``cart_ids`` from their lines in one UPDATE."""
+    cart_ids = sorted(set(cart_ids))
+    if not cart_ids:
+        return
+    subtotal, discount = line_totals()
+    session.execute(
+        update(Cart)
+        .where(Cart.id.in_(cart_ids))
+        .values(Cart.total_values(subtotal, discount, Cart.tax_rate))
+        .execution_options(synchronize_session=False)
+    )
 
 
 class CartService(BaseService[Cart, CartCreate, CartUpdate]):
     """Service class for managing cart-related operations."""
 
+    # Cart serializes cart_lines (ยอดรวมอ่านจากคอลัมน์ ไม่ต้องวน line)
+    loader_options = {
+        "get": (selectinload(Cart.cart_lines).joinedload(CartLine.product),),
+        "list": (selectinload(Cart.cart_lines),),
+    }
+
     def __init__(self, db: Session):
         super().__init__(model=Cart, db=db)
 
@@ -20,69 +134,224 @@ class CartService(BaseService[Cart, CartCreate, CartUpdate]):
             db_obj = self.model(**create_data)
             with self._session_scope() as session:
                 session.add(db_obj)
-                session.refresh(db_obj)
             return db_obj
         except Exception as e:
             self.logger.error(f"Cart creation failed: {str(e)}")
             raise DatabaseError(f"Failed to create cart: {str(e)}")
 
-    def calculate_total(self, cart_id: int, tax_rate: float = 0.07) -> float:
-        """Calculate the total amount for the cart including tax."""
-        cart = self.get(cart_id)
-        if not cart:
+    def update(self, db_obj: Cart, obj_in: CartUpdate) -> Cart:
+        """Update a cart; a new tax_rate re-derives tax and total from the stored amounts."""
+        if "tax_rate" in obj_in.model_fields_set:
+            # ใช้คอลัมน์ใน DB ไม่ใช่ค่าใน object ซึ่งอาจเก่ากว่า delta ล่าสุด
+            values = Cart.total_values(
+                Cart.subtotal_amount, Cart.discount_amount, obj_in.tax_rate
+            )
+            for field in ("tax_amount", "total_amount"):
+                setattr(db_obj, field, values[field])
+        return super().update(db_obj, obj_in)
+
+    def get_totals(self, cart_id: int) -> Optional[Dict[str, float]]:
+        """Read the maintained totals of a cart; one row, no line scan."""
+        columns = [getattr(Cart, field) for field in (*TOTAL_FIELDS, "tax_rate")]
+        row = self.db.execute(
+            select(*columns)
+            .where(Cart.id == cart_id)
+            .execution_options(use_replica=True)
+        ).first()
+        return dict(row._mapping) if row else None
+
+    def calculate_total(self, cart_id: int, tax_rate: Optional[float] = None) -> float:
+        """Return the cart total; with ``tax_rate`` it is re-taxed at that rate."""
+        totals = self.get_totals(cart_id)
+        if not totals:
             raise DatabaseError(f"Cart with id {cart_id} not found")
-        return cart.calculate_cart_total(tax_rate)
+        if tax_rate is None:
+            return totals["total_amount"]
+        return Cart.total_values(
+            totals["subtotal_amount"], totals["discount_amount"], tax_rate
+        )["total_amount"]
 
     def apply_discount(self, cart_id: int, discount_rate: float) -> float:
         """Apply a discount to all cart lines and return the total discount."""
-        cart = self.get(cart_id)
-        if not cart:
-            raise DatabaseError(f"Cart with id {cart_id} not found")
-        total_discount = cart.apply_cart_discount(discount_rate)
         with self._session_scope() as session:
-            session.add(cart)
+            session.execute(
+                update(CartLine)
+                .where(CartLine.cart_id == cart_id)
+                .values(discount_amount=CartLine.price * CartLine.quantity * discount_rate)
+                .execution_options(synchronize_session=False)
+            )
+            total_discount = session.execute(
+                update(Cart)
+                .where(Cart.id == cart_id)
+                .values(
+                    Cart.total_values(
+                        Cart.subtotal_amount,
+                        Cart.subtotal_amount * discount_rate,
+                        Cart.tax_rate,
+                    )
+                )
+                .returning(Cart.discount_amount)
+                .execution_options(synchronize_session=False)
+            ).scalar()
+            if total_discount is None:
+                raise DatabaseError(f"Cart with id {cart_id} not found")
         return total_discount
 
+    def mark_checked_out(self, cart_id: int) -> None:
+        """Stamp a cart as checked out; repricing leaves it alone from then on."""
+        with self._session_scope() as session:
+            session.execute(
+                update(Cart)
+                .where(Cart.id == cart_id, Cart.checked_out_at.is_(None))
+                .values(checked_out_at=func.now())
+                .execution_options(synchronize_session=False)
+            )
+
+    def find_drift(
+        self, tolerance: float = DRIFT_TOLERANCE
+    ) -> List[Dict[str, Any]]:
+        """Carts whose stored totals no longer match their lines.
+
+        Each entry holds the cart id with its stored and expected total.
+        """
+        subtotal, discount = line_totals()
+        expected = Cart.total_values(subtotal, discount, Cart.tax_rate)
+        drift = [
+            func.abs(getattr(Cart, field) - expected[field]) > tolerance
+            for field in TOTAL_FIELDS
+        ]
+        rows = self.db.execute(
+            select(
+                Cart.id.label("cart_id"),
+                Cart.total_amount,
+                expected["total_amount"].label("expected_total_amount"),
+            )
+            .where(or_(*drift))
+            .order_by(Cart.id)
+        )
+        return [dict(row._mapping) for row in rows]
+
+    def repair_drift(self, tolerance: float = DRIFT_TOLERANCE) -> List[Dict[str, Any]]:
+        """Recompute the totals of every drifted cart and return what was fixed."""
+        drifted = self.find_drift(tolerance)
+        with self._session_scope() as session:
+            recompute_cart_totals(session, [row["cart_id"] for row in drifted])
+        if drifted:
+            self.logger.warning(f"Repaired totals of {len(drifted)} carts")
+        return drifted
+
 
 class CartLineService(BaseService[CartLine, CartLineCreate, CartLineUpdate]):
     """Service class for managing cart line-related operations."""
 
+    loader_options = {"get": (joinedload(CartLine.product),)}
+
     def __init__(self, db: Session):
         super().__init__(model=CartLine, db=db)
 
     def create(self, obj_in: CartLineCreate) -> CartLine:
-        """Create a new cart line for a cart."""
+        """Create a new cart line and add it to the cart totals."""
         try:
             create_data = obj_in.model_dump()
             db_obj = self.model(**create_data)
             with self._session_scope() as session:
                 session.add(db_obj)
-                session.refresh(db_obj)
-
-                # อัปเดตยอดรวมของ Cart
-                cart = session.query(Cart).filter(Cart.id == db_obj.cart_id).first()
-                if cart:
-                    cart.calculate_cart_total(tax_rate=0.0)  # อัปเดต total_amount
-                    session.add(cart)
-
+                session.flush()
+                shift_cart_totals(session, after=[_line_amounts(db_obj)])
             return db_obj
         except Exception as e:
             self.logger.error(f"CartLine creation failed: {str(e)}")
             raise DatabaseError(f"Failed to create cart line: {str(e)}")
 
+    def update(self, db_obj: CartLine, obj_in: CartLineUpdate) -> CartLine:
+        """Update a cart line and shift the cart totals by the difference."""
+        before = _line_amounts(db_obj)
+        update_data = obj_in.model_dump(exclude_unset=True)
+        for field, value in update_data.items():
+            if hasattr(db_obj, field):
+                setattr(db_obj, field, value)
+        with self._session_scope() as session:
+            session.add(db_obj)
+            session.flush()
+            shift_cart_totals(session, [before], [_line_amounts(db_obj)])
+        return db_obj
+
+    def remove(self, id: int) -> Optional[CartLine]:
+        """Remove a cart line and take it out of the cart totals."""
+        cart_line = self.db.get(CartLine, id)
+        if not cart_line:
+            self.logger.warning(f"CartLine with id {id} not found")
+            return None
+        with self._session_scope() as session:
+            session.delete(cart_line)
+            session.flush()
+            shift_cart_totals(session, before=[_line_amounts(cart_line)])
+        return cart_line
+
+    def apply_ops(self, cart_id: int, ops: Sequence[CartLineOperation]) -> bool:
+        """Apply line operations to one cart in a single transaction.
+
+        The cart's lines are locked and loaded once, the ops run against
+        them in order, and the cart totals move by one delta UPDATE at the
+        end. An op on a line that is not in the cart rejects the whole
+        list. Returns False if the cart does not exist.
+        """
+        with self._session_scope() as session:
+            if session.get(Cart, cart_id) is None:
+                return False
+            query = (
+                select(CartLine).where(CartLine.cart_id == cart_id).with_for_update()
+            )
+            lines = {cart_line.id: cart_line for cart_line in session.scalars(query)}
+            before = [_line_amounts(cart_line) for cart_line in lines.values()]
+            added: List[CartLine] = []
+            try:
+                for index, op in enumerate(ops):
+                    if op.op == "add":
+                        data = op.model_dump(exclude={"op"})
+                        added.append(CartLine(cart_id=cart_id, **data))
+                        continue
+                    cart_line = lines.get(op.line_id)
+                    if cart_line is None:
+                        raise CartOperationError(
+                            index,
+                            f"CartLine with id {op.line_id} not in cart {cart_id}",
+                        )
+                    if op.op == "set_quantity":
+                        cart_line.quantity = op.quantity
+                    elif op.op == "discount":
+                        cart_line.apply_discount(op.discount_rate)
+                    else:
+                        session.delete(lines.pop(op.line_id))
+            except CartOperationError:
+                session.rollback()
+                raise
+            session.add_all(added)
+            session.flush()
+            remaining = [*lines.values(), *added]
+            after = [_line_amounts(cart_line) for cart_line in remaining]
+            shift_cart_totals(session, before, after)
+        return True
+
+    def _on_bulk_write(self, session: Session, rows: List[Dict[str, Any]]) -> None:
+        """Rebuild the totals of every cart touched by a bulk write in one UPDATE.
+
+        Bulk updates only see the rows after the write, so there is no
+        delta to apply; re-aggregating the touched carts is one statement.
+        """
+        recompute_cart_totals(session, (row["cart_id"] for row in rows))
+
     def apply_discount(self, cart_line_id: int, discount_rate: float) -> float:
         """Apply a discount to a cart line."""
         cart_line = self.get(cart_line_id)
         if not cart_line:
             raise DatabaseError(f"CartLine with id {cart_line_id} not found")
+        before = _line_amounts(cart_line)
         discount = cart_line.apply_discount(discount_rate)
         with self._session_scope() as session:
             session.add(cart_line)
-            # อัปเดตยอดรวมของ Cart
-            cart = session.query(Cart).filter(Cart.id == cart_line.cart_id).first()
-            if cart:
-                cart.calculate_cart_total(tax_rate=0.0)
-                session.add(cart)
+            session.flush()
+            shift_cart_totals(session, [before], [_line_amounts(cart_line)])
         return discount
 
     def calculate_tax(self, cart_line_id: int, tax_rate: float) -> float:
@@ -0,0 +1,982 @@
+import json
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import case, delete, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, selectinload
+
+from app.core.db.connect import SessionLocal
+from app.core.exceptions import CartOperationError, DatabaseError
+from app.core.redis import get_redis
+from app.models.cart import Cart, CartLine
+from app.models.catalogue import Catalogue
+from app.models.id_block import IdBlock
+from app.schemas.cart import (
+    CartLineCreate,
+    CartLineOperation,
+    CartLineUpdate,
+    CartUpdate,
+)
+from app.services.cart import TOTAL_FIELDS, CartLineService, CartService
+from app.settings import base as settings
+
+logger = logging.getLogger(__name__)
+
+HEADER_FIELDS = ("customer_id", "product_id", "quantity", "tax_rate")
+LINE_FIELDS = ("product_id", "quantity", "price", "discount_amount")
+
+Snapshot = Dict[str, Any]
+
+
+def _iso(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+def line_snapshot(cart_line: CartLine) -> Snapshot:
+    return {
+        "id": cart_line.id,
+        "cart_id": cart_line.cart_id,
+        **{field: getattr(cart_line, field) for field in LINE_FIELDS},
+        "discount_amount": cart_line.discount_amount or 0.0,
+        "added_at": _iso(cart_line.added_at),
+    }
+
+
+def cart_snapshot(cart: Cart) -> Snapshot:
+    """JSON-safe copy of a cart, its lines and totals."""
+    snapshot = {
+        "id": cart.id,
+        **{field: getattr(cart, field) for field in HEADER_FIELDS},
+        "cart_lines": [line_snapshot(cart_line) for cart_line in cart.cart_lines],
+    }
+    retotal(snapshot)
+    return snapshot
+
+
+def retotal(snapshot: Snapshot) -> None:
+    lines = snapshot["cart_lines"]
+    subtotal = sum(line["price"] * line["quantity"] for line in lines)
+    discount = sum(line["discount_amount"] for line in lines)
+    snapshot.update(Cart.total_values(subtotal, discount, snapshot["tax_rate"]))
+
+
+def clone(value: Any) -> Any:
+    """Copy a snapshot (or a line, or a scalar) deep enough to mutate safely."""
+    if not isinstance(value, dict):
+        return value
+    if "cart_lines" in value:
+        return {**value, "cart_lines": [dict(line) for line in value["cart_lines"]]}
+    return dict(value)
+
+
+def line_tax(line: Snapshot, tax_rate: float) -> float:
+    return CartLine(**{field: line[field] for field in LINE_FIELDS}).calculate_tax(
+        tax_rate
+    )
+
+
+class CartStore(ABC):
+    """Where /v1/carts reads and writes carts and their lines.
+
+    Every method returns plain dicts (see ``cart_snapshot``) so the
+    database and write-behind backends are interchangeable.
+    """
+
+    @abstractmethod
+    def get_cart(self, cart_id: int) -> Optional[Snapshot]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def update_cart(self, cart_id: int, obj_in: CartUpdate) -> Optional[Snapshot]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def remove_cart(self, cart_id: int) -> Optional[Snapshot]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def apply_discount(self, cart_id: int, discount_rate: float) -> float:
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_line(self, line_id: int) -> Optional[Snapshot]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def add_line(self, obj_in: CartLineCreate) -> Snapshot:
+        raise NotImplementedError
+
+    @abstractmethod
+    def update_line(self, line_id: int, obj_in: CartLineUpdate) -> Optional[Snapshot]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def remove_line(self, line_id: int) -> Optional[Snapshot]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def apply_line_discount(self, line_id: int, discount_rate: float) -> float:
+        raise NotImplementedError
+
+    @abstractmethod
+    def apply_line_ops(
+        self, cart_id: int, ops: Sequence[CartLineOperation]
+    ) -> Optional[Snapshot]:
+        """Apply line operations atomically and return the resulting cart.
+
+        Raises CartOperationError (nothing applied) if an op targets a line
+        that is not in the cart; None if the cart does not exist.
+        """
+        raise NotImplementedError
+
+    def get_totals(self, cart_id: int) -> Optional[Dict[str, float]]:
+        cart = self.get_cart(cart_id)
+        if not cart:
+            return None
+        return {field: cart[field] for field in (*TOTAL_FIELDS, "tax_rate")}
+
+    def add_lines(self, objs_in: Sequence[CartLineCreate]) -> List[Snapshot]:
+        return [self.add_line(obj_in) for obj_in in objs_in]
+
+    def update_lines(
+        self, objs_in: Sequence[Tuple[int, CartLineUpdate]]
+    ) -> List[Snapshot]:
+        updated = (self.update_line(line_id, obj_in) for line_id, obj_in in objs_in)
+        return [line for line in updated if line]
+
+    def remove_lines(self, ids: Sequence[int]) -> List[Snapshot]:
+        removed = (self.remove_line(line_id) for line_id in ids)
+        return [line for line in removed if line]
+
+    def flush(self) -> int:
+        """Write pending changes to the database; returns the carts written."""
+        return 0
+
+
+class DatabaseCartStore(CartStore):
+    """Reads and writes go straight to the cart/cart_line tables."""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get_cart(self, cart_id: int) -> Optional[Snapshot]:
+        cart = CartService(self.db).get(cart_id, read_only=True)
+        return cart_snapshot(cart) if cart else None
+
+    def update_cart(self, cart_id: int, obj_in: CartUpdate) -> Optional[Snapshot]:
+        service = CartService(self.db)
+        cart = service.get(cart_id)
+        if not cart:
+            return None
+        return cart_snapshot(service.update(cart, obj_in))
+
+    def remove_cart(self, cart_id: int) -> Optional[Snapshot]:
+        service = CartService(self.db)
+        cart = service.get(cart_id)
+        if not cart:
+            return None
+        snapshot = cart_snapshot(cart)
+        service.remove(cart_id)
+        return snapshot
+
+    def get_totals(self, cart_id: int) -> Optional[Dict[str, float]]:
+        return CartService(self.db).get_totals(cart_id)
+
+    def apply_discount(self, cart_id: int, discount_rate: float) -> float:
+        return CartService(self.db).apply_discount(cart_id, discount_rate)
+
+    def get_line(self, line_id: int) -> Optional[Snapshot]:
+        cart_line = CartLineService(self.db).get(line_id, read_only=True)
+        return line_snapshot(cart_line) if cart_line else None
+
+    def add_line(self, obj_in: CartLineCreate) -> Snapshot:
+        return line_snapshot(CartLineService(self.db).create(obj_in))
+
+    def update_line(self, line_id: int, obj_in: CartLineUpdate) -> Optional[Snapshot]:
+        service = CartLineService(self.db)
+        cart_line = service.get(line_id)
+        if not cart_line:
+            return None
+        return line_snapshot(service.update(cart_line, obj_in))
+
+    def remove_line(self, line_id: int) -> Optional[Snapshot]:
+        cart_line = CartLineService(self.db).remove(line_id)
+        return line_snapshot(cart_line) if cart_line else None
+
+    def apply_line_discount(self, line_id: int, discount_rate: float) -> float:
+        return CartLineService(self.db).apply_discount(line_id, discount_rate)
+
+    def apply_line_ops(
+        self, cart_id: int, ops: Sequence[CartLineOperation]
+    ) -> Optional[Snapshot]:
+        if not CartLineService(self.db).apply_ops(cart_id, ops):
+            return None
+        return self.get_cart(cart_id)
+
+    def add_lines(self, objs_in: Sequence[CartLineCreate]) -> List[Snapshot]:
+        return CartLineService(self.db).create_many(objs_in)
+
+    def update_lines(
+        self, objs_in: Sequence[Tuple[int, CartLineUpdate]]
+    ) -> List[Snapshot]:
+        return CartLineService(self.db).update_many(objs_in)
+
+    def remove_lines(self, ids: Sequence[int]) -> List[Snapshot]:
+        return CartLineService(self.db).remove_many(ids)
+
+
+class LineIdAllocator:
+    """Hands out cart_line ids from blocks reserved in id_block (hi/lo).
+
+    A write-behind store needs a line id before the row exists. One UPDATE
+    reserves ``block_size`` ids, so ids stay unique across pods while only
+    one in ``block_size`` new lines touches the database. The block never
+    starts below max(cart_line.id) + 1, so rows written directly to the
+    table are never handed out again.
+    """
+
+    NAME = "cart_line"
+
+    def __init__(self, block_size: int):
+        self.block_size = block_size
+        self._next = 0
+        self._end = 0
+        self._lock = threading.Lock()
+
+    def next_id(self) -> int:
+        with self._lock:
+            if self._next >= self._end:
+                self._next, self._end = self._reserve()
+            line_id = self._next
+            self._next += 1
+            return line_id
+
+    def _reserve(self) -> Tuple[int, int]:
+        floor = select(func.coalesce(func.max(CartLine.id), 0) + 1).scalar_subquery()
+        start = case((IdBlock.next_id > floor, IdBlock.next_id), else_=floor)
+        with SessionLocal() as db:
+            end = db.execute(
+                update(IdBlock)
+                .where(IdBlock.name == self.NAME)
+                .values(next_id=start + self.block_size)
+                .returning(IdBlock.next_id)
+                .execution_options(synchronize_session=False)
+            ).scalar()
+            if end is None:
+                try:
+                    end = db.execute(
+                        insert(IdBlock)
+                        .values(name=self.NAME, next_id=floor + self.block_size)
+                        .returning(IdBlock.next_id)
+                    ).scalar()
+                except IntegrityError:
+                    # pod อื่นสร้างแถวไปก่อน ลองจองใหม่
+                    db.rollback()
+                    return self._reserve()
+            db.commit()
+        return end - self.block_size, end
+
+
+class WriteBehindCartStore(CartStore):
+    """Keeps active carts as snapshots and flushes them to the database later.
+
+    Every write bumps the cart's ``version`` and marks it dirty. ``flush``
+    writes dirty carts in one transaction each and stamps
+    ``cart.store_version``; the dirty mark is cleared only if no write
+    happened meanwhile, and the database never takes an older version
+    than it already has. A snapshot the database rejects (the cart is gone,
+    or a set-based writer such as repricing bumped ``store_version``) is
+    evicted, so the next read reloads it. Carts missing from the store are
+    loaded from the database on first use.
+
+    A cart whose flush fails CART_STORE_MAX_FLUSH_FAILURES times in a row
+    (e.g. a product deleted since the line was added) is set aside and
+    evicted, so it neither retries forever nor stays in the store without
+    an expiry. Cart and products are checked when a line is written, so
+    this is the exception.
+
+    Snapshots carry an internal ``version``; it never leaves the store.
+
+    Subclasses provide storage: ``_read``, ``_cache``, ``_mutate``,
+    ``_line_cart``, ``_dirty``, ``_checkpoint``, ``_evict``,
+    ``_record_failure`` and ``_set_aside``.
+    """
+
+    def __init__(self, allocator: LineIdAllocator):
+        self.allocator = allocator
+
+    # storage
+    @abstractmethod
+    def _read(self, cart_id: int) -> Optional[Snapshot]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def _cache(self, snapshot: Snapshot) -> Snapshot:
+        """Store a snapshot loaded from the database unless one is already there."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def _mutate(self, cart_id: int, change: Callable[[Snapshot], Any]) -> Any:
+        """Apply ``change`` atomically; see ``_apply``."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def _line_cart(self, line_id: int) -> Optional[int]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def _dirty(self) -> Dict[int, int]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def _checkpoint(self, cart_id: int, version: int) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def _evict(self, cart_id: int) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def _evict_if_clean(self, cart_id: int) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def _record_failure(self, cart_id: int) -> int:
+        """Count a failed flush of the cart; returns the failures in a row."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def _set_aside(self, snapshot: Snapshot) -> None:
+        """Keep an unflushable snapshot for inspection, outside the dirty set."""
+        raise NotImplementedError
+
+    def evict_clean(self, cart_ids: Iterable[int]) -> None:
+        """Drop flushed carts so their next read reloads them from the database.
+
+        Used after set-based writes that bypass the store. A cart written
+        meanwhile stays until its next flush; if the writer bumped
+        ``store_version`` that flush is rejected and the cart reloaded.
+        """
+        for cart_id in cart_ids:
+            self._evict_if_clean(cart_id)
+
+    @staticmethod
+    def _load(cart_id: int) -> Optional[Snapshot]:
+        with SessionLocal() as db:
+            cart = db.get(Cart, cart_id, options=[selectinload(Cart.cart_lines)])
+            if cart is None:
+                return None
+            return {**cart_snapshot(cart), "version": cart.store_version or 0}
+
+    @staticmethod
+    def _public(snapshot: Optional[Snapshot]) -> Optional[Snapshot]:
+        """The snapshot as returned to callers, without the store's version."""
+        if snapshot is None:
+            return None
+        return {field: value for field, value in snapshot.items() if field != "version"}
+
+    @staticmethod
+    def _missing_products(product_ids: Iterable[int]) -> List[int]:
+        """Product ids that have no catalogue row, checked before a line is stored."""
+        product_ids = set(product_ids)
+        if not product_ids:
+            return []
+        with SessionLocal() as db:
+            found = set(
+                db.scalars(select(Catalogue.id).where(Catalogue.id.in_(product_ids)))
+            )
+        return sorted(product_ids - found)
+
+    @staticmethod
+    def _apply(
+        snapshot: Snapshot, change: Callable[[Snapshot], Any]
+    ) -> Tuple[Any, set, set]:
+        """Run ``change`` on the snapshot; returns (result, added, removed line ids).
+
+        A ``None`` result means nothing changed and nothing is written.
+        """
+        before = {line["id"] for line in snapshot["cart_lines"]}
+        result = change(snapshot)
+        if result is None:
+            return None, set(), set()
+        snapshot["version"] += 1
+        retotal(snapshot)
+        after = {line["id"] for line in snapshot["cart_lines"]}
+        return result, after - before, before - after
+
+    def _cart_for_line(self, line_id: int) -> Optional[int]:
+        cart_id = self._line_cart(line_id)
+        if cart_id is None:
+            with SessionLocal() as db:
+                cart_id = db.scalar(select(CartLine.cart_id).where(CartLine.id == line_id))
+        return cart_id
+
+    def _mutate_line(
+        self, line_id: int, change: Callable[[Snapshot, Snapshot], Any]
+    ) -> Any:
+        cart_id = self._cart_for_line(line_id)
+        if cart_id is None:
+            return None
+
+        def apply(snapshot: Snapshot):
+            for line in snapshot["cart_lines"]:
+                if line["id"] == line_id:
+                    return change(snapshot, line)
+            return None
+
+        try:
+            return self._mutate(cart_id, apply)
+        except DatabaseError:
+            return None
+
+    @staticmethod
+    def _not_found(cart_id: int) -> DatabaseError:
+        return DatabaseError(f"Cart with id {cart_id} not found", status_code=404)
+
+    # CartStore
+    def get_cart(self, cart_id: int) -> Optional[Snapshot]:
+        snapshot = self._read(cart_id)
+        if snapshot is None:
+            loaded = self._load(cart_id)
+            snapshot = self._cache(loaded) if loaded else None
+        return self._public(snapshot)
+
+    def update_cart(self, cart_id: int, obj_in: CartUpdate) -> Optional[Snapshot]:
+        data = obj_in.model_dump(exclude_unset=True)
+
+        def change(snapshot: Snapshot):
+            snapshot.update(
+                {field: data[field] for field in HEADER_FIELDS if field in data}
+            )
+            return snapshot
+
+        try:
+            return self._public(self._mutate(cart_id, change))
+        except DatabaseError:
+            return None
+
+    def remove_cart(self, cart_id: int) -> Optional[Snapshot]:
+        snapshot = self.get_cart(cart_id)
+        if snapshot is None:
+            return None
+        with SessionLocal() as db:
+            CartService(db).remove(cart_id)
+        self._evict(cart_id)
+        return snapshot
+
+    def apply_discount(self, cart_id: int, discount_rate: float) -> float:
+        def change(snapshot: Snapshot):
+            total_discount = 0.0
+            for line in snapshot["cart_lines"]:
+                line["discount_amount"] = line["price"] * line["quantity"] * discount_rate
+                total_discount += line["discount_amount"]
+            return total_discount
+
+        return self._mutate(cart_id, change)
+
+    def get_line(self, line_id: int) -> Optional[Snapshot]:
+        cart_id = self._cart_for_line(line_id)
+        cart = self.get_cart(cart_id) if cart_id is not None else None
+        for line in cart["cart_lines"] if cart else ():
+            if line["id"] == line_id:
+                return line
+        return None
+
+    def add_line(self, obj_in: CartLineCreate) -> Snapshot:
+        # ตรวจตอนเขียน ไม่อย่างนั้น FK ไปพังตอน flush ซึ่งไม่มีใครเห็น error
+        if self._missing_products([obj_in.product_id]):
+            raise DatabaseError(
+                f"Product with id {obj_in.product_id} not found", status_code=404
+            )
+        line = {
+            "id": self.allocator.next_id(),
+            "cart_id": obj_in.cart_id,
+            **{field: getattr(obj_in, field) for field in LINE_FIELDS},
+            "added_at": datetime.now(timezone.utc).isoformat(),
+        }
+
+        def change(snapshot: Snapshot):
+            snapshot["cart_lines"].append(line)
+            return line
+
+        return self._mutate(obj_in.cart_id, change)
+
+    def update_line(self, line_id: int, obj_in: CartLineUpdate) -> Optional[Snapshot]:
+        data = obj_in.model_dump(exclude_unset=True)
+
+        def change(snapshot: Snapshot, line: Snapshot):
+            line.update({field: data[field] for field in LINE_FIELDS if field in data})
+            return dict(line)
+
+        return self._mutate_line(line_id, change)
+
+    def remove_line(self, line_id: int) -> Optional[Snapshot]:
+        def change(snapshot: Snapshot, line: Snapshot):
+            snapshot["cart_lines"].remove(line)
+            return line
+
+        return self._mutate_line(line_id, change)
+
+    def apply_line_discount(self, line_id: int, discount_rate: float) -> float:
+        def change(snapshot: Snapshot, line: Snapshot):
+            line["discount_amount"] = line["price"] * line["quantity"] * discount_rate
+            return line["discount_amount"]
+
+        discount = self._mutate_line(line_id, change)
+        if discount is None:
+            raise DatabaseError(f"CartLine with id {line_id} not found")
+        return discount
+
+    def apply_line_ops(
+        self, cart_id: int, ops: Sequence[CartLineOperation]
+    ) -> Optional[Snapshot]:
+        if not ops:
+            return self.get_cart(cart_id)
+        missing = self._missing_products(op.product_id for op in ops if op.op == "add")
+        for index, op in enumerate(ops):
+            if op.op == "add" and op.product_id in missing:
+                raise CartOperationError(
+                    index, f"Product with id {op.product_id} not found"
+                )
+        # id ของ line ใหม่จองไว้ก่อน เพราะ change อาจถูกเรียกซ้ำเมื่อ Redis retry
+        added = {
+            index: {
+                "id": self.allocator.next_id(),
+                "cart_id": cart_id,
+                **{field: getattr(op, field) for field in LINE_FIELDS},
+                "added_at": datetime.now(timezone.utc).isoformat(),
+            }
+            for index, op in enumerate(ops)
+            if op.op == "add"
+        }
+
+        def change(snapshot: Snapshot):
+            lines = {line["id"]: line for line in snapshot["cart_lines"]}
+            for index, op in enumerate(ops):
+                if op.op == "add":
+                    snapshot["cart_lines"].append(dict(added[index]))
+                    continue
+                line = lines.get(op.line_id)
+                if line is None:
+                    raise CartOperationError(
+                        index, f"CartLine with id {op.line_id} not in cart {cart_id}"
+                    )
+                if op.op == "set_quantity":
+                    line["quantity"] = op.quantity
+                elif op.op == "discount":
+                    subtotal = line["price"] * line["quantity"]
+                    line["discount_amount"] = subtotal * op.discount_rate
+                else:
+                    snapshot["cart_lines"].remove(lines.pop(op.line_id))
+            return snapshot
+
+        try:
+            return self._public(self._mutate(cart_id, change))
+        except CartOperationError:
+            raise
+        except DatabaseError:
+            return None
+
+    # write-behind
+    @staticmethod
+    def _persist(session: Session, snapshot: Snapshot) -> bool:
+        """Write one snapshot; False if the cart is gone or already newer."""
+        cart_id, version = snapshot["id"], snapshot["version"]
+        header = {field: snapshot[field] for field in (*HEADER_FIELDS, *TOTAL_FIELDS)}
+        written = session.execute(
+            update(Cart)
+            .where(Cart.id == cart_id, Cart.store_version < version)
+            .values(**header, store_version=version)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if written != 1:
+            return False
+        rows = [
+            {
+                **line,
+                "added_at": datetime.fromisoformat(line["added_at"])
+                if line["added_at"]
+                else None,
+            }
+            for line in snapshot["cart_lines"]
+        ]
+        line_ids = [row["id"] for row in rows]
+        session.execute(
+            delete(CartLine)
+            .where(CartLine.cart_id == cart_id, CartLine.id.not_in(line_ids))
+            .execution_options(synchronize_session=False)
+        )
+        existing = set(
+            session.scalars(select(CartLine.id).where(CartLine.id.in_(line_ids)))
+        )
+        updates = [row for row in rows if row["id"] in existing]
+        inserts = [row for row in rows if row["id"] not in existing]
+        if updates:
+            session.execute(update(CartLine), updates)
+        if inserts:
+            session.execute(insert(CartLine), inserts)
+        return True
+
+    def flush(self) -> int:
+        flushed = 0
+        for cart_id in sorted(self._dirty()):
+            snapshot = self._read(cart_id)
+            if snapshot is None:
+                continue
+            try:
+                with SessionLocal() as db:
+                    persisted = self._persist(db, snapshot)
+                    db.commit()
+            except Exception as e:
+                # คง dirty ไว้ให้รอบถัดไป flush ใหม่ จนกว่าจะพังติดกันครบจำนวนครั้ง
+                failures = self._record_failure(cart_id)
+                logger.error(f"Cart {cart_id} flush failed ({failures}x): {str(e)}")
+                if failures >= settings.CART_STORE_MAX_FLUSH_FAILURES:
+                    self._give_up(snapshot)
+                continue
+            self._checkpoint(cart_id, snapshot["version"])
+            if persisted:
+                flushed += 1
+                continue
+            # DB ใหม่กว่า snapshot: ทิ้งไปโหลดใหม่ ไม่อย่างนั้นอ่านค่าเก่าต่อไปเรื่อยๆ
+            logger.warning(
+                f"Cart {cart_id} snapshot v{snapshot['version']} is stale; reloading"
+            )
+            self._evict_if_clean(cart_id)
+        return flushed
+
+    def _give_up(self, snapshot: Snapshot) -> None:
+        """Stop retrying a cart: set its snapshot aside and evict it."""
+        logger.error(
+            f"Cart {snapshot['id']} set aside after "
+            f"{settings.CART_STORE_MAX_FLUSH_FAILURES} failed flushes: "
+            f"{json.dumps(snapshot)}"
+        )
+        self._set_aside(snapshot)
+        self._evict(snapshot["id"])
+
+
+class MemoryCartStore(WriteBehindCartStore):
+    """Carts held in this process; for single-process deployments and tests.
+
+    Clean carts beyond ``max_carts`` are evicted oldest first; dirty ones
+    stay until flushed. Unflushed writes are lost if the process dies.
+    Carts given up on after failed flushes are kept in ``set_aside``.
+    """
+
+    def __init__(self, allocator: LineIdAllocator, max_carts: int):
+        super().__init__(allocator)
+        self.max_carts = max_carts
+        self._carts: "OrderedDict[int, Snapshot]" = OrderedDict()
+        self._line_carts: Dict[int, int] = {}
+        self._dirty_versions: Dict[int, int] = {}
+        self._failures: Dict[int, int] = {}
+        self.set_aside: Dict[int, Snapshot] = {}
+        self._lock = threading.Lock()
+
+    def _index(self, snapshot: Snapshot) -> None:
+        for line in snapshot["cart_lines"]:
+            self._line_carts[line["id"]] = snapshot["id"]
+
+    def _read(self, cart_id: int) -> Optional[Snapshot]:
+        with self._lock:
+            snapshot = self._carts.get(cart_id)
+            return clone(snapshot) if snapshot else None
+
+    def _cache(self, snapshot: Snapshot) -> Snapshot:
+        with self._lock:
+            current = self._carts.setdefault(snapshot["id"], snapshot)
+            if current is snapshot:
+                self._index(snapshot)
+            self._trim()
+            return clone(current)
+
+    def _mutate(self, cart_id: int, change: Callable[[Snapshot], Any]) -> Any:
+        with self._lock:
+            current = self._carts.get(cart_id)
+            if current is not None:
+                return self._apply_locked(current, change)
+        # โหลดจาก DB นอก lock; ถ้า thread อื่นใส่ cart นี้ไว้ก่อน ใช้ของที่อยู่ใน store
+        loaded = self._load(cart_id)
+        if loaded is None:
+            raise self._not_found(cart_id)
+        with self._lock:
+            current = self._carts.get(cart_id)
+            if current is None:
+                current = self._carts[cart_id] = loaded
+                self._index(loaded)
+            result = self._apply_locked(current, change)
+            self._trim()
+            return result
+
+    def _apply_locked(
+        self, current: Snapshot, change: Callable[[Snapshot], Any]
+    ) -> Any:
+        """Apply ``change`` to a copy of ``current``; the caller holds the lock."""
+        cart_id = current["id"]
+        snapshot = clone(current)
+        result, added, removed = self._apply(snapshot, change)
+        if result is None:
+            return None
+        self._carts[cart_id] = snapshot
+        self._carts.move_to_end(cart_id)
+        self._dirty_versions[cart_id] = snapshot["version"]
+        for line_id in added:
+            self._line_carts[line_id] = cart_id
+        for line_id in removed:
+            self._line_carts.pop(line_id, None)
+        return clone(result)
+
+    def _line_cart(self, line_id: int) -> Optional[int]:
+        with self._lock:
+            return self._line_carts.get(line_id)
+
+    def _dirty(self) -> Dict[int, int]:
+        with self._lock:
+            return dict(self._dirty_versions)
+
+    def _checkpoint(self, cart_id: int, version: int) -> None:
+        with self._lock:
+            self._failures.pop(cart_id, None)
+            if self._dirty_versions.get(cart_id) == version:
+                del self._dirty_versions[cart_id]
+            self._trim()
+
+    def _record_failure(self, cart_id: int) -> int:
+        with self._lock:
+            self._failures[cart_id] = self._failures.get(cart_id, 0) + 1
+            return self._failures[cart_id]
+
+    def _set_aside(self, snapshot: Snapshot) -> None:
+        with self._lock:
+            self.set_aside[snapshot["id"]] = snapshot
+
+    def _trim(self) -> None:
+        overflow = len(self._carts) - self.max_carts
+        for cart_id in list(self._carts):
+            if overflow <= 0:
+                break
+            if cart_id not in self._dirty_versions:
+                self._drop(cart_id)
+                overflow -= 1
+
+    def _drop(self, cart_id: int) -> None:
+        snapshot = self._carts.pop(cart_id, None)
+        self._dirty_versions.pop(cart_id, None)
+        self._failures.pop(cart_id, None)
+        for line in snapshot["cart_lines"] if snapshot else ():
+            self._line_carts.pop(line["id"], None)
+
+    def _evict(self, cart_id: int) -> None:
+        with self._lock:
+            self._drop(cart_id)
+
+    def _evict_if_clean(self, cart_id: int) -> None:
+        with self._lock:
+            if cart_id not in self._dirty_versions:
+                self._drop(cart_id)
+
+
+# KEYS[1]=dirty hash, KEYS[2]=cart key, ARGV: cart_id, flushed version, ttl
+_CHECKPOINT_SCRIPT = """
+if redis.call('HGET', KEYS[1], ARGV[1]) == ARGV[2] then
+    redis.call('HDEL', KEYS[1], ARGV[1])
+    redis.call('EXPIRE', KEYS[2], ARGV[3])
+    return 1
+end
+return 0
+"""
+
+# KEYS[1]=dirty hash, KEYS[2]=cart key, ARGV[1]=cart_id
+_EVICT_CLEAN_SCRIPT = """
+if redis.call('HEXISTS', KEYS[1], ARGV[1]) == 0 then
+    return redis.call('DEL', KEYS[2])
+end
+return 0
+"""
+
+
+class RedisCartStore(WriteBehindCartStore):
+    """Carts in Redis, shared by every pod.
+
+    Each cart is one JSON value updated under WATCH/MULTI. Dirty carts have
+    no expiry; a cart gets ``ttl`` seconds only once its latest version is
+    flushed, so Redis never drops a write the database has not seen.
+    Failed flushes are counted per cart in FAILURES_KEY; carts given up on
+    are kept in the FAILED_KEY hash.
+    """
+
+    KEY_PREFIX = "cart-store:cart:"
+    DIRTY_KEY = "cart-store:dirty"
+    LINES_KEY = "cart-store:lines"
+    FAILURES_KEY = "cart-store:flush-failures"
+    FAILED_KEY = "cart-store:failed"
+
+    def __init__(self, redis, allocator: LineIdAllocator, ttl: int):
+        super().__init__(allocator)
+        self.redis = redis
+        self.ttl = ttl
+        self._checkpoint_script = redis.register_script(_CHECKPOINT_SCRIPT)
+        self._evict_clean_script = redis.register_script(_EVICT_CLEAN_SCRIPT)
+
+    def _key(self, cart_id: int) -> str:
+        return f"{self.KEY_PREFIX}{cart_id}"
+
+    def _read(self, cart_id: int) -> Optional[Snapshot]:
+        raw = self.redis.get(self._key(cart_id))
+        return json.loads(raw) if raw else None
+
+    def _cache(self, snapshot: Snapshot) -> Snapshot:
+        key = self._key(snapshot["id"])
+        if self.redis.set(key, json.dumps(snapshot), ex=self.ttl, nx=True):
+            lines = {line["id"]: snapshot["id"] for line in snapshot["cart_lines"]}
+            if lines:
+                self.redis.hset(self.LINES_KEY, mapping=lines)
+            return snapshot
+        return self._read(snapshot["id"]) or snapshot
+
+    def _mutate(self, cart_id: int, change: Callable[[Snapshot], Any]) -> Any:
+        key = self._key(cart_id)
+        outcome: Dict[str, Any] = {}
+
+        def transaction(pipe):
+            raw = pipe.get(key)
+            snapshot = json.loads(raw) if raw else self._load(cart_id)
+            if snapshot is None:
+                raise self._not_found(cart_id)
+            result, added, removed = self._apply(snapshot, change)
+            outcome["result"] = result
+            if result is None:
+                return
+            pipe.multi()
+            pipe.set(key, json.dumps(snapshot))
+            pipe.hset(self.DIRTY_KEY, cart_id, snapshot["version"])
+            if added:
+                pipe.hset(self.LINES_KEY, mapping={line_id: cart_id for line_id in added})
+            if removed:
+                pipe.hdel(self.LINES_KEY, *removed)
+
+        self.redis.transaction(transaction, key)
+        return outcome["result"]
+
+    def _line_cart(self, line_id: int) -> Optional[int]:
+        cart_id = self.redis.hget(self.LINES_KEY, line_id)
+        return int(cart_id) if cart_id is not None else None
+
+    def _dirty(self) -> Dict[int, int]:
+        return {
+            int(cart_id): int(version)
+            for cart_id, version in self.redis.hgetall(self.DIRTY_KEY).items()
+        }
+
+    def _checkpoint(self, cart_id: int, version: int) -> None:
+        self._checkpoint_script(
+            keys=[self.DIRTY_KEY, self._key(cart_id)],
+            args=[cart_id, version, self.ttl],
+        )
+        self.redis.hdel(self.FAILURES_KEY, cart_id)
+
+    def _record_failure(self, cart_id: int) -> int:
+        return self.redis.hincrby(self.FAILURES_KEY, cart_id, 1)
+
+    def _set_aside(self, snapshot: Snapshot) -> None:
+        self.redis.hset(self.FAILED_KEY, snapshot["id"], json.dumps(snapshot))
+
+    def _evict(self, cart_id: int) -> None:
+        snapshot = self._read(cart_id)
+        pipe = self.redis.pipeline()
+        pipe.delete(self._key(cart_id))
+        pipe.hdel(self.DIRTY_KEY, cart_id)
+        pipe.hdel(self.FAILURES_KEY, cart_id)
+        line_ids = [line["id"] for line in snapshot["cart_lines"]] if snapshot else []
+        if line_ids:
+            pipe.hdel(self.LINES_KEY, *line_ids)
+        pipe.execute()
+
+    def _evict_if_clean(self, cart_id: int) -> None:
+        # ไม่ลบ line index: line ที่ชี้ไป cart ที่ไม่อยู่ใน Redis จะโหลดจาก DB ใหม่
+        self._evict_clean_script(
+            keys=[self.DIRTY_KEY, self._key(cart_id)], args=[cart_id]
+        )
+
+
+_write_behind_store: Optional[WriteBehindCartStore] = None
+
+
+def get_write_behind_store() -> Optional[WriteBehindCartStore]:
+    """The process-wide write-behind store, or None with the database backend.
+
+    Raises RuntimeError for a configuration that would lose writes: the
+    redis backend without REDIS_URL, or the memory backend with more than
+    one worker process (each would flush its own copy of a cart over the
+    others'). CartStoreFlusher.start calls this, so startup fails instead.
+    """
+    global _write_behind_store
+    backend = settings.CART_STORE_BACKEND
+    if backend == "database":
+        return None
+    if _write_behind_store is None:
+        allocator = LineIdAllocator(settings.CART_STORE_ID_BLOCK)
+        if backend == "redis":
+            redis = get_redis()
+            if redis is None:
+                raise RuntimeError("CART_STORE_BACKEND=redis needs REDIS_URL")
+            _write_behind_store = RedisCartStore(
+                redis, allocator, settings.CART_STORE_TTL
+            )
+        elif backend == "memory":
+            if settings.WEB_CONCURRENCY > 1:
+                raise RuntimeError(
+                    "CART_STORE_BACKEND=memory keeps carts per process; "
+                    "use redis with WEB_CONCURRENCY > 1"
+                )
+            logger.warning(
+                "Memory cart store: carts live in this process only, "
+                "run exactly one API process (one pod, one worker)"
+            )
+            _write_behind_store = MemoryCartStore(
+                allocator, settings.CART_STORE_MAX_CARTS
+            )
+        else:
+            raise RuntimeError(f"Unknown CART_STORE_BACKEND: {backend}")
+    return _write_behind_store
+
+
+def get_cart_store(db: Session) -> CartStore:
+    return get_write_behind_store() or DatabaseCartStore(db)
+
+
+class CartStoreFlusher:
+    """Background thread that flushes dirty carts every ``interval`` seconds."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._thread: Optional[threading.Thread] = None
+
+    def flush(self) -> int:
+        store = get_write_behind_store()
+        return store.flush() if store else 0
+
+    def start(self) -> None:
+        if self._thread is not None or get_write_behind_store() is None:
+            return
+
+        def run():
+            while True:
+                time.sleep(self.interval)
+                try:
+                    self.flush()
+                except Exception as e:
+                    logger.error(f"Cart store flush failed: {str(e)}")
+
+        self._thread = threading.Thread(target=run, name="cart-store-flusher", daemon=True)
+        self._thread.start()
+
+
+cart_store_flusher = CartStoreFlusher(settings.CART_STORE_FLUSH_INTERVAL)
@@ -1,10 +1,39 @@
+import csv
+import hashlib
+import io
+import json
+from typing import Any, Dict, List, Sequence, TextIO
+
+from pydantic import ValidationError
+from sqlalchemy import func, insert, select, text
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import Session
 
+from app.settings import base as settings
+from app.core.bulk_import import iter_chunks, iter_records
 from app.core.exceptions import DatabaseError
 from app.models.catalogue import Catalogue
-from app.schemas.catalogue import CatalogueCreate, CatalogueUpdate
+from app.schemas.base import format_validation_error
+from app.schemas.catalogue import (
+    CatalogueCreate,
+    CatalogueImportError,
+    CatalogueImportResult,
+    CatalogueUpdate,
+    CatalogueUpsert,
+)
 from app.services.base import BaseService
 
+# dialect ที่รองรับ INSERT ... ON CONFLICT DO UPDATE ... WHERE
+UPSERT_DIALECTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+# คอลัมน์ที่ใช้คำนวณ content_hash และถูกเขียนทับตอน sync
+# stock ไม่อยู่ในนี้: เป็นยอดสุทธิหลังหัก reservation ที่ feed ไม่รู้ ใช้แค่ตอน insert
+CONTENT_FIELDS = ("name", "description", "price", "category")
+
+# คอลัมน์ที่ bulk import เขียนลง catalogue
+IMPORT_COLUMNS = ("name", "description", "price", "stock", "category", "sku")
+IMPORT_STAGING_TABLE = "catalogue_import_staging"
+
 
 class CatalogueService(BaseService[Catalogue, CatalogueCreate, CatalogueUpdate]):
     """Service class for managing catalogue-related operations."""
@@ -20,8 +49,182 @@ class CatalogueService(BaseService[Catalogue, CatalogueCreate, CatalogueUpdate])
             db_obj = self.model(**create_data)
             with self._session_scope() as session:
                 session.add(db_obj)
-                session.refresh(db_obj)
             return db_obj
         except Exception as e:
             self.logger.error(f"Catalogue creation failed: {str(e)}")
             raise DatabaseError(f"Failed to create catalogue: {str(e)}")
+
+    def update(self, db_obj: Catalogue, obj_in: CatalogueUpdate) -> Catalogue:
+        """Update a catalogue item by hand; editing synced content clears content_hash."""
+        if self._edits_content(obj_in.model_dump(exclude_unset=True)):
+            db_obj.content_hash = None
+        return super().update(db_obj, obj_in)
+
+    def _column_values(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Column values of a create/update; an edit of synced content clears content_hash.
+
+        Otherwise the next sync of an unchanged feed item would match the
+        stored hash and skip the row, keeping the manual edit.
+        """
+        values = super()._column_values(data)
+        if self._edits_content(values):
+            values["content_hash"] = None
+        return values
+
+    @staticmethod
+    def _edits_content(data: Dict[str, Any]) -> bool:
+        return any(field in data for field in CONTENT_FIELDS)
+
+    @staticmethod
+    def content_hash(item: CatalogueUpsert) -> str:
+        """Stable sha256 of the synced content of a feed item."""
+        content = {field: getattr(item, field) for field in CONTENT_FIELDS}
+        payload = json.dumps(content, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def upsert_many(self, items: Sequence[CatalogueUpsert]) -> Dict[str, int]:
+        """Insert or update feed items by SKU with INSERT ... ON CONFLICT DO UPDATE.
+
+        Rows whose stored content_hash equals the feed's are left untouched,
+        so a nightly sync of an unchanged catalogue writes nothing. Duplicate
+        SKUs in one call keep the last occurrence. The feed's stock is only
+        used for new rows: existing stock is net of open reservations, which
+        the feed knows nothing about.
+        """
+        upsert = UPSERT_DIALECTS.get(self.db.get_bind().dialect.name)
+        if upsert is None:
+            raise DatabaseError("Catalogue sync needs PostgreSQL or SQLite", 501)
+        rows = {
+            item.sku: {
+                **{field: getattr(item, field) for field in CONTENT_FIELDS},
+                "stock": item.stock,
+                "sku": item.sku,
+                "content_hash": self.content_hash(item),
+            }
+            for item in items
+        }
+        result = {"inserted": 0, "updated": 0, "unchanged": 0}
+        with self._session_scope() as session:
+            for chunk in self._chunks(list(rows.values())):
+                skus = [row["sku"] for row in chunk]
+                existing = set(
+                    session.scalars(select(Catalogue.sku).where(Catalogue.sku.in_(skus)))
+                )
+                statement = upsert(Catalogue.__table__).values(list(chunk))
+                excluded = statement.excluded
+                statement = statement.on_conflict_do_update(
+                    index_elements=[Catalogue.sku],
+                    set_={
+                        **{field: excluded[field] for field in CONTENT_FIELDS},
+                        "content_hash": excluded.content_hash,
+                        "updated_at": func.now(),
+                    },
+                    where=Catalogue.content_hash.is_distinct_from(excluded.content_hash),
+                ).returning(Catalogue.sku)
+                written = set(session.scalars(statement))
+                result["inserted"] += len(written - existing)
+                result["updated"] += len(written & existing)
+                result["unchanged"] += len(chunk) - len(written)
+        self.logger.info(f"Catalogue sync: {result}")
+        return result
+
+    def import_stream(self, stream: TextIO, format: str) -> CatalogueImportResult:
+        """Load a CSV/NDJSON stream into catalogue in one transaction.
+
+        Records are validated against CatalogueCreate IMPORT_CHUNK_SIZE at a
+        time. On PostgreSQL each valid chunk is COPY'd into a temporary
+        staging table and moved into catalogue with a single INSERT ...
+        SELECT at the end; elsewhere chunks are inserted with executemany.
+        Rows whose SKU already exists are skipped, not updated (use
+        upsert_many for that).
+        """
+        result = CatalogueImportResult()
+        is_postgres = self.db.get_bind().dialect.name == "postgresql"
+        with self._session_scope() as session:
+            if is_postgres:
+                self._create_staging_table(session)
+            records = iter_records(stream, format)
+            for chunk in iter_chunks(records, settings.IMPORT_CHUNK_SIZE):
+                rows = self._validate_import_chunk(chunk, result)
+                if not rows:
+                    continue
+                if is_postgres:
+                    self._copy_to_staging(session, rows)
+                else:
+                    result.inserted += self._insert_ignoring_conflicts(session, rows)
+            if is_postgres:
+                result.inserted = self._merge_staging(session)
+        result.skipped = result.processed - result.invalid - result.inserted
+        self.logger.info(
+            f"Catalogue import: {result.processed} processed, {result.inserted} "
+            f"inserted, {result.skipped} skipped, {result.invalid} invalid"
+        )
+        return result
+
+    @staticmethod
+    def _validate_import_chunk(
+        chunk: List[Any], result: CatalogueImportResult
+    ) -> List[Dict[str, Any]]:
+        rows = []
+        for record in chunk:
+            result.processed += 1
+            error = record.error
+            if error is None:
+                try:
+                    item = CatalogueCreate.model_validate(record.data)
+                    rows.append(item.model_dump(include=set(IMPORT_COLUMNS)))
+                    continue
+                except ValidationError as e:
+                    error = format_validation_error(e)
+            result.invalid += 1
+            if len(result.errors) < settings.IMPORT_MAX_ERRORS:
+                result.errors.append(CatalogueImportError(line=record.line, msg=error))
+        return rows
+
+    @staticmethod
+    def _create_staging_table(session: Session) -> None:
+        session.execute(
+            text(
+                f"CREATE TEMPORARY TABLE {IMPORT_STAGING_TABLE} "
+                "(name text, description text, price double precision, "
+                "stock integer, category text, sku text) ON COMMIT DROP"
+            )
+        )
+
+    @staticmethod
+    def _copy_to_staging(session: Session, rows: List[Dict[str, Any]]) -> None:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow([row[column] for column in IMPORT_COLUMNS])
+        buffer.seek(0)
+        dbapi_connection = session.connection().connection.dbapi_connection
+        with dbapi_connection.cursor() as cursor:
+            cursor.copy_expert(
+                f"COPY {IMPORT_STAGING_TABLE} ({', '.join(IMPORT_COLUMNS)}) "
+                "FROM STDIN WITH (FORMAT csv)",
+                buffer,
+            )
+
+    @staticmethod
+    def _merge_staging(session: Session) -> int:
+        columns = ", ".join(IMPORT_COLUMNS)
+        result = session.execute(
+            text(
+                f"INSERT INTO catalogue ({columns}) "
+                f"SELECT {columns} FROM {IMPORT_STAGING_TABLE} "
+                "ON CONFLICT DO NOTHING"
+            )
+        )
+        return result.rowcount
+
+    @staticmethod
+    def _insert_ignoring_conflicts(session: Session, rows: List[Dict[str, Any]]) -> int:
+        statement = insert(Catalogue.__table__)
+        dialect = session.get_bind().dialect.name
+        if dialect == "sqlite":
+            statement = sqlite.insert(Catalogue.__table__).on_conflict_do_nothing()
+        elif dialect in ("mysql", "mariadb"):
+            # INSERT IGNORE: แถวที่ชน unique key ถูกข้ามแทนที่จะ raise
+            statement = statement.prefix_with("IGNORE", dialect=dialect)
+        return session.execute(statement, rows).rowcount
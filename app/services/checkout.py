@@ -4,6 +4,14 @@ from app.core.exceptions import DatabaseError
 from app.models.checkout import Checkout
 from app.schemas.checkout import CheckoutCreate, CheckoutUpdate
 from app.services.base import BaseService
+from app.services.cart import CartService
+from app.services.inventory import InventoryService
+
+# status ที่ทำให้ stock ที่จองไว้ถูกคืน / ถูกตัดขายจริง
+RELEASE_STATUSES = {"abandoned", "cancelled"}
+COMPLETE_STATUSES = {"completed"}
+# เปลี่ยนเป็น status เหล่านี้ต้องผ่าน update ทีละรายการเพื่อ settle stock
+SETTLEMENT_STATUSES = RELEASE_STATUSES | COMPLETE_STATUSES
 
 
 class CheckoutService(BaseService[Checkout, CheckoutCreate, CheckoutUpdate]):
@@ -20,8 +28,24 @@ class CheckoutService(BaseService[Checkout, CheckoutCreate, CheckoutUpdate]):
             db_obj = self.model(**create_data)
             with self._session_scope() as session:
                 session.add(db_obj)
-                session.refresh(db_obj)
             return db_obj
         except Exception as e:
             self.logger.error(f"Checkout creation failed: {str(e)}")
             raise DatabaseError(f"Failed to create checkout: {str(e)}")
+
+    def update(self, db_obj: Checkout, obj_in: CheckoutUpdate) -> Checkout:
+        """Update a checkout and settle its stock reservations on a final status.
+
+        Stock is settled before the status is written, so a completion whose
+        stock can no longer be sold raises InsufficientStockError (409) and
+        leaves the checkout as it was.
+        """
+        status = obj_in.status if "status" in obj_in.model_fields_set else db_obj.status
+        if status in RELEASE_STATUSES:
+            InventoryService(self.db).release(db_obj.id)
+        elif status in COMPLETE_STATUSES:
+            InventoryService(self.db).commit(db_obj.id)
+        checkout = super().update(db_obj, obj_in)
+        if status in COMPLETE_STATUSES and checkout.cart_id is not None:
+            CartService(self.db).mark_checked_out(checkout.cart_id)
+        return checkout
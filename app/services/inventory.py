@@ -0,0 +1,239 @@
+import logging
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Sequence
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.orm import Session
+
+from app import settings
+from app.core.db.connect import SessionLocal
+from app.core.exceptions import InsufficientStockError
+from app.models.catalogue import Catalogue
+from app.models.inventory import ReservationStatusEnum, StockReservation
+from app.schemas.inventory import ReservationItem
+from app.services.base import BaseService
+
+logger = logging.getLogger(__name__)
+
+
+class InventoryService(
+    BaseService[StockReservation, ReservationItem, ReservationItem]
+):
+    """Stock reservations against Catalogue.stock.
+
+    Stock is taken with one conditional ``UPDATE catalogue SET stock = stock
+    - :qty WHERE id = :id AND stock >= :qty``: the database decides, so two
+    buyers can never both get the last unit and no row lock is held across
+    round-trips. Releases flip reservations from RESERVED with an UPDATE ...
+    RETURNING before giving stock back, so a reservation is restocked at
+    most once even when the sweeper and a cancel race.
+    """
+
+    def __init__(self, db: Session):
+        super().__init__(model=StockReservation, db=db)
+
+    def reserve(
+        self,
+        items: Sequence[ReservationItem],
+        checkout_id: Optional[int] = None,
+        ttl_seconds: Optional[int] = None,
+    ) -> List[Dict]:
+        """Reserve every item or none of them.
+
+        Raises InsufficientStockError (409) for the first item that cannot be
+        covered; the whole transaction, including earlier decrements, is
+        rolled back.
+        """
+        ttl = ttl_seconds or settings.RESERVATION_TTL_SECONDS
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=ttl)
+        quantities = Counter()
+        for item in items:
+            quantities[item.product_id] += item.quantity
+        with self._session_scope() as session:
+            try:
+                # เรียงตาม product_id ให้ทุก transaction ล็อกแถวลำดับเดียวกัน กัน deadlock
+                for product_id in sorted(quantities):
+                    quantity = quantities[product_id]
+                    result = session.execute(
+                        update(Catalogue)
+                        .where(Catalogue.id == product_id, Catalogue.stock >= quantity)
+                        .values(stock=Catalogue.stock - quantity)
+                        .execution_options(synchronize_session=False)
+                    )
+                    if result.rowcount != 1:
+                        raise InsufficientStockError(product_id, quantity)
+                rows = session.execute(
+                    insert(StockReservation).returning(
+                        *StockReservation.__table__.columns
+                    ),
+                    [
+                        {
+                            "product_id": product_id,
+                            "checkout_id": checkout_id,
+                            "quantity": quantities[product_id],
+                            "status": ReservationStatusEnum.RESERVED,
+                            "expires_at": expires_at,
+                        }
+                        for product_id in sorted(quantities)
+                    ],
+                )
+                reservations = [dict(row._mapping) for row in rows]
+            except InsufficientStockError:
+                session.rollback()
+                raise
+        self.logger.info(
+            f"Reserved {sum(quantities.values())} units for checkout {checkout_id}"
+        )
+        return reservations
+
+    def _release_where(self, *criteria) -> int:
+        """Release matching RESERVED reservations and give their stock back."""
+        with self._session_scope() as session:
+            released = session.execute(
+                update(StockReservation)
+                .where(
+                    StockReservation.status == ReservationStatusEnum.RESERVED,
+                    *criteria,
+                )
+                .values(status=ReservationStatusEnum.RELEASED)
+                .returning(StockReservation.product_id, StockReservation.quantity)
+                .execution_options(synchronize_session=False)
+            ).all()
+            restock = Counter()
+            for product_id, quantity in released:
+                restock[product_id] += quantity
+            for product_id in sorted(restock):
+                session.execute(
+                    update(Catalogue)
+                    .where(Catalogue.id == product_id)
+                    .values(stock=Catalogue.stock + restock[product_id])
+                    .execution_options(synchronize_session=False)
+                )
+        return len(released)
+
+    def release(self, checkout_id: int) -> int:
+        """Give back the stock held by an abandoned or cancelled checkout."""
+        count = self._release_where(StockReservation.checkout_id == checkout_id)
+        self.logger.info(f"Released {count} reservations of checkout {checkout_id}")
+        return count
+
+    def release_expired(self, now: Optional[datetime] = None) -> int:
+        """Give back the stock of every reservation whose TTL has passed."""
+        now = now or datetime.now(timezone.utc)
+        count = self._release_where(StockReservation.expires_at < now)
+        if count:
+            self.logger.info(f"Released {count} expired reservations")
+        return count
+
+    def commit(self, checkout_id: int) -> int:
+        """Sell the stock held by a completed checkout; returns the reservations sold.
+
+        RESERVED rows become COMMITTED; one past its TTL that the sweeper has
+        not reached yet still holds its stock. A product whose reservations
+        all lapsed (released at or after their expiry, i.e. restocked by the
+        sweeper) is taken again with the same conditional decrement as
+        ``reserve``. If that stock is gone, InsufficientStockError (409) is
+        raised and nothing changes.
+        """
+        with self._session_scope() as session:
+            try:
+                committed = session.execute(
+                    update(StockReservation)
+                    .where(
+                        StockReservation.checkout_id == checkout_id,
+                        StockReservation.status == ReservationStatusEnum.RESERVED,
+                    )
+                    .values(status=ReservationStatusEnum.COMMITTED)
+                    .returning(StockReservation.id)
+                    .execution_options(synchronize_session=False)
+                ).all()
+                # สินค้าที่ขายไปแล้ว (รอบนี้หรือรอบก่อน) ไม่ต้องจองซ้ำ
+                sold = set(
+                    session.scalars(
+                        select(StockReservation.product_id).where(
+                            StockReservation.checkout_id == checkout_id,
+                            StockReservation.status == ReservationStatusEnum.COMMITTED,
+                        )
+                    )
+                )
+                lapsed = session.execute(
+                    select(StockReservation.product_id, StockReservation.quantity).where(
+                        StockReservation.checkout_id == checkout_id,
+                        StockReservation.status == ReservationStatusEnum.RELEASED,
+                        StockReservation.updated_at >= StockReservation.expires_at,
+                    )
+                ).all()
+                retake = Counter()
+                for product_id, quantity in lapsed:
+                    if product_id not in sold:
+                        retake[product_id] += quantity
+                for product_id in sorted(retake):
+                    result = session.execute(
+                        update(Catalogue)
+                        .where(
+                            Catalogue.id == product_id,
+                            Catalogue.stock >= retake[product_id],
+                        )
+                        .values(stock=Catalogue.stock - retake[product_id])
+                        .execution_options(synchronize_session=False)
+                    )
+                    if result.rowcount != 1:
+                        raise InsufficientStockError(product_id, retake[product_id])
+                if retake:
+                    now = datetime.now(timezone.utc)
+                    session.execute(
+                        insert(StockReservation),
+                        [
+                            {
+                                "product_id": product_id,
+                                "checkout_id": checkout_id,
+                                "quantity": retake[product_id],
+                                "status": ReservationStatusEnum.COMMITTED,
+                                "expires_at": now,
+                            }
+                            for product_id in sorted(retake)
+                        ],
+                    )
+            except InsufficientStockError:
+                session.rollback()
+                raise
+        if retake:
+            self.logger.info(
+                f"Checkout {checkout_id} re-reserved lapsed stock of {sorted(retake)}"
+            )
+        return len(committed) + len(retake)
+
+
+class ReservationSweeper:
+    """Background thread that releases expired reservations every ``interval`` seconds."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._thread: Optional[threading.Thread] = None
+
+    def sweep(self) -> int:
+        with SessionLocal() as db:
+            return InventoryService(db).release_expired()
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+
+        def run():
+            while True:
+                try:
+                    self.sweep()
+                except Exception as e:
+                    logger.error(f"Reservation sweep failed: {str(e)}")
+                time.sleep(self.interval)
+
+        self._thread = threading.Thread(
+            target=run, name="reservation-sweeper", daemon=True
+        )
+        self._thread.start()
+
+
+reservation_sweeper = ReservationSweeper(settings.RESERVATION_SWEEP_INTERVAL)
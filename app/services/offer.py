@@ -20,7 +20,6 @@ class OfferService(BaseService[Offer, OfferCreate, OfferUpdate]):
             db_obj = self.model(**create_data)
             with self._session_scope() as session:
                 session.add(db_obj)
-                session.refresh(db_obj)
             return db_obj
         except Exception as e:
             self.logger.error(f"Offer creation failed: {str(e)}")
@@ -41,7 +40,6 @@ class VoucherService(BaseService[Voucher, VoucherCreate, VoucherUpdate]):
             db_obj = self.model(**create_data)
             with self._session_scope() as session:
                 session.add(db_obj)
-                session.refresh(db_obj)
             return db_obj
         except Exception as e:
             self.logger.error(f"Voucher creation failed: {str(e)}")
@@ -1,4 +1,4 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
 
 from app.core.exceptions import DatabaseError
 from app.models.order import Order
@@ -9,6 +9,18 @@ from app.services.base import BaseService
 class OrderService(BaseService[Order, OrderCreate, OrderUpdate]):
     """Service class for managing order-related operations."""
 
+    loader_options = {
+        "get": (
+            joinedload(Order.customer),
+            joinedload(Order.shipping_address),
+            joinedload(Order.billing_address),
+        ),
+        "list": (
+            joinedload(Order.shipping_address),
+            joinedload(Order.billing_address),
+        ),
+    }
+
     def __init__(self, db: Session):
         super().__init__(model=Order, db=db)
 
@@ -20,7 +32,6 @@ class OrderService(BaseService[Order, OrderCreate, OrderUpdate]):
             db_obj = self.model(**create_data)
             with self._session_scope() as session:
                 session.add(db_obj)
-                session.refresh(db_obj)
             return db_obj
         except Exception as e:
             self.logger.error(f"Order creation failed: {str(e)}")
@@ -20,7 +20,6 @@ class PaymentService(BaseService[Payment, PaymentCreate, PaymentUpdate]):
             db_obj = self.model(**create_data)
             with self._session_scope() as session:
                 session.add(db_obj)
-                session.refresh(db_obj)
             return db_obj
         except Exception as e:
             self.logger.error(f"Payment creation failed: {str(e)}")
@@ -0,0 +1,209 @@
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import Float, Integer, select, update
+from sqlalchemy.orm import Session
+
+from app.models.cart import Cart, CartLine
+from app.models.catalogue import Catalogue
+from app.schemas.cart import CartLineCreate, CartLineUpdate
+from app.services.base import BaseService, update_rows
+from app.services.cart import apply_cart_deltas
+from app.services.cart_store import get_write_behind_store
+from app.settings import base as settings
+
+CENTS = 100
+# discount_percentage ละเอียดได้ถึง 1e-6 %; ยอด line ไม่เกิน ~1e9 สตางค์ จึงไม่ล้น int64
+PERCENT_SCALE = 1_000_000
+
+
+def to_cents(amounts) -> np.ndarray:
+    return np.rint(np.asarray(amounts, dtype=np.float64) * CENTS).astype(np.int64)
+
+
+def div_half_even(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    """Integer division rounded half to even, without going through floats."""
+    quotient, remainder = np.divmod(numerator, denominator)
+    twice = 2 * remainder
+    round_up = (twice > denominator) | ((twice == denominator) & (quotient % 2 == 1))
+    return quotient + round_up
+
+
+def reprice_lines(
+    quantity: np.ndarray,
+    old_price: np.ndarray,
+    old_discount: np.ndarray,
+    new_price: np.ndarray,
+    discount_percentage: Optional[float] = None,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Reprice line arrays in integer cents.
+
+    Returns per-line arrays (price, discount, subtotal delta, discount
+    delta), all in cents. Without ``discount_percentage`` each
+    line keeps the discount-to-subtotal ratio it had; with it every line
+    gets that percentage off. New discounts are exact quotients rounded
+    half to even, so ties never flip on float error.
+    """
+    old_subtotal = old_price * quantity
+    new_subtotal = new_price * quantity
+    if discount_percentage is None:
+        numerator = old_discount * new_subtotal
+        denominator = old_subtotal
+    else:
+        # เปอร์เซ็นต์เป็นจำนวนเต็มหน่วย 1/PERCENT_SCALE % เพื่อหารแบบ integer ได้
+        numerator = new_subtotal * round(discount_percentage * PERCENT_SCALE)
+        denominator = np.full(len(new_subtotal), 100 * PERCENT_SCALE, dtype=np.int64)
+    new_discount = np.zeros(len(new_subtotal), dtype=np.int64)
+    priced = denominator != 0
+    new_discount[priced] = div_half_even(numerator[priced], denominator[priced])
+    new_discount = np.minimum(new_discount, new_subtotal)
+    return new_price, new_discount, new_subtotal - old_subtotal, new_discount - old_discount
+
+
+def sum_by_cart(
+    cart_ids: np.ndarray, *amounts: np.ndarray
+) -> Tuple[np.ndarray, ...]:
+    """Group per-line amounts by cart: (unique cart ids, one sum array per amount)."""
+    carts, index = np.unique(cart_ids, return_inverse=True)
+    sums = tuple(
+        np.bincount(index, weights=amount, minlength=len(carts)).round().astype(np.int64)
+        for amount in amounts
+    )
+    return (carts, *sums)
+
+
+class PricingService(BaseService[CartLine, CartLineCreate, CartLineUpdate]):
+    """Batch repricing of open cart lines after catalogue price changes.
+
+    Open means the cart has no ``checked_out_at``: lines of carts whose
+    checkout completed keep the prices they were bought at.
+
+    Lines are read in keyset chunks of PRICING_CHUNK_SIZE into columnar
+    arrays, repriced in integer cents with NumPy, and written back with
+    set-based UPDATEs: one for the changed lines and one that shifts the
+    stored totals of their carts by the per-cart deltas (tax and total are
+    re-derived from the stored columns in that UPDATE, as for single line
+    writes). Each chunk is one transaction holding row locks on its lines.
+
+    The same UPDATE bumps ``store_version`` of every repriced cart, so a
+    write-behind snapshot taken before the run (in this process or any
+    other) can no longer flush over the new prices; it is reloaded instead.
+    """
+
+    def __init__(self, db: Session):
+        super().__init__(model=CartLine, db=db)
+
+    def _load_chunk(
+        self,
+        session: Session,
+        after_id: int,
+        product_ids: Optional[Sequence[int]],
+    ) -> Dict[str, np.ndarray]:
+        query = (
+            select(
+                CartLine.id,
+                CartLine.cart_id,
+                CartLine.quantity,
+                CartLine.price,
+                CartLine.discount_amount,
+                Catalogue.price,
+            )
+            .join(Catalogue, Catalogue.id == CartLine.product_id)
+            .join(Cart, Cart.id == CartLine.cart_id)
+            # cart ที่ checkout แล้วคงราคาตอนซื้อไว้
+            .where(CartLine.id > after_id, Cart.checked_out_at.is_(None))
+            .order_by(CartLine.id)
+            .limit(settings.PRICING_CHUNK_SIZE)
+            .with_for_update(of=CartLine)
+        )
+        if product_ids is not None:
+            query = query.where(CartLine.product_id.in_(product_ids))
+        rows = session.execute(query).all()
+        names = ("id", "cart_id", "quantity", "price", "discount", "new_price")
+        if not rows:
+            return {name: np.empty(0) for name in names}
+        arrays = dict(zip(names, (np.asarray(col) for col in zip(*rows))))
+        for name in ("price", "discount", "new_price"):
+            arrays[name] = to_cents(arrays[name])
+        for name in ("id", "cart_id", "quantity"):
+            arrays[name] = arrays[name].astype(np.int64)
+        return arrays
+
+    @staticmethod
+    def _write_lines(session: Session, ids, price, discount) -> None:
+        rows = [
+            {"b_id": line_id, "b_price": p / CENTS, "b_discount": d / CENTS}
+            for line_id, p, d in zip(ids.tolist(), price.tolist(), discount.tolist())
+        ]
+        line = CartLine.__table__
+        update_rows(
+            session,
+            line,
+            rows,
+            {"b_id": Integer, "b_price": Float, "b_discount": Float},
+            lambda param: update(line)
+            .where(line.c.id == param("b_id"))
+            .values(price=param("b_price"), discount_amount=param("b_discount")),
+        )
+
+    def reprice(
+        self,
+        product_ids: Optional[Sequence[int]] = None,
+        discount_percentage: Optional[float] = None,
+    ) -> Dict[str, int]:
+        """Set open lines to the current catalogue price and update cart totals.
+
+        ``product_ids`` limits the run to lines of those products. Returns
+        how many lines and carts changed.
+        """
+        store = get_write_behind_store()
+        if store:
+            # ให้ DB มีทุกอย่างที่ค้างใน store ก่อน reprice
+            store.flush()
+        counts = {"lines": 0, "carts": 0}
+        touched = set()
+        after_id = 0
+        while True:
+            with self._session_scope() as session:
+                chunk = self._load_chunk(session, after_id, product_ids)
+                if not len(chunk["id"]):
+                    break
+                after_id = int(chunk["id"][-1])
+                price, discount, subtotal_delta, discount_delta = reprice_lines(
+                    chunk["quantity"],
+                    chunk["price"],
+                    chunk["discount"],
+                    chunk["new_price"],
+                    discount_percentage,
+                )
+                changed = (subtotal_delta != 0) | (discount_delta != 0)
+                if changed.any():
+                    self._write_lines(
+                        session, chunk["id"][changed], price[changed], discount[changed]
+                    )
+                    carts, subtotal_sums, discount_sums = sum_by_cart(
+                        chunk["cart_id"][changed],
+                        subtotal_delta[changed],
+                        discount_delta[changed],
+                    )
+                    apply_cart_deltas(
+                        session,
+                        {
+                            cart_id: (subtotal / CENTS, discount / CENTS)
+                            for cart_id, subtotal, discount in zip(
+                                carts.tolist(),
+                                subtotal_sums.tolist(),
+                                discount_sums.tolist(),
+                            )
+                        },
+                        bump_store_version=True,
+                    )
+                    counts["lines"] += int(changed.sum())
+                    touched.update(carts.tolist())
+        counts["carts"] = len(touched)
+        if store:
+            store.evict_clean(touched)
+        self.logger.info(
+            f"Repriced {counts['lines']} cart lines in {counts['carts']} carts"
+        )
+        return counts
@@ -19,7 +19,6 @@ class ShippingService(BaseService[Shipping, ShippingCreate, ShippingUpdate]):
             db_obj = self.model(**create_data)
             with self._session_scope() as session:
                 session.add(db_obj)
-                session.refresh(db_obj)
             return db_obj
         except Exception as e:
             self.logger.error(f"Shipping creation failed: {str(e)}")
@@ -4,7 +4,9 @@ from typing import Optional
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
 
-from app.core.security import get_password_hash
+from app.core.revocation import revocation_list
+from app.core.security import async_get_password_hash, get_password_hash
+from app.core.user_cache import user_cache
 from app.models.user import User
 from app.schemas.user import UserCreate, UserUpdate
 
@@ -30,7 +32,6 @@ class UserService(BaseService[User, UserCreate, UserUpdate]):
             with self._session_scope() as session:
                 session.add(db_obj)
                 session.commit()
-                session.refresh(db_obj)
             return db_obj
         except SQLAlchemyError as e:
             self.logger.error(f"Error creating user: {str(e)}")
@@ -43,14 +44,51 @@ class UserService(BaseService[User, UserCreate, UserUpdate]):
                 update_data["hashed_password"] = get_password_hash(
                     update_data.pop("password")
                 )
+            user_id = str(db_obj.id)
             for field, value in update_data.items():
                 if hasattr(db_obj, field):
                     setattr(db_obj, field, value)
+            if "hashed_password" in update_data:
+                revocation_list.revoke_user(db_obj)
             with self._session_scope() as session:
                 session.add(db_obj)
                 session.commit()
-                session.refresh(db_obj)
+            user_cache.invalidate([user_id])
             return db_obj
         except SQLAlchemyError as e:
             self.logger.error(f"Error updating user: {str(e)}")
             raise e
+
+    async def async_update(self, db_obj: User, obj_in: UserUpdate) -> User:
+        try:
+            update_data = obj_in.model_dump(exclude_unset=True)
+            if "password" in update_data:
+                update_data["hashed_password"] = await async_get_password_hash(
+                    update_data.pop("password")
+                )
+            user_id = str(db_obj.id)
+            for field, value in update_data.items():
+                if hasattr(db_obj, field):
+                    setattr(db_obj, field, value)
+            if "hashed_password" in update_data:
+                revocation_list.revoke_user(db_obj)
+            async with self._async_session_scope() as session:
+                session.add(db_obj)
+                await session.flush()
+            user_cache.invalidate([user_id])
+            return db_obj
+        except SQLAlchemyError as e:
+            self.logger.error(f"Error updating user: {str(e)}")
+            raise e
+
+    def remove(self, id: int) -> Optional[User]:
+        user = super().remove(id)
+        if user is not None:
+            user_cache.invalidate([str(id)])
+        return user
+
+    async def async_remove(self, id: int) -> Optional[User]:
+        user = await super().async_remove(id)
+        if user is not None:
+            user_cache.invalidate([str(id)])
+        return user
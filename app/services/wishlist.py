@@ -21,7 +21,6 @@ class WishlistService(BaseService[Wishlist, WishlistCreate, WishlistUpdate]):
             db_obj = self.model(**create_data)
             with self._session_scope() as session:
                 session.add(db_obj)
-                session.refresh(db_obj)
             return db_obj
         except Exception as e:
             self.logger.error(f"Wishlist creation failed: {str(e)}")
@@ -6,9 +6,82 @@ JWT_ALGORITHM = "HS256"
 JWT_SECRET = ""
 REFRESH_TOKEN_EXPIRE_DAYS = 7
 ACCESS_TOKEN_EXPIRE_MINUTES = 24 * 24
+# Cache ของ JWT ที่ verify แล้ว (วินาที, ไม่เกิน exp ของ token)
+JWT_CACHE_MAXSIZE = int(os.environ.get("JWT_CACHE_MAXSIZE", 50_000))
+JWT_CACHE_TTL = float(os.environ.get("JWT_CACHE_TTL", 300))
+
+# สร้าง/อัปเดต schema ตอน startup ถ้า fingerprint ไม่ตรง (ปิดใน production แล้วใช้ CLI แทน)
+SCHEMA_AUTO_APPLY = os.environ.get("SCHEMA_AUTO_APPLY", str(DEBUG)).lower() == "true"
+
+# statement ที่ช้ากว่านี้ (ms) จะถูก log เป็น slow_query
+SLOW_QUERY_THRESHOLD_MS = float(os.environ.get("SLOW_QUERY_THRESHOLD_MS", 200))
+# จำนวน query สูงสุดต่อ request ก่อน RequestLogMiddleware จะ raise (0 = ปิด, ใช้ตอน test)
+QUERY_BUDGET = int(os.environ.get("QUERY_BUDGET", 0))
 
 ALLOW_ORIGINS = ["http://localhost", "http://localhost:8080", "https://example.com"]
 
+# Token ที่ถูก revoke: Bloom filter ในแต่ละ pod sync จากฐานข้อมูลทุก N วินาที
+REVOCATION_SYNC_INTERVAL = float(os.environ.get("REVOCATION_SYNC_INTERVAL", 30))
+REVOCATION_BLOOM_CAPACITY = int(os.environ.get("REVOCATION_BLOOM_CAPACITY", 100_000))
+REVOCATION_BLOOM_ERROR_RATE = float(os.environ.get("REVOCATION_BLOOM_ERROR_RATE", 0.001))
+
+# Rate limit ของ /auth: "memory" (ต่อ pod) หรือ "redis" (ใช้ร่วมกันทุก pod)
+RATE_LIMIT_BACKEND = os.environ.get("RATE_LIMIT_BACKEND", "memory")
+RATE_LIMIT_TRUST_FORWARDED_FOR = (
+    os.environ.get("RATE_LIMIT_TRUST_FORWARDED_FOR", "false").lower() == "true"
+)
+AUTH_RATE_LIMIT_IP_CAPACITY = int(os.environ.get("AUTH_RATE_LIMIT_IP_CAPACITY", 20))
+AUTH_RATE_LIMIT_IP_REFILL = float(os.environ.get("AUTH_RATE_LIMIT_IP_REFILL", 0.5))
+AUTH_RATE_LIMIT_USERNAME_CAPACITY = int(
+    os.environ.get("AUTH_RATE_LIMIT_USERNAME_CAPACITY", 5)
+)
+AUTH_RATE_LIMIT_USERNAME_REFILL = float(
+    os.environ.get("AUTH_RATE_LIMIT_USERNAME_REFILL", 1 / 60)
+)
+
+# bcrypt รันบน worker pool แยก: thread (default) หรือ process
+PASSWORD_HASH_EXECUTOR = os.environ.get("PASSWORD_HASH_EXECUTOR", "thread")
+PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", 2))
+PASSWORD_HASH_MAX_QUEUE = int(os.environ.get("PASSWORD_HASH_MAX_QUEUE", 64))
+
+REDIS_URL: str = os.environ.get("REDIS_URL", "")
+
+# Cache ของ user ที่ยืนยันตัวตนแล้วใน JWTMiddleware
+USER_CACHE_MAXSIZE = int(os.environ.get("USER_CACHE_MAXSIZE", 10_000))
+USER_CACHE_TTL = float(os.environ.get("USER_CACHE_TTL", 60))
+
+# Batch endpoints: จำนวน item สูงสุดต่อ request และขนาด chunk ต่อ statement
+# body ทั้งก้อนถูก parse ในหน่วยความจำ ชุดใหญ่กว่านี้ให้ใช้ /catalogues/import/ ที่ stream ได้
+BATCH_MAX_ITEMS = int(os.environ.get("BATCH_MAX_ITEMS", 1_000))
+BATCH_CHUNK_SIZE = int(os.environ.get("BATCH_CHUNK_SIZE", 1_000))
+
+# จำนวนแถวที่ดึงจาก server-side cursor ต่อรอบตอน export
+EXPORT_YIELD_PER = int(os.environ.get("EXPORT_YIELD_PER", 1_000))
+
+# Stock reservation: อายุของการจองก่อนคืน stock และรอบการกวาดการจองที่หมดอายุ (วินาที)
+RESERVATION_TTL_SECONDS = int(os.environ.get("RESERVATION_TTL_SECONDS", 15 * 60))
+RESERVATION_SWEEP_INTERVAL = float(os.environ.get("RESERVATION_SWEEP_INTERVAL", 60))
+
+# Bulk import: จำนวนแถวที่ validate และเขียนต่อ chunk, จำนวน error สูงสุดที่รายงานกลับ
+IMPORT_CHUNK_SIZE = int(os.environ.get("IMPORT_CHUNK_SIZE", 5_000))
+IMPORT_MAX_ERRORS = int(os.environ.get("IMPORT_MAX_ERRORS", 100))
+
+# ที่เก็บ cart: "database" (เขียนตรงลง DB), "memory" (ต่อ process) หรือ "redis"
+# สองแบบหลังเป็น write-behind: flush ลงตาราง cart/cart_line ทุก CART_STORE_FLUSH_INTERVAL วินาที
+CART_STORE_BACKEND = os.environ.get("CART_STORE_BACKEND", "database")
+CART_STORE_FLUSH_INTERVAL = float(os.environ.get("CART_STORE_FLUSH_INTERVAL", 1))
+CART_STORE_MAX_CARTS = int(os.environ.get("CART_STORE_MAX_CARTS", 100_000))
+CART_STORE_TTL = int(os.environ.get("CART_STORE_TTL", 24 * 60 * 60))
+# จำนวน worker process ของ API (uvicorn/gunicorn อ่านค่าเดียวกัน) ใช้กัน memory store ตอนมีหลาย process
+WEB_CONCURRENCY = int(os.environ.get("WEB_CONCURRENCY", 1))
+# flush cart เดิมพังติดกันกี่ครั้งจึงเลิก retry แล้วย้ายออกจาก store
+CART_STORE_MAX_FLUSH_FAILURES = int(os.environ.get("CART_STORE_MAX_FLUSH_FAILURES", 5))
+# จำนวน cart_line id ที่จองจากตาราง id_block ต่อครั้ง (hi/lo)
+CART_STORE_ID_BLOCK = int(os.environ.get("CART_STORE_ID_BLOCK", 100))
+
+# จำนวน cart_line ที่ reprice ต่อ chunk (หนึ่ง transaction ต่อ chunk)
+PRICING_CHUNK_SIZE = int(os.environ.get("PRICING_CHUNK_SIZE", 50_000))
+
 CELERY_BROKER_URL: str = os.environ.get("CELERY_BROKER_URL", "")
 CELERY_RESULT_BACKEND: str = os.environ.get("CELERY_RESULT_BACKEND", "")
 AWS_ACCESS_KEY_ID = os.environ.get("AWS_ACCESS_KEY_ID", "")
@@ -1,5 +1,7 @@
 import os
 
+# Read replica: ค่าที่ไม่ได้ระบุจะใช้ของ primary เช่น {"HOST": "replica-1"}
+REPLICA_HOSTS = [h for h in os.getenv("POSTGRES_REPLICA_HOSTS", "").split(",") if h]
 
 DATABASES = {
     "default": {
@@ -9,5 +11,16 @@ DATABASES = {
         "PASSWORD": os.getenv("POSTGRES_PASSWORD"),
         "HOST": os.getenv("POSTGRES_HOST"),
         "PORT": 5432,
+        # log ทุก statement ลง stdout (ใช้ตอน debug เท่านั้น)
+        "ECHO": os.getenv("DB_ECHO", "false").lower() == "true",
+        # Connection pool (ต่อ 1 process)
+        "POOL_SIZE": int(os.getenv("DB_POOL_SIZE", 5)),
+        "MAX_OVERFLOW": int(os.getenv("DB_MAX_OVERFLOW", 10)),
+        "POOL_TIMEOUT": float(os.getenv("DB_POOL_TIMEOUT", 30)),
+        "POOL_RECYCLE": int(os.getenv("DB_POOL_RECYCLE", 1800)),
+        "POOL_PRE_PING": os.getenv("DB_POOL_PRE_PING", "true").lower() == "true",
+        # จำนวน connection ที่เปิดรอไว้ตอน startup (0 = ไม่ pre-warm)
+        "POOL_PREWARM": int(os.getenv("DB_POOL_PREWARM", 0)),
+        "REPLICAS": [{"HOST": host} for host in REPLICA_HOSTS],
     }
 }
@@ -0,0 +1,190 @@
+import pytest
+from sqlalchemy import delete, select
+
+from app.conftest import TestingSessionLocal
+from app.core.exceptions import CartOperationError, DatabaseError
+from app.core.security import get_password_hash
+from app.models.cart import Cart, CartLine
+from app.models.catalogue import Catalogue
+from app.models.customer import Customer
+from app.models.user import User
+from app.schemas.cart import AddLineOperation, CartLineCreate
+from app.services import cart_store
+from app.services.cart_store import (
+    CartStore,
+    LineIdAllocator,
+    MemoryCartStore,
+    WriteBehindCartStore,
+)
+from app.services.pricing import PricingService
+from app.settings import base as settings
+
+
+@pytest.fixture
+def session_factory(monkeypatch):
+    # store เปิด session เอง ให้ชี้ไปที่ test database
+    monkeypatch.setattr(cart_store, "SessionLocal", TestingSessionLocal)
+    return TestingSessionLocal
+
+
+@pytest.fixture
+def cart(session_factory):
+    with session_factory() as session:
+        customer = Customer(
+            username="cart-store-customer",
+            email="cart-store-customer@example.com",
+            hashed_password=get_password_hash("secret"),
+        )
+        product = Catalogue(name="cart-store-product", price=10.0, stock=5)
+        session.add_all([customer, product])
+        session.flush()
+        cart = Cart(customer_id=customer.id, product_id=product.id)
+        session.add(cart)
+        session.commit()
+        ids = {"cart": cart.id, "product": product.id, "customer": customer.id}
+    yield ids
+    with session_factory() as session:
+        session.execute(delete(CartLine).where(CartLine.cart_id == ids["cart"]))
+        session.execute(delete(Cart).where(Cart.id == ids["cart"]))
+        session.execute(delete(Catalogue).where(Catalogue.id == ids["product"]))
+        session.execute(delete(Customer).where(Customer.id == ids["customer"]))
+        session.execute(delete(User).where(User.id == ids["customer"]))
+        session.commit()
+
+
+@pytest.fixture
+def store(session_factory) -> MemoryCartStore:
+    return MemoryCartStore(LineIdAllocator(block_size=10), max_carts=10)
+
+
+def _line(cart, product_id=None) -> CartLineCreate:
+    return CartLineCreate(
+        cart_id=cart["cart"],
+        product_id=product_id or cart["product"],
+        quantity=1,
+        price=10.0,
+    )
+
+
+def test_stores_are_abstract():
+    with pytest.raises(TypeError):
+        CartStore()
+    with pytest.raises(TypeError):
+        WriteBehindCartStore(LineIdAllocator(block_size=10))
+
+
+def test_version_is_not_returned(store, cart):
+    assert "version" not in store.get_cart(cart["cart"])
+    store.add_line(_line(cart))
+    assert "version" not in store.get_cart(cart["cart"])
+    assert "version" not in store.apply_line_ops(
+        cart["cart"],
+        [AddLineOperation(op="add", product_id=cart["product"], quantity=1, price=1)],
+    )
+
+
+def test_lines_for_unknown_products_or_carts_are_rejected(store, cart):
+    missing = cart["product"] + 1000
+    with pytest.raises(DatabaseError) as error:
+        store.add_line(_line(cart, product_id=missing))
+    assert error.value.status_code == 404
+    with pytest.raises(CartOperationError) as error:
+        store.apply_line_ops(
+            cart["cart"],
+            [AddLineOperation(op="add", product_id=missing, quantity=1, price=1)],
+        )
+    assert error.value.index == 0
+    with pytest.raises(DatabaseError) as error:
+        store.add_line(CartLineCreate(**{**_line(cart).model_dump(), "cart_id": 0}))
+    assert error.value.status_code == 404
+
+    assert store._dirty() == {}
+
+
+def test_cart_that_keeps_failing_to_flush_is_set_aside(
+    store, cart, session_factory, monkeypatch
+):
+    monkeypatch.setattr(settings, "CART_STORE_MAX_FLUSH_FAILURES", 3)
+    with session_factory() as session:
+        product = Catalogue(name="discontinued", price=1.0, stock=1)
+        session.add(product)
+        session.commit()
+    line = store.add_line(_line(cart, product_id=product.id))
+    # สินค้าถูกลบหลังเพิ่ม line: ทุก flush ชน foreign key
+    with session_factory() as session:
+        session.execute(delete(Catalogue).where(Catalogue.id == product.id))
+        session.commit()
+
+    for _ in range(2):
+        assert store.flush() == 0
+        assert cart["cart"] in store._dirty()
+    store.flush()
+
+    assert store._dirty() == {}
+    assert store.set_aside[cart["cart"]]["cart_lines"][0]["id"] == line["id"]
+    # รอบถัดไปโหลดจาก DB ใหม่ ไม่มี line ที่ flush ไม่ได้
+    assert store.get_cart(cart["cart"])["cart_lines"] == []
+
+
+def test_snapshot_flushed_after_a_reprice_does_not_undo_it(
+    store, cart, session_factory
+):
+    line = store.add_line(_line(cart))
+    store.flush()
+    # แก้หลายครั้งโดยยังไม่ flush: version ของ snapshot นำ DB ไปหลายขั้น
+    for rate in (0.1, 0.2, 0.0):
+        store.apply_line_discount(line["id"], rate)
+    with session_factory() as session:
+        session.get(Catalogue, cart["product"]).price = 25.0
+        session.commit()
+        # store นี้ไม่ใช่ store ของ process ที่ reprice เหมือน worker อีกตัว
+        assert PricingService(session).reprice(product_ids=[cart["product"]]) == {
+            "lines": 1,
+            "carts": 1,
+        }
+
+    assert store.flush() == 0
+
+    with session_factory() as session:
+        assert session.scalars(
+            select(CartLine.price).where(CartLine.cart_id == cart["cart"])
+        ).all() == [25.0]
+        assert session.get(Cart, cart["cart"]).subtotal_amount == 25.0
+    reloaded = store.get_cart(cart["cart"])
+    assert [line["price"] for line in reloaded["cart_lines"]] == [25.0]
+    assert reloaded["subtotal_amount"] == 25.0
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    """Select a write-behind backend for get_write_behind_store."""
+    monkeypatch.setattr(cart_store, "_write_behind_store", None)
+
+    def select_backend(name: str):
+        monkeypatch.setattr(settings, "CART_STORE_BACKEND", name)
+        return cart_store.get_write_behind_store
+
+    return select_backend
+
+
+def test_unsafe_store_configurations_fail(backend, monkeypatch):
+    monkeypatch.setattr(cart_store, "get_redis", lambda: None)
+    with pytest.raises(RuntimeError):
+        backend("redis")()
+    monkeypatch.setattr(settings, "WEB_CONCURRENCY", 2)
+    with pytest.raises(RuntimeError):
+        backend("memory")()
+    monkeypatch.setattr(settings, "WEB_CONCURRENCY", 1)
+    assert isinstance(backend("memory")(), MemoryCartStore)
+
+
+def test_list_endpoints_see_unflushed_writes(backend, cart, client):
+    store = backend("memory")()
+    line = store.add_line(_line(cart))
+
+    lines = client.get("/v1/carts/cart-lines/").json()["data"]
+    carts = client.get("/v1/carts/carts/").json()["data"]
+
+    assert line["id"] in [item["id"] for item in lines]
+    listed = next(item for item in carts if item["id"] == cart["cart"])
+    assert listed["subtotal_amount"] == 10.0
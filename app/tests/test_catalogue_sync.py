@@ -0,0 +1,48 @@
+from app.models.catalogue import Catalogue
+from app.schemas.catalogue import CatalogueUpdate, CatalogueUpsert
+from app.schemas.inventory import ReservationItem
+from app.services.catalogue import CatalogueService
+from app.services.inventory import InventoryService
+
+
+def _feed(**fields) -> CatalogueUpsert:
+    return CatalogueUpsert(
+        **{"sku": "SKU-1", "name": "feed name", "price": 10.0, "stock": 10, **fields}
+    )
+
+
+def _product(db) -> Catalogue:
+    return db.query(Catalogue).filter(Catalogue.sku == "SKU-1").one()
+
+
+def test_sync_keeps_stock_net_of_reservations(db):
+    service = CatalogueService(db)
+    service.upsert_many([_feed()])
+    product = _product(db)
+    InventoryService(db).reserve([ReservationItem(product_id=product.id, quantity=3)])
+
+    result = service.upsert_many([_feed(price=12.0, stock=10)])
+
+    assert result["updated"] == 1
+    db.refresh(product)
+    assert product.price == 12.0
+    # feed ไม่รู้ว่ามีของจองอยู่ ถ้าเขียนทับ release ทีหลังจะได้ 13
+    assert product.stock == 7
+
+
+def test_manual_edits_are_restored_by_the_next_sync(db):
+    service = CatalogueService(db)
+    service.upsert_many([_feed()])
+    product = _product(db)
+
+    service.update(product, CatalogueUpdate(name="edited", price=10.0, stock=10))
+    assert service.upsert_many([_feed()])["updated"] == 1
+    db.refresh(product)
+    assert product.name == "feed name"
+
+    service.update_many(
+        [(product.id, CatalogueUpdate(name="edited again", price=10.0, stock=10))]
+    )
+    assert service.upsert_many([_feed()])["updated"] == 1
+    db.refresh(product)
+    assert product.name == "feed name"
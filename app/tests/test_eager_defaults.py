@@ -0,0 +1,52 @@
+from datetime import timedelta
+
+from sqlalchemy import event
+
+from app.models.catalogue import Catalogue
+from app.schemas.catalogue import CatalogueCreate, CatalogueUpdate
+from app.services.catalogue import CatalogueService
+
+
+def _statements(db) -> list:
+    statements = []
+
+    @event.listens_for(db.get_bind(), "before_cursor_execute")
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if not statement.startswith(("SAVEPOINT", "RELEASE")):
+            statements.append(statement)
+
+    return statements
+
+
+def _item(**fields) -> dict:
+    return {"name": "item", "price": 10.0, "stock": 1, **fields}
+
+
+def test_create_returns_server_defaults_without_a_select(db):
+    statements = _statements(db)
+
+    catalogue = CatalogueService(db).create(CatalogueCreate(**_item()))
+    assert catalogue.id is not None
+    assert catalogue.created_at is not None
+    assert catalogue.updated_at is not None
+
+    assert len(statements) == 1
+    assert statements[0].startswith("INSERT") and "RETURNING" in statements[0]
+
+
+def test_update_returns_onupdate_value_without_a_select(db):
+    service = CatalogueService(db)
+    catalogue = service.create(CatalogueCreate(**_item()))
+    # now() คงที่ทั้ง transaction ต้องตั้งค่าเก่าให้ต่างจากค่าที่ onupdate จะได้
+    db.query(Catalogue).filter(Catalogue.id == catalogue.id).update(
+        {"updated_at": Catalogue.created_at - timedelta(days=1)}
+    )
+    db.expire(catalogue)
+    previous = catalogue.updated_at
+    statements = _statements(db)
+
+    service.update(catalogue, CatalogueUpdate(**_item(stock=2)))
+    assert catalogue.updated_at > previous
+
+    assert len(statements) == 1
+    assert statements[0].startswith("UPDATE") and "RETURNING" in statements[0]
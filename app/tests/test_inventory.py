@@ -0,0 +1,183 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import delete, select, update
+
+from app.conftest import TestingSessionLocal
+from app.core.exceptions import InsufficientStockError
+from app.core.security import get_password_hash
+from app.models.address import Address, Tile
+from app.models.catalogue import Catalogue
+from app.models.checkout import Checkout
+from app.models.customer import Customer
+from app.models.inventory import ReservationStatusEnum, StockReservation
+from app.models.order import Order
+from app.models.user import User
+from app.schemas.checkout import CheckoutUpdate
+from app.schemas.inventory import ReservationItem
+from app.services.checkout import CheckoutService
+from app.services.inventory import InventoryService
+
+STOCK = 10
+BUYERS = 40
+
+
+@pytest.fixture
+def product():
+    # ต้อง commit จริง แต่ละ thread ใช้ session/connection ของตัวเอง
+    with TestingSessionLocal() as session:
+        product = Catalogue(name="limited", price=10.0, stock=STOCK)
+        session.add(product)
+        session.commit()
+        product_id = product.id
+    yield product_id
+    with TestingSessionLocal() as session:
+        session.execute(
+            delete(StockReservation).where(StockReservation.product_id == product_id)
+        )
+        session.execute(delete(Catalogue).where(Catalogue.id == product_id))
+        session.commit()
+
+
+def test_parallel_reservations_never_oversell(product):
+    start = threading.Barrier(BUYERS)
+
+    def buy() -> bool:
+        with TestingSessionLocal() as session:
+            start.wait()
+            try:
+                InventoryService(session).reserve(
+                    [ReservationItem(product_id=product, quantity=1)]
+                )
+                return True
+            except InsufficientStockError:
+                return False
+
+    with ThreadPoolExecutor(max_workers=BUYERS) as pool:
+        results = list(pool.map(lambda _: buy(), range(BUYERS)))
+
+    with TestingSessionLocal() as session:
+        stock = session.get(Catalogue, product).stock
+        reserved = session.query(StockReservation).filter_by(product_id=product).count()
+
+    assert stock == 0
+    assert results.count(True) == STOCK
+    assert reserved == STOCK
+
+
+@pytest.fixture
+def checkout(product):
+    with TestingSessionLocal() as session:
+        customer = Customer(
+            username="inventory-customer",
+            email="inventory-customer@example.com",
+            hashed_password=get_password_hash("secret"),
+        )
+        session.add(customer)
+        session.flush()
+        address = Address(title=Tile.MR, customer_id=customer.id)
+        session.add(address)
+        session.flush()
+        order = Order(
+            customer_id=customer.id, shipping_address_id=address.id, total_amount=1
+        )
+        session.add(order)
+        session.flush()
+        checkout = Checkout(order_id=order.id)
+        session.add(checkout)
+        session.commit()
+        ids = {
+            "checkout": checkout.id,
+            "order": order.id,
+            "address": address.id,
+            "customer": customer.id,
+        }
+    yield ids["checkout"]
+    with TestingSessionLocal() as session:
+        session.execute(
+            delete(StockReservation).where(
+                StockReservation.checkout_id == ids["checkout"]
+            )
+        )
+        session.execute(delete(Checkout).where(Checkout.id == ids["checkout"]))
+        session.execute(delete(Order).where(Order.id == ids["order"]))
+        session.execute(delete(Address).where(Address.id == ids["address"]))
+        session.execute(delete(Customer).where(Customer.id == ids["customer"]))
+        session.execute(delete(User).where(User.id == ids["customer"]))
+        session.commit()
+
+
+def reserve_then_lapse(product, checkout, quantity=3):
+    with TestingSessionLocal() as session:
+        InventoryService(session).reserve(
+            [ReservationItem(product_id=product, quantity=quantity)],
+            checkout_id=checkout,
+        )
+        # TTL หมดแล้วและ sweeper คืน stock ไปก่อน checkout จบ
+        session.execute(
+            update(StockReservation)
+            .where(StockReservation.checkout_id == checkout)
+            .values(expires_at=datetime.now(timezone.utc) - timedelta(minutes=1))
+        )
+        session.commit()
+        assert InventoryService(session).release_expired() == 1
+
+
+def complete(checkout):
+    with TestingSessionLocal() as session:
+        service = CheckoutService(session)
+        db_checkout = service.get(checkout)
+        service.update(
+            db_checkout,
+            CheckoutUpdate(order_id=db_checkout.order_id, status="completed"),
+        )
+
+
+def test_completing_a_lapsed_checkout_takes_the_stock_again(product, checkout):
+    reserve_then_lapse(product, checkout)
+
+    complete(checkout)
+
+    with TestingSessionLocal() as session:
+        assert session.get(Catalogue, product).stock == STOCK - 3
+        statuses = session.scalars(
+            select(StockReservation.status).where(
+                StockReservation.checkout_id == checkout
+            )
+        ).all()
+        assert sorted(statuses) == [
+            ReservationStatusEnum.COMMITTED,
+            ReservationStatusEnum.RELEASED,
+        ]
+    # จบซ้ำไม่ตัด stock อีกรอบ
+    complete(checkout)
+    with TestingSessionLocal() as session:
+        assert session.get(Catalogue, product).stock == STOCK - 3
+
+
+def test_completing_a_lapsed_checkout_without_stock_is_refused(product, checkout):
+    reserve_then_lapse(product, checkout)
+    with TestingSessionLocal() as session:
+        InventoryService(session).reserve(
+            [ReservationItem(product_id=product, quantity=STOCK)]
+        )
+
+    with pytest.raises(InsufficientStockError):
+        complete(checkout)
+
+    with TestingSessionLocal() as session:
+        assert session.get(Checkout, checkout).status == "in_progress"
+        assert session.get(Catalogue, product).stock == 0
+
+
+def test_batch_update_refuses_settling_statuses(client, checkout):
+    response = client.put(
+        "/v1/checkouts/checkouts/batch/",
+        json=[{"id": checkout, "order_id": 1, "status": "completed"}],
+    )
+
+    result = response.json()["data"]
+    assert result["succeeded"] == []
+    assert [error["index"] for error in result["errors"]] == [0]
@@ -0,0 +1,79 @@
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from uuid import uuid4
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import update
+
+from app.core.pagination import decode_cursor, encode_cursor
+from app.models.catalogue import Catalogue
+from app.schemas.catalogue import CatalogueCreate
+from app.services.catalogue import CatalogueService
+
+
+class CatalogueByCreatedAt(CatalogueService):
+    cursor_fields = ("created_at", "id")
+
+
+class CatalogueByPrice(CatalogueService):
+    cursor_fields = ("price", "id")
+
+
+def test_cursor_round_trips_typed_values():
+    values = {
+        "id": 7,
+        "sku": "SKU-7",
+        "created_at": datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=timezone.utc),
+        "day": date(2024, 5, 1),
+        "amount": Decimal("19.90"),
+        "token": uuid4(),
+    }
+    types = {field: type(value) for field, value in values.items()}
+
+    assert decode_cursor(encode_cursor(values), types) == values
+
+
+@pytest.mark.parametrize(
+    "values",
+    [
+        {"id": "7"},
+        {"id": True},
+        {"id": 7, "extra": 1},
+        {"created_at": "yesterday"},
+    ],
+)
+def test_cursor_with_wrong_fields_or_types_is_rejected(values):
+    types = {"id": int} if "id" in values else {"created_at": datetime}
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(encode_cursor(values), types)
+    assert error.value.status_code == 400
+
+
+def test_paginate_by_datetime_column(db):
+    service = CatalogueByCreatedAt(db)
+    rows = service.create_many(
+        [CatalogueCreate(name=f"item-{i}", price=1.0, stock=1) for i in range(5)]
+    )
+    # สองแถวแรกมี created_at เท่ากัน ต้องตัดสินด้วย id
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    for offset, row in zip((0, 0, 1, 2, 3), rows):
+        db.execute(
+            update(Catalogue)
+            .where(Catalogue.id == row["id"])
+            .values(created_at=start + timedelta(minutes=offset))
+        )
+
+    seen, cursor = [], None
+    while True:
+        page, cursor = service.paginate(limit=2, cursor=cursor, fields=["id"])
+        seen.extend(item["id"] for item in page)
+        if cursor is None:
+            break
+
+    assert seen == [row["id"] for row in rows]
+
+
+def test_unsupported_cursor_column_is_rejected(db):
+    with pytest.raises(TypeError, match="price"):
+        CatalogueByPrice(db).paginate(limit=2)
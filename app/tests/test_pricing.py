@@ -0,0 +1,195 @@
+import random
+from datetime import datetime, timezone
+from decimal import ROUND_HALF_EVEN, Decimal
+
+import numpy as np
+import pytest
+
+from app.core.security import get_password_hash
+from app.models.address import Address, Tile
+from app.models.cart import Cart, CartLine
+from app.models.catalogue import Catalogue
+from app.models.checkout import Checkout
+from app.models.customer import Customer
+from app.models.order import Order
+from app.schemas.checkout import CheckoutUpdate
+from app.services.checkout import CheckoutService
+from app.services.pricing import PricingService, reprice_lines, to_cents
+
+
+def exact(value) -> Decimal:
+    return Decimal(str(value))
+
+
+def to_cent(value: Decimal) -> Decimal:
+    return value.quantize(Decimal("0.01"), rounding=ROUND_HALF_EVEN)
+
+
+def orm_reprice(line: CartLine, new_price: float, discount_percentage=None) -> None:
+    """The per-row path: reprice one CartLine with its own methods.
+
+    Runs on Decimal copies of the stored values, so the reference rounds
+    the exact amount (half to even) instead of a float approximation.
+    """
+    line.price = exact(line.price)
+    line.discount_amount = exact(line.discount_amount)
+    old_subtotal = line.calculate_subtotal()
+    if discount_percentage is not None:
+        rate = exact(discount_percentage) / 100
+    else:
+        rate = line.discount_amount / old_subtotal if old_subtotal else Decimal(0)
+    line.price = exact(new_price)
+    discount = to_cent(line.apply_discount(rate))
+    line.discount_amount = min(discount, line.calculate_subtotal())
+
+
+def numpy_reprice(lines, new_prices, discount_percentage=None):
+    price, discount, _, _ = reprice_lines(
+        np.array([line.quantity for line in lines], dtype=np.int64),
+        to_cents([line.price for line in lines]),
+        to_cents([line.discount_amount for line in lines]),
+        to_cents(new_prices),
+        discount_percentage,
+    )
+    return price.tolist(), discount.tolist()
+
+
+def cents(lines, field):
+    return [int(to_cent(exact(getattr(line, field))) * 100) for line in lines]
+
+
+# (quantity, price, discount, new price)
+EDGE_CASES = [
+    (3, 19.99, 0.0, 21.49),  # ไม่มีส่วนลด
+    (3, 19.99, 5.997, 21.49),  # ส่วนลด 10% ที่ปัดเศษ
+    (1, 0.0, 0.0, 9.99),  # ราคาเดิม 0: ratio เป็น 0 ไม่หารด้วยศูนย์
+    (2, 10.0, 20.0, 7.5),  # ลด 100% คงเป็น 100%
+    (7, 0.01, 0.01, 0.03),  # ยอดเล็กระดับสตางค์
+    (1, 2.5, 0.25, 0.05),  # ส่วนลดครึ่งสตางค์ 0.005
+    (1000, 1234.56, 12345.6, 999.99),  # จำนวนมาก
+    (4, 5.0, 1.0, 5.0),  # ราคาไม่เปลี่ยน
+]
+
+
+@pytest.mark.parametrize("discount_percentage", [None, 0, 12.5, 33.333, 100])
+def test_numpy_matches_orm_on_edge_cases(discount_percentage):
+    lines = [
+        CartLine(quantity=q, price=p, discount_amount=d) for q, p, d, _ in EDGE_CASES
+    ]
+    new_prices = [new for *_, new in EDGE_CASES]
+
+    price, discount = numpy_reprice(lines, new_prices, discount_percentage)
+    for line, new_price in zip(lines, new_prices):
+        orm_reprice(line, new_price, discount_percentage)
+
+    assert price == cents(lines, "price")
+    assert discount == cents(lines, "discount_amount")
+
+
+def test_numpy_matches_orm_on_random_lines():
+    rng = random.Random(24)
+    lines, new_prices = [], []
+    for _ in range(20_000):
+        quantity = rng.randint(1, 50)
+        price = rng.randint(1, 100_000) / 100
+        rate = rng.choice([0, 0.05, 0.1, 0.15, 0.333, 1])
+        lines.append(
+            CartLine(
+                quantity=quantity,
+                price=price,
+                discount_amount=round(price * quantity * rate, 2),
+            )
+        )
+        new_prices.append(rng.randint(1, 100_000) / 100)
+
+    price, discount = numpy_reprice(lines, new_prices)
+    for line, new_price in zip(lines, new_prices):
+        orm_reprice(line, new_price)
+
+    assert price == cents(lines, "price")
+    assert discount == cents(lines, "discount_amount")
+
+
+@pytest.fixture
+def carts(db):
+    customer = Customer(
+        username="pricing-customer",
+        email="pricing-customer@example.com",
+        hashed_password=get_password_hash("secret"),
+    )
+    products = [Catalogue(name=f"p{i}", price=10.0, stock=10) for i in range(2)]
+    db.add_all([customer, *products])
+    db.flush()
+    result = {}
+    for name in ("open", "checked_out"):
+        cart = Cart(customer_id=customer.id, product_id=products[0].id, tax_rate=0.07)
+        cart.cart_lines = [
+            CartLine(
+                product_id=products[0].id, quantity=3, price=10.0, discount_amount=3.0
+            ),
+            CartLine(
+                product_id=products[1].id, quantity=1, price=10.0, discount_amount=0.0
+            ),
+        ]
+        cart.calculate_cart_total(cart.tax_rate)
+        db.add(cart)
+        result[name] = cart
+    result["checked_out"].checked_out_at = datetime.now(timezone.utc)
+    products[0].price = 19.99
+    products[1].price = 7.25
+    db.flush()
+    return result
+
+
+def test_reprice_updates_open_carts_like_the_orm(db, carts):
+    counts = PricingService(db).reprice()
+
+    assert counts == {"lines": 2, "carts": 1}
+    cart = carts["open"]
+    db.refresh(cart)
+    for line in cart.cart_lines:
+        db.refresh(line)
+    expected = [
+        CartLine(quantity=3, price=10.0, discount_amount=3.0),
+        CartLine(quantity=1, price=10.0, discount_amount=0.0),
+    ]
+    for line, new_price in zip(expected, (19.99, 7.25)):
+        orm_reprice(line, new_price)
+    lines = sorted(cart.cart_lines, key=lambda line: line.id)
+    assert cents(lines, "price") == cents(expected, "price")
+    assert cents(lines, "discount_amount") == cents(expected, "discount_amount")
+    # ยอดที่ปรับด้วย delta ต้องเท่ากับคำนวณใหม่จากทุก line
+    stored = cart.total_amount
+    assert stored == pytest.approx(cart.calculate_cart_total(cart.tax_rate))
+
+
+def test_reprice_leaves_checked_out_carts_alone(db, carts):
+    PricingService(db).reprice()
+
+    cart = carts["checked_out"]
+    db.refresh(cart)
+    assert [line.price for line in cart.cart_lines] == [10.0, 10.0]
+    assert cart.subtotal_amount == 40.0
+
+
+def test_completed_checkout_closes_its_cart(db, carts):
+    cart = carts["open"]
+    address = Address(title=Tile.MR, customer_id=cart.customer_id)
+    db.add(address)
+    db.flush()
+    order = Order(
+        customer_id=cart.customer_id, shipping_address_id=address.id, total_amount=1
+    )
+    db.add(order)
+    db.flush()
+    checkout = Checkout(order_id=order.id, cart_id=cart.id)
+    db.add(checkout)
+    db.flush()
+
+    CheckoutService(db).update(
+        checkout, CheckoutUpdate(order_id=order.id, cart_id=cart.id, status="completed")
+    )
+
+    db.refresh(cart)
+    assert cart.checked_out_at is not None
+    assert PricingService(db).reprice() == {"lines": 0, "carts": 0}
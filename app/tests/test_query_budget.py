@@ -0,0 +1,38 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from app.conftest import TEST_QUERY_BUDGET
+from app.core.db.instrumentation import QueryBudgetExceeded
+from app.core.middleware import RequestLogMiddleware
+
+
+@pytest.fixture
+def budget_app(db) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/queries/{count}")
+    def run_queries(count: int):
+        for _ in range(count):
+            db.execute(text("SELECT 1"))
+        return {"count": count}
+
+    app.add_middleware(RequestLogMiddleware)
+    return app
+
+
+def test_request_within_budget_succeeds(budget_app):
+    with TestClient(budget_app) as client:
+        response = client.get(f"/queries/{TEST_QUERY_BUDGET}")
+    assert response.status_code == 200
+
+
+def test_request_over_budget_fails(budget_app):
+    with TestClient(budget_app) as client:
+        with pytest.raises(QueryBudgetExceeded, match="SELECT 1"):
+            client.get(f"/queries/{TEST_QUERY_BUDGET + 1}")
+
+    with TestClient(budget_app, raise_server_exceptions=False) as client:
+        response = client.get(f"/queries/{TEST_QUERY_BUDGET + 1}")
+    assert response.status_code == 500
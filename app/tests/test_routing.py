@@ -0,0 +1,92 @@
+import pytest
+from sqlalchemy import Column, Integer, String, create_engine, event, select
+from sqlalchemy.orm import declarative_base, sessionmaker
+
+from app.core.db.routing import ReplicaSet, RoutingSession
+from app.services.base import BaseService
+
+RoutingBase = declarative_base()
+
+
+class Item(RoutingBase):
+    __tablename__ = "routing_item"
+    id = Column(Integer, primary_key=True)
+    name = Column(String, nullable=False)
+
+
+@pytest.fixture
+def engines(tmp_path):
+    primary = create_engine(f"sqlite:///{tmp_path / 'primary.db'}")
+    replica = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    # แต่ละไฟล์มีแถวต่างกัน จะได้รู้ว่า query ไปที่ไหน
+    for engine, name in ((primary, "primary"), (replica, "replica")):
+        RoutingBase.metadata.create_all(engine)
+        with engine.begin() as connection:
+            connection.execute(Item.__table__.insert().values(id=1, name=name))
+    yield primary, replica
+    primary.dispose()
+    replica.dispose()
+
+
+@pytest.fixture
+def routing_session(engines):
+    primary, replica = engines
+    make_session = sessionmaker(
+        class_=RoutingSession, bind=primary, replicas=ReplicaSet([replica])
+    )
+    with make_session() as session:
+        yield session
+
+
+def read_name(session, use_replica=True):
+    query = select(Item.name).where(Item.id == 1)
+    if use_replica:
+        query = query.execution_options(use_replica=True)
+    return session.scalar(query)
+
+
+def test_use_replica_reads_go_to_the_replica(routing_session):
+    assert read_name(routing_session) == "replica"
+
+
+def test_reads_without_the_option_go_to_the_primary(routing_session):
+    assert read_name(routing_session, use_replica=False) == "primary"
+
+
+def test_writes_go_to_the_primary_and_pin_later_reads(routing_session, engines):
+    primary, _ = engines
+    routing_session.add(Item(id=2, name="new"))
+    routing_session.flush()
+    assert read_name(routing_session) == "primary"
+    routing_session.commit()
+    with primary.connect() as connection:
+        assert connection.scalar(select(Item.name).where(Item.id == 2)) == "new"
+
+
+def test_reads_inside_a_flush_go_to_the_primary(routing_session):
+    names = []
+
+    @event.listens_for(routing_session, "before_flush")
+    def read_during_flush(session, flush_context, instances):
+        names.append(read_name(session))
+
+    routing_session.add(Item(id=2, name="new"))
+    routing_session.flush()
+    assert names == ["primary"]
+
+
+def test_service_get_reads_the_primary_unless_read_only(engines):
+    primary, replica = engines
+    # expire_on_commit=False เหมือน SessionLocal: get commit แล้วค่ายังไม่ถูกโหลดใหม่
+    make_session = sessionmaker(
+        class_=RoutingSession,
+        bind=primary,
+        replicas=ReplicaSet([replica]),
+        expire_on_commit=False,
+    )
+    with make_session() as session:
+        service = BaseService(Item, session)
+        # get ใช้สร้าง write ต่อ จึงต้องอ่านจาก primary
+        assert service.get(1).name == "primary"
+        session.expunge_all()
+        assert service.get(1, read_only=True).name == "replica"
@@ -0,0 +1,76 @@
+import pytest
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Float,
+    Integer,
+    MetaData,
+    Table,
+    create_engine,
+    insert,
+    select,
+)
+
+from app.core.db.connect import Base
+from app.core.db.schema import add_missing_columns, backfill_columns
+from app.models.cart import Cart, CartLine
+
+
+@pytest.fixture
+def engine(tmp_path):
+    # cart ก่อนมีคอลัมน์ยอดรวมย่อย: มีแค่ total_amount
+    engine = create_engine(f"sqlite:///{tmp_path / 'schema.db'}")
+    old = MetaData()
+    Table(
+        "cart",
+        old,
+        Column("id", Integer, primary_key=True),
+        Column("customer_id", Integer, nullable=False),
+        Column("product_id", Integer, nullable=False),
+        Column("quantity", Integer, nullable=False),
+        Column("total_amount", Float, nullable=False),
+        # SQLite เพิ่มคอลัมน์ที่ default เป็น CURRENT_TIMESTAMP ไม่ได้ ให้มีอยู่แล้ว
+        *(Column(name, DateTime) for name in ("added_at", "created_at", "updated_at")),
+    )
+    with engine.begin() as connection:
+        old.create_all(connection)
+        CartLine.__table__.create(connection)
+        connection.execute(
+            insert(old.tables["cart"]),
+            [
+                {"id": id, "customer_id": 1, "product_id": 1, "quantity": 1}
+                | {"total_amount": 0}
+                for id in (1, 2)
+            ],
+        )
+        connection.execute(
+            insert(CartLine),
+            [
+                {"cart_id": 1, "product_id": product, "quantity": quantity}
+                | {"price": price, "discount_amount": discount}
+                for product, quantity, price, discount in (
+                    (1, 3, 10.0, 3.0),
+                    (2, 1, 5.0, 0.0),
+                )
+            ],
+        )
+    yield engine
+    engine.dispose()
+
+
+def test_new_total_columns_are_backfilled_from_lines(engine):
+    with engine.begin() as connection:
+        added = add_missing_columns(connection, Base.metadata)
+        backfill_columns(connection, Base.metadata, added)
+
+    assert {"subtotal_amount", "discount_amount", "tax_amount"} <= set(added["cart"])
+    with engine.connect() as connection:
+        rows = connection.execute(
+            select(
+                Cart.id,
+                Cart.subtotal_amount,
+                Cart.discount_amount,
+                Cart.total_amount,
+            ).order_by(Cart.id)
+        ).all()
+    assert [tuple(row) for row in rows] == [(1, 35.0, 3.0, 32.0), (2, 0.0, 0.0, 0.0)]
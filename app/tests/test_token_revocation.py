@@ -0,0 +1,71 @@
+import pytest
+from fastapi import Request
+
+from app.core import auth_handler
+from app.core.auth import JWTMiddleware
+from app.core.auth_handler import sign_jwt, sign_refresh_token
+from app.core.exceptions import AuthenticationError
+from app.core.security import get_password_hash
+from app.models.user import User
+from app.schemas.auth import ConfirmPasswordRequest, RefreshTokenRequest
+from app.services.auth import AuthService
+
+
+@pytest.fixture(autouse=True)
+def jwt_secret(monkeypatch):
+    monkeypatch.setattr(auth_handler, "JWT_SECRET", "test-secret-0123456789abcdef0123")
+
+
+@pytest.fixture
+def user(db):
+    user = User(
+        username="revoked-user",
+        email="revoked-user@example.com",
+        hashed_password=get_password_hash("old-password"),
+    )
+    db.add(user)
+    db.flush()
+    return user
+
+
+def authenticate(db, token: str) -> User:
+    request = Request(
+        {"type": "http", "headers": [(b"authorization", f"Bearer {token}".encode())]}
+    )
+    request.state.db = db  # middleware ใช้ session เดียวกับ test
+    JWTMiddleware(None).authenticate(request)
+    return request.state.user
+
+
+def change_password(db, user):
+    AuthService(db).confirm_password(
+        ConfirmPasswordRequest(
+            username=user.username,
+            old_password="old-password",
+            new_password="new-password",
+        )
+    )
+
+
+def test_password_change_revokes_issued_access_tokens(db, user):
+    token = sign_jwt(str(user.id))
+    assert authenticate(db, token).id == user.id
+
+    change_password(db, user)
+
+    with pytest.raises(AuthenticationError) as error:
+        authenticate(db, token)
+    assert error.value.status_code == 401
+    assert authenticate(db, sign_jwt(str(user.id))).id == user.id
+
+
+def test_password_change_revokes_issued_refresh_tokens(db, user):
+    refresh_token = sign_refresh_token(str(user.id))
+    change_password(db, user)
+
+    with pytest.raises(AuthenticationError):
+        AuthService(db).refresh_token(RefreshTokenRequest(refresh_token=refresh_token))
+    new_refresh_token = sign_refresh_token(str(user.id))
+    assert AuthService(db).refresh_token(
+        RefreshTokenRequest(refresh_token=new_refresh_token)
+    )
@@ -0,0 +1,79 @@
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+
+from app.models.catalogue import Catalogue
+from app.schemas.catalogue import CatalogueCreate, CatalogueUpdate
+from app.services.catalogue import CatalogueService
+
+
+@pytest.fixture
+def sqlite_db(tmp_path):
+    # dialect อื่นที่ไม่ใช่ PostgreSQL ใช้อีก path (executemany แล้ว SELECT)
+    engine = create_engine(f"sqlite:///{tmp_path / 'update_many.db'}")
+    Catalogue.__table__.create(engine)
+    with Session(engine) as session:
+        yield session
+    engine.dispose()
+
+
+@pytest.fixture(params=["db", "sqlite_db"])
+def any_db(request):
+    return request.getfixturevalue(request.param)
+
+
+def _item(name: str, **fields) -> dict:
+    return {"name": name, "price": 10.0, "stock": 1, **fields}
+
+
+def _statements(db) -> list:
+    statements = []
+
+    @event.listens_for(db.get_bind(), "before_cursor_execute")
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    return statements
+
+
+def test_update_many_is_one_statement_and_keeps_request_order(db):
+    service = CatalogueService(db)
+    rows = service.create_many(
+        [CatalogueCreate(**_item(f"item-{i}")) for i in range(3)]
+    )
+    ids = [row["id"] for row in rows]
+    statements = _statements(db)
+
+    updated = service.update_many(
+        [
+            (ids[2], CatalogueUpdate(**_item("third", stock=30))),
+            (ids[0], CatalogueUpdate(**_item("first", stock=10))),
+            (ids[1], CatalogueUpdate(**_item("second", stock=20))),
+        ]
+    )
+
+    assert [row["id"] for row in updated] == [ids[2], ids[0], ids[1]]
+    assert [row["stock"] for row in updated] == [30, 10, 20]
+    queries = [s for s in statements if not s.startswith(("SAVEPOINT", "RELEASE"))]
+    assert len(queries) == 1
+    assert queries[0].startswith("UPDATE") and "RETURNING" in queries[0]
+    assert db.get(Catalogue, ids[0]).name == "first"
+
+
+def test_update_many_skips_missing_ids_and_merges_duplicates(any_db):
+    service = CatalogueService(any_db)
+    rows = service.create_many([CatalogueCreate(**_item("item", category="a"))])
+    id = rows[0]["id"]
+
+    updated = service.update_many(
+        [
+            (id, CatalogueUpdate(**_item("renamed", category="b"))),
+            (id + 1000, CatalogueUpdate(**_item("missing"))),
+            (id, CatalogueUpdate(**_item("renamed again"))),
+        ]
+    )
+
+    assert len(updated) == 1
+    assert updated[0]["name"] == "renamed again"
+    # ค่าที่ไม่ได้ส่งมาใน item หลังยังคงมาจาก item ก่อนหน้า
+    assert updated[0]["category"] == "b"
@@ -0,0 +1,77 @@
+import json
+
+import pytest
+from sqlalchemy import inspect
+
+from app.core import user_cache as user_cache_module
+from app.core.security import get_password_hash
+from app.core.user_cache import UserCache
+from app.models.customer import Customer
+from app.models.user import User
+
+
+class DictRedis:
+    """Just enough of the Redis client for UserCache."""
+
+    def __init__(self):
+        self.values = {}
+
+    def setex(self, key, ttl, value):
+        self.values[key] = value
+
+    def get(self, key):
+        return self.values.get(key)
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    client = DictRedis()
+    monkeypatch.setattr(user_cache_module, "get_redis", lambda: client)
+    return client
+
+
+@pytest.fixture
+def customer(db):
+    customer = Customer(
+        username="cached-customer",
+        email="cached-customer@example.com",
+        hashed_password=get_password_hash("secret"),
+    )
+    db.add(customer)
+    db.flush()
+    return customer
+
+
+def test_password_hash_is_not_cached(customer, redis):
+    cache = UserCache(maxsize=10, ttl=60)
+    cache.set(str(customer.id), customer)
+
+    assert "hashed_password" not in cache.local.get(str(customer.id))
+    raw = redis.get(UserCache.KEY_PREFIX + str(customer.id))
+    assert "hashed_password" not in json.loads(raw)
+
+
+def test_hit_builds_the_mapped_subclass(db, customer, redis):
+    cache = UserCache(maxsize=10, ttl=60)
+    cache.set(str(customer.id), customer)
+    cache.local.delete(str(customer.id))  # บังคับให้อ่านจาก Redis
+
+    cached = cache.get(str(customer.id))
+    assert type(cached) is Customer
+    assert inspect(cached).detached
+
+    db.expunge_all()
+    merged = db.merge(cached, load=False)
+    assert db.get(User, customer.id) is merged
+    assert db.get(Customer, customer.id) is merged
+
+
+def test_password_hash_is_loaded_on_demand(db, customer):
+    cache = UserCache(maxsize=10, ttl=60)
+    cache.set(str(customer.id), customer)
+    db.expunge_all()
+
+    user = db.merge(cache.get(str(customer.id)), load=False)
+    assert "hashed_password" in inspect(user).unloaded
+    assert user.verify_password("secret")
+    assert not user.verify_password("wrong")
@@ -0,0 +1,42 @@
+import pytest
+from sqlalchemy import delete
+
+from app.conftest import TestingSessionLocal
+from app.core import auth_handler
+from app.core.auth_handler import sign_jwt
+from app.core.db import connect
+from app.core.security import get_password_hash
+from app.models.user import User
+
+
+@pytest.fixture
+def user(monkeypatch):
+    monkeypatch.setattr(auth_handler, "JWT_SECRET", "test-secret-0123456789abcdef0123")
+    # JWTMiddleware เปิด session ของ request เอง ให้ชี้ไปที่ test database
+    monkeypatch.setattr(connect, "SessionLocal", TestingSessionLocal)
+    with TestingSessionLocal() as session:
+        user = User(
+            username="profile-user",
+            email="profile-user@example.com",
+            hashed_password=get_password_hash("secret"),
+        )
+        session.add(user)
+        session.commit()
+        user_id = user.id
+    yield user_id
+    with TestingSessionLocal() as session:
+        session.execute(delete(User).where(User.id == user_id))
+        session.commit()
+
+
+def test_update_current_user(client, user):
+    response = client.put(
+        "/v1/users/me",
+        json={"email": "renamed@example.com"},
+        headers={"Authorization": f"Bearer {sign_jwt(str(user))}"},
+    )
+
+    assert response.status_code == 200
+    assert response.json()["data"]["email"] == "renamed@example.com"
+    with TestingSessionLocal() as session:
+        assert session.get(User, user).email == "renamed@example.com"
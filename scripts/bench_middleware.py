@@ -0,0 +1,165 @@
+"""Per-request overhead of the JWT and request-log middleware.
+
+Compares the pure ASGI middleware in app.core with the same logic run
+through BaseHTTPMiddleware (how both were wired before the rewrite) and
+with no middleware at all. Requests go in-process through
+httpx.ASGITransport, so no server or database is involved: the user is
+served from the user cache and the token from the verified-JWT cache.
+
+    python scripts/bench_middleware.py [--requests 3000] [--rounds 5]
+"""
+
+import argparse
+import asyncio
+import logging
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.settings import base as settings  # noqa: E402
+
+# auth_handler อ่านค่าเหล่านี้ตอน import; cache ต้องไม่หมดอายุระหว่างวัด
+settings.JWT_SECRET = settings.JWT_SECRET or "bench-middleware-secret-0123456789"
+settings.JWT_CACHE_TTL = 24 * 60 * 60
+
+import httpx  # noqa: E402
+from fastapi import FastAPI, Request  # noqa: E402
+from fastapi.responses import StreamingResponse  # noqa: E402
+from starlette.middleware.base import BaseHTTPMiddleware  # noqa: E402
+
+from app.core.auth import JWTMiddleware  # noqa: E402
+from app.core.auth_handler import sign_jwt  # noqa: E402
+from app.core.db.connect import close_request_db  # noqa: E402
+from app.core.db.instrumentation import (  # noqa: E402
+    get_query_stats,
+    reset_query_stats,
+    start_query_stats,
+)
+from app.core.exceptions import AuthenticationError  # noqa: E402
+from app.core.handlers import authentication_error_handler  # noqa: E402
+from app.core.middleware import RequestLogMiddleware  # noqa: E402
+from app.core.user_cache import user_cache  # noqa: E402
+from app.models.user import User, UserRole  # noqa: E402
+
+STACKS = ("none", "base-http", "asgi")
+PATHS = ("/ping", "/me", "/stream")
+
+
+async def legacy_auth(request: Request, call_next):
+    """JWTMiddleware.authenticate wrapped the way the old BaseHTTPMiddleware was."""
+    request.state.user = None
+    try:
+        try:
+            JWTMiddleware(None).authenticate(request)
+        except AuthenticationError as e:
+            return await authentication_error_handler(request, e)
+        return await call_next(request)
+    finally:
+        close_request_db(request)
+
+
+async def legacy_log(request: Request, call_next):
+    """The old log_request_middleware, run as BaseHTTPMiddleware."""
+    request_start_time = time.monotonic()
+    stats_token = start_query_stats()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        logging.info(
+            {
+                "method": request.method,
+                "path": request.url.path,
+                "status": status_code,
+                "duration": time.monotonic() - request_start_time,
+                "db": get_query_stats().as_dict(),
+            }
+        )
+        reset_query_stats(stats_token)
+
+
+def build_app(stack: str) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/ping")
+    def ping():
+        return {"message": "pong"}
+
+    @app.get("/me")
+    def me(request: Request):
+        user = getattr(request.state, "user", None)
+        return {"username": user.username if user else None}
+
+    @app.get("/stream")
+    def stream():
+        return StreamingResponse(
+            (b"x" * 64 for _ in range(100)), media_type="text/plain"
+        )
+
+    # ลำดับเดียวกับ configure_middleware: add ทีหลังอยู่นอกสุด
+    if stack == "asgi":
+        app.add_middleware(JWTMiddleware)
+        app.add_middleware(RequestLogMiddleware)
+    elif stack == "base-http":
+        app.add_middleware(BaseHTTPMiddleware, dispatch=legacy_auth)
+        app.add_middleware(BaseHTTPMiddleware, dispatch=legacy_log)
+    return app
+
+
+async def time_requests(app: FastAPI, path: str, headers: dict, count: int) -> float:
+    """Mean microseconds per request over ``count`` sequential requests."""
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for _ in range(50):
+            await client.get(path, headers=headers)
+        started = time.perf_counter()
+        for _ in range(count):
+            response = await client.get(path, headers=headers)
+            response.raise_for_status()
+        return (time.perf_counter() - started) / count * 1e6
+
+
+async def run(count: int, rounds: int) -> None:
+    user = User(
+        id=1,
+        type="user",
+        username="bench",
+        email="bench@example.com",
+        role=UserRole.USER,
+        is_active=True,
+        is_verified=True,
+    )
+    user_cache.local.ttl = 24 * 60 * 60
+    user_cache.set("1", user)
+    headers = {"Authorization": f"Bearer {sign_jwt('1')}"}
+
+    apps = {stack: build_app(stack) for stack in STACKS}
+    print(f"{'path':<8} {'stack':<10} {'us/request':>11} {'overhead':>9}")
+    for path in PATHS:
+        results = {}
+        for stack in STACKS:
+            samples = [
+                await time_requests(apps[stack], path, headers, count)
+                for _ in range(rounds)
+            ]
+            results[stack] = statistics.median(samples)
+        for stack in STACKS:
+            overhead = results[stack] - results["none"]
+            print(f"{path:<8} {stack:<10} {results[stack]:>11.0f} {overhead:>9.0f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(run(args.requests, args.rounds))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""Repricing throughput: NumPy cents arrays against the per-row ORM path.
+
+The in-memory part reprices the same generated lines twice: once with
+reprice_lines/sum_by_cart on columnar arrays (what PricingService does per
+chunk), once row by row on CartLine objects with their own methods (what a
+loop over ORM instances would do). With --url the lines are also written to
+that database and PricingService.reprice runs end to end.
+
+    python scripts/bench_pricing.py [--lines 1000000] [--url postgresql://...]
+
+The --url run creates its own customer, products and carts and deletes
+them afterwards; the schema must already exist.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sqlalchemy import create_engine, delete, insert  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app.core.security import get_password_hash  # noqa: E402
+from app.models.cart import Cart, CartLine  # noqa: E402
+from app.models.catalogue import Catalogue  # noqa: E402
+from app.models.customer import Customer  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.services.pricing import (  # noqa: E402
+    CENTS,
+    PricingService,
+    reprice_lines,
+    sum_by_cart,
+)
+
+LINES_PER_CART = 10
+PRODUCTS = 1000
+
+
+def generate(count: int, seed: int = 1) -> dict:
+    rng = np.random.default_rng(seed)
+    quantity = rng.integers(1, 20, count)
+    price = rng.integers(100, 100_000, count)
+    rate = rng.choice([0.0, 0.05, 0.1, 0.25], count)
+    return {
+        "cart_id": np.arange(count) // LINES_PER_CART,
+        "product_id": rng.integers(0, PRODUCTS, count),
+        "quantity": quantity,
+        "price": price,
+        "discount": np.rint(price * quantity * rate).astype(np.int64),
+        "new_price": rng.integers(100, 100_000, count),
+    }
+
+
+def bench_numpy(lines: dict) -> float:
+    started = time.perf_counter()
+    price, discount, subtotal_delta, discount_delta = reprice_lines(
+        lines["quantity"], lines["price"], lines["discount"], lines["new_price"]
+    )
+    changed = (subtotal_delta != 0) | (discount_delta != 0)
+    sum_by_cart(
+        lines["cart_id"][changed], subtotal_delta[changed], discount_delta[changed]
+    )
+    return time.perf_counter() - started
+
+
+def bench_orm(lines: dict) -> float:
+    cart_lines = [
+        CartLine(
+            cart_id=cart_id,
+            quantity=quantity,
+            price=price / CENTS,
+            discount_amount=discount / CENTS,
+        )
+        for cart_id, quantity, price, discount in zip(
+            lines["cart_id"].tolist(),
+            lines["quantity"].tolist(),
+            lines["price"].tolist(),
+            lines["discount"].tolist(),
+        )
+    ]
+    new_prices = (lines["new_price"] / CENTS).tolist()
+    started = time.perf_counter()
+    deltas = {}
+    for line, new_price in zip(cart_lines, new_prices):
+        old_subtotal = line.calculate_subtotal()
+        old_discount = line.discount_amount
+        rate = old_discount / old_subtotal if old_subtotal else 0.0
+        line.price = new_price
+        line.apply_discount(rate)
+        delta = deltas.setdefault(line.cart_id, [0.0, 0.0])
+        delta[0] += line.calculate_subtotal() - old_subtotal
+        delta[1] += line.discount_amount - old_discount
+    return time.perf_counter() - started
+
+
+def bench_database(url: str, lines: dict) -> float:
+    engine = create_engine(url)
+    make_session = sessionmaker(bind=engine, expire_on_commit=False)
+    with make_session() as session:
+        customer = Customer(
+            username="bench-pricing",
+            email="bench-pricing@example.com",
+            hashed_password=get_password_hash("bench"),
+        )
+        session.add(customer)
+        session.flush()
+        product_ids = session.scalars(
+            insert(Catalogue).returning(Catalogue.id),
+            [
+                {"name": f"bench-{i}", "price": price / CENTS, "stock": 0}
+                for i, price in enumerate(
+                    np.random.default_rng(2).integers(100, 100_000, PRODUCTS).tolist()
+                )
+            ],
+        ).all()
+        cart_count = int(lines["cart_id"][-1]) + 1
+        cart_ids = session.scalars(
+            insert(Cart).returning(Cart.id),
+            [
+                {"customer_id": customer.id, "product_id": product_ids[0]}
+                for _ in range(cart_count)
+            ],
+        ).all()
+        rows = [
+            {
+                "cart_id": cart_ids[cart],
+                "product_id": product_ids[product],
+                "quantity": quantity,
+                "price": price / CENTS,
+                "discount_amount": discount / CENTS,
+            }
+            for cart, product, quantity, price, discount in zip(
+                lines["cart_id"].tolist(),
+                lines["product_id"].tolist(),
+                lines["quantity"].tolist(),
+                lines["price"].tolist(),
+                lines["discount"].tolist(),
+            )
+        ]
+        for start in range(0, len(rows), 50_000):
+            session.execute(insert(CartLine), rows[start : start + 50_000])
+        session.commit()
+        customer_id = customer.id
+
+    try:
+        with make_session() as session:
+            started = time.perf_counter()
+            counts = PricingService(session).reprice(product_ids=product_ids)
+            elapsed = time.perf_counter() - started
+        print(f"database: {counts['lines']} lines in {counts['carts']} carts")
+        return elapsed
+    finally:
+        with make_session() as session:
+            session.execute(delete(CartLine).where(CartLine.cart_id.in_(cart_ids)))
+            session.execute(delete(Cart).where(Cart.id.in_(cart_ids)))
+            session.execute(delete(Catalogue).where(Catalogue.id.in_(product_ids)))
+            session.execute(delete(Customer).where(Customer.id == customer_id))
+            session.execute(delete(User).where(User.id == customer_id))
+            session.commit()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=1_000_000)
+    parser.add_argument("--url")
+    args = parser.parse_args()
+
+    lines = generate(args.lines)
+    results = {"numpy": bench_numpy(lines), "orm per-row": bench_orm(lines)}
+    if args.url:
+        results["database (numpy)"] = bench_database(args.url, lines)
+    print(f"{'path':<18} {'seconds':>8} {'lines/s':>12}")
+    for name, seconds in results.items():
+        print(f"{name:<18} {seconds:>8.2f} {args.lines / seconds:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
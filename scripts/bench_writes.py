@@ -0,0 +1,102 @@
+"""Write latency of single-row creates and updates through CatalogueService.
+
+Compares the current path (eager_defaults: INSERT/UPDATE ... RETURNING,
+sessions with expire_on_commit=False) with the pattern it replaced
+(no eager defaults, expire on commit, session.refresh after every write).
+Statements are counted with the same instrumentation the request log uses.
+
+    python scripts/bench_writes.py [--url postgresql://...] [--writes 2000]
+
+Without --url a throwaway sqlite file is used. The catalogue table is
+created if it does not exist, and the rows written are deleted afterwards.
+"""
+
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sqlalchemy import create_engine, delete  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app.core.db.instrumentation import (  # noqa: E402
+    get_query_stats,
+    instrument_engine,
+    reset_query_stats,
+    start_query_stats,
+)
+from app.models.catalogue import Catalogue  # noqa: E402
+from app.schemas.catalogue import CatalogueCreate, CatalogueUpdate  # noqa: E402
+from app.services.catalogue import CatalogueService  # noqa: E402
+
+MODES = ("refresh", "returning")
+
+
+def run_mode(engine, mode: str, writes: int) -> dict:
+    """Create then update ``writes`` rows one at a time, as the API does."""
+    legacy = mode == "refresh"
+    Catalogue.__mapper__.eager_defaults = not legacy
+    make_session = sessionmaker(bind=engine, expire_on_commit=legacy)
+    results = {}
+    ids = []
+    for operation in ("create", "update"):
+        durations = []
+        token = start_query_stats()
+        for i in range(writes):
+            with make_session() as session:
+                service = CatalogueService(session)
+                started = time.perf_counter()
+                if operation == "create":
+                    obj = service.create(
+                        CatalogueCreate(name=f"bench-{i}", price=1.0, stock=i)
+                    )
+                else:
+                    obj = service.update(
+                        session.get(Catalogue, ids[i]),
+                        CatalogueUpdate(name=f"bench-{i}", price=2.0, stock=i),
+                    )
+                if legacy:
+                    session.refresh(obj)
+                # response ต้องอ่าน id/updated_at เหมือน serializer
+                obj.id, obj.updated_at
+                durations.append(time.perf_counter() - started)
+                if operation == "create":
+                    ids.append(obj.id)
+        statements = get_query_stats().count
+        reset_query_stats(token)
+        if operation == "update":
+            # SELECT ที่ get แถวมาก่อน update ไม่นับเป็นค่าใช้จ่ายของการเขียน
+            statements -= writes
+        results[operation] = (
+            statistics.median(durations) * 1000,
+            statements / writes,
+        )
+    with make_session() as session:
+        session.execute(delete(Catalogue).where(Catalogue.id.in_(ids)))
+        session.commit()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url")
+    parser.add_argument("--writes", type=int, default=2000)
+    args = parser.parse_args()
+
+    url = args.url or f"sqlite:///{tempfile.mkdtemp()}/bench_writes.db"
+    engine = create_engine(url)
+    instrument_engine(engine)
+    Catalogue.__table__.create(engine, checkfirst=True)
+
+    print(f"{'mode':<10} {'operation':<10} {'ms/write':>9} {'statements':>11}")
+    for mode in MODES:
+        for operation, (ms, statements) in run_mode(engine, mode, args.writes).items():
+            print(f"{mode:<10} {operation:<10} {ms:>9.3f} {statements:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()